@@ -0,0 +1,385 @@
+#the AST syntax2.Parser builds. every kind of node is a small class with __slots__ and an int tag,
+#so the interpreter can pick a handler by indexing a list instead of comparing node_type strings.
+#to_dict/from_dict convert to and from the plain dict shape ({"node_type": ..., ...}) the parser
+#used to build, for tools that want json-able data
+
+# node tags
+PROGRAM = 0
+VAR_BLOCK = 1
+VAR_DECL = 2
+ASSIGNMENT = 3
+TYPE_CAST = 4
+INPUT = 5
+VISIBLE = 6
+IF_STMT = 7
+SWITCH_STMT = 8
+LOOP = 9
+BREAK = 10
+FUNC_DEF = 11
+FUNC_CALL = 12
+RETURN = 13
+BINARY_OP = 14
+N_ARY_OP = 15
+UNARY_OP = 16
+MAEK = 17
+OPERAND = 18
+NODE_TAG_COUNT = 19
+
+class Node:
+    __slots__ = ()
+    # tag and node_type of the kind of node, fields in the order the dict shape has them
+    tag = -1
+    node_type = None
+    fields = ()
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.fields)
+        return f"{type(self).__name__}({fields})"
+
+class Program(Node):
+    __slots__ = ("body",)
+    tag = PROGRAM
+    node_type = "program"
+    fields = ("body",)
+
+    def __init__(self, body):
+        self.body = body
+
+# WAZZUP ... BUHBYE
+class VarBlock(Node):
+    __slots__ = ("body", "line")
+    tag = VAR_BLOCK
+    node_type = "var_block"
+    fields = ("body", "line")
+
+    def __init__(self, body, line):
+        self.body = body
+        self.line = line
+
+# I HAS A name (ITZ value)
+class VarDecl(Node):
+    __slots__ = ("name", "value", "line", "binding")
+    tag = VAR_DECL
+    node_type = "var_decl"
+    fields = ("name", "value", "line")
+
+    def __init__(self, name, value, line):
+        self.name = name
+        self.value = value
+        self.line = line
+        self.binding = None
+
+# target R expr, also a bare expression (target is then "IT")
+class Assignment(Node):
+    __slots__ = ("target", "expr", "line", "binding")
+    tag = ASSIGNMENT
+    node_type = "assignment"
+    fields = ("target", "expr", "line")
+
+    def __init__(self, target, expr, line):
+        self.target = target
+        self.expr = expr
+        self.line = line
+        self.binding = None
+
+# target IS NOW A type
+class TypeCast(Node):
+    __slots__ = ("target", "type", "line", "binding")
+    tag = TYPE_CAST
+    node_type = "type_cast"
+    fields = ("target", "type", "line")
+
+    def __init__(self, target, type, line):
+        self.target = target
+        self.type = type
+        self.line = line
+        self.binding = None
+
+# GIMMEH variable
+class Input(Node):
+    __slots__ = ("variable", "line", "binding")
+    tag = INPUT
+    node_type = "input"
+    fields = ("variable", "line")
+
+    def __init__(self, variable, line):
+        self.variable = variable
+        self.line = line
+        self.binding = None
+
+class Visible(Node):
+    __slots__ = ("args", "line")
+    tag = VISIBLE
+    node_type = "visible"
+    fields = ("args", "line")
+
+    def __init__(self, args, line):
+        self.args = args
+        self.line = line
+
+# O RLY? YA RLY ... (MEBBE ...) (NO WAI ...) OIC
+class IfStmt(Node):
+    __slots__ = ("true_block", "else_if_blocks", "else_block", "line")
+    tag = IF_STMT
+    node_type = "if_stmt"
+    fields = ("true_block", "else_if_blocks", "else_block", "line")
+
+    def __init__(self, true_block, else_if_blocks, else_block, line):
+        self.true_block = true_block
+        self.else_if_blocks = else_if_blocks
+        self.else_block = else_block
+        self.line = line
+
+# one MEBBE of an IfStmt
+class ElseIf(Node):
+    __slots__ = ("condition", "body")
+    fields = ("condition", "body")
+
+    def __init__(self, condition, body):
+        self.condition = condition
+        self.body = body
+
+# WTF? OMG ... (OMGWTF ...) OIC
+class SwitchStmt(Node):
+    __slots__ = ("cases", "default", "line")
+    tag = SWITCH_STMT
+    node_type = "switch_stmt"
+    fields = ("cases", "default", "line")
+
+    def __init__(self, cases, default, line):
+        self.cases = cases
+        self.default = default
+        self.line = line
+
+# one OMG of a SwitchStmt, value is the literal itself
+class Case(Node):
+    __slots__ = ("value", "body")
+    fields = ("value", "body")
+
+    def __init__(self, value, body):
+        self.value = value
+        self.body = body
+
+# IM IN YR label (operation) (condition) ... IM OUTTA YR
+class Loop(Node):
+    __slots__ = ("label", "operation", "condition", "body", "line")
+    tag = LOOP
+    node_type = "loop"
+    fields = ("label", "operation", "condition", "body", "line")
+
+    def __init__(self, label, operation, condition, body, line):
+        self.label = label
+        self.operation = operation
+        self.condition = condition
+        self.body = body
+        self.line = line
+
+# UPPIN/NERFIN YR variable of a Loop
+class LoopOperation(Node):
+    __slots__ = ("type", "variable", "binding")
+    fields = ("type", "variable")
+
+    def __init__(self, type, variable):
+        self.type = type
+        self.variable = variable
+        self.binding = None
+
+# TIL/WILE expr of a Loop
+class LoopCondition(Node):
+    __slots__ = ("type", "expr")
+    fields = ("type", "expr")
+
+    def __init__(self, type, expr):
+        self.type = type
+        self.expr = expr
+
+# GTFO
+class Break(Node):
+    __slots__ = ("line",)
+    tag = BREAK
+    node_type = "break"
+    fields = ("line",)
+
+    def __init__(self, line):
+        self.line = line
+
+# HOW IZ I name (YR param (AN YR param)...) ... IF U SAY SO. layout is the slots of its frame, see resolver
+class FuncDef(Node):
+    __slots__ = ("name", "params", "body", "line", "layout")
+    tag = FUNC_DEF
+    node_type = "func_def"
+    fields = ("name", "params", "body", "line")
+
+    def __init__(self, name, params, body, line):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.line = line
+        self.layout = None
+
+# I IZ name (YR arg (AN YR arg)...) MKAY
+class FuncCall(Node):
+    __slots__ = ("name", "args", "line")
+    tag = FUNC_CALL
+    node_type = "func_call"
+    fields = ("name", "args", "line")
+
+    def __init__(self, name, args, line):
+        self.name = name
+        self.args = args
+        self.line = line
+
+# FOUND YR value
+class Return(Node):
+    __slots__ = ("value", "line")
+    tag = RETURN
+    node_type = "return"
+    fields = ("value", "line")
+
+    def __init__(self, value, line):
+        self.value = value
+        self.line = line
+
+# SUM OF left AN right and the other two operand operators, op is the token type
+class BinaryOp(Node):
+    __slots__ = ("op", "left", "right", "line")
+    tag = BINARY_OP
+    node_type = "binary_op"
+    fields = ("op", "left", "right", "line")
+
+    def __init__(self, op, left, right, line):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.line = line
+
+# ALL OF / ANY OF / SMOOSH
+class NAryOp(Node):
+    __slots__ = ("op", "operands", "line")
+    tag = N_ARY_OP
+    node_type = "n_ary_op"
+    fields = ("op", "operands", "line")
+
+    def __init__(self, op, operands, line):
+        self.op = op
+        self.operands = operands
+        self.line = line
+
+# NOT operand
+class UnaryOp(Node):
+    __slots__ = ("op", "operand", "line")
+    tag = UNARY_OP
+    node_type = "unary_op"
+    fields = ("op", "operand", "line")
+
+    def __init__(self, op, operand, line):
+        self.op = op
+        self.operand = operand
+        self.line = line
+
+# MAEK expr A type. it's a "type_cast" in the dict shape too, told apart from TypeCast by its expr
+class Maek(Node):
+    __slots__ = ("expr", "type", "line")
+    tag = MAEK
+    node_type = "type_cast"
+    fields = ("expr", "type", "line")
+
+    def __init__(self, expr, type, line):
+        self.expr = expr
+        self.type = type
+        self.line = line
+
+# a variable, IT or a literal. kind is the token type, value the parsed literal or the name.
+# binding (and that of the other nodes naming a variable) is where the variable lives, see resolver
+class Operand(Node):
+    __slots__ = ("value", "kind", "line", "binding")
+    tag = OPERAND
+    node_type = "operand"
+    fields = ("value", "kind", "line")
+
+    def __init__(self, value, kind, line):
+        self.value = value
+        self.kind = kind
+        self.line = line
+        self.binding = None
+
+NODE_CLASSES = {cls.node_type: cls for cls in (Program, VarBlock, VarDecl, Assignment, TypeCast, Input, Visible,
+                                               IfStmt, SwitchStmt, Loop, Break, FuncDef, FuncCall, Return,
+                                               BinaryOp, NAryOp, UnaryOp, Operand)}
+# the parts of a statement that have no node_type, known by their keys
+PART_CLASSES = {frozenset(cls.fields): cls for cls in (ElseIf, Case, LoopOperation, LoopCondition)}
+
+# the dict shape of a node (or of a list of them, or anything else, which is given back as is)
+def to_dict(value):
+    if isinstance(value, Node):
+        result = {"node_type": value.node_type} if value.node_type is not None else {}
+        for field in value.fields:
+            result[field] = to_dict(getattr(value, field))
+        return result
+    if isinstance(value, list):
+        return [to_dict(item) for item in value]
+    return value
+
+# the nodes of a dict shape made by to_dict (or by the old parser)
+def from_dict(value):
+    if isinstance(value, list):
+        return [from_dict(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    node_type = value.get("node_type")
+    if node_type is None:
+        cls = PART_CLASSES[frozenset(value)]
+    elif node_type == "type_cast" and "target" not in value:
+        cls = Maek
+    else:
+        cls = NODE_CLASSES[node_type]
+    return cls(*[from_dict(value.get(field)) for field in cls.fields])
+
+# the operand nodes of an expression node, in the order they are evaluated
+def expression_operands(node):
+    tag = node.tag
+    if tag == BINARY_OP:
+        return (node.left, node.right)
+    if tag == N_ARY_OP:
+        return node.operands
+    if tag == UNARY_OP:
+        return (node.operand,)
+    if tag == MAEK:
+        return (node.expr,)
+    # statements aren't expressions
+    return ()
+
+# whether a GTFO in statements ends something around them: one that isn't in a loop, WTF? or
+# HOW IZ I of its own (those are what a GTFO ends), at any depth of O RLY? in them
+def has_break(statements):
+    stack = list(statements)
+    while stack:
+        stmt = stack.pop()
+        if stmt is None:
+            continue
+        tag = stmt.tag
+        if tag == BREAK:
+            return True
+        if tag == IF_STMT:
+            stack.extend(stmt.true_block)
+            for else_if in stmt.else_if_blocks:
+                stack.extend(else_if.body)
+            stack.extend(stmt.else_block)
+        elif tag == PROGRAM or tag == VAR_BLOCK:
+            stack.extend(stmt.body)
+    return False
+
+# adds delta to the line of node and of every node under it (a line of -1, from EOF, stays)
+def shift_lines(node, delta):
+    stack = [node]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, Node):
+            for field in value.fields:
+                if field != "line":
+                    stack.append(getattr(value, field))
+                elif value.line != -1:
+                    value.line += delta
+        elif isinstance(value, list):
+            stack.extend(value)
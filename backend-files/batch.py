@@ -0,0 +1,190 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
+import json
+import os
+import signal
+import sys
+import time
+
+from lexer1 import tokenize, TokenStream
+from syntax2 import Parser
+from semantics1 import Interpreter
+
+#runs the lexer, the parser or the interpreter over many files at once. the files are handed out
+#to a pool of worker processes, so the imports and the compiled regexes are paid for once per
+#worker instead of once per file. every file gets its own output, and a summary with the time
+#each file took is printed at the end
+#
+#   python batch.py [--mode lexer|syntax|semantics] [--jobs N] [--out DIR] [--timeout SECONDS] paths...
+
+MODES = ("lexer", "syntax", "semantics")
+STATUSES = ("ok", "error", "failed", "timeout")
+
+#raised in a worker when a file takes longer than --timeout. it isn't an Exception so the
+#interpreter's except Exception doesn't print it as a runtime error
+class FileTimeout(BaseException):
+    pass
+
+def on_alarm(signum, frame):
+    raise FileTimeout()
+
+#collects the .lol files under the given paths, directories are searched recursively
+def collect_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                for name in sorted(names):
+                    if name.lower().endswith(".lol"):
+                        files.append(os.path.join(root, name))
+        else:
+            files.append(path)
+    return files
+
+#what the single-file cli of the mode would print for code
+def run_mode(mode, code, input_text):
+    if mode == "lexer":
+        out = io.BytesIO()
+        tokenize(code, out=out)
+        return out.getvalue().decode("utf-8"), "ok"
+
+    parser = Parser(TokenStream(code))
+    ast = parser.parse()
+    if parser.errors:
+        if mode == "syntax":
+            lines = ["", "--- ERRORS DETECTED ---"] + parser.errors + [f"Total errors: {len(parser.errors)}"]
+        else:
+            lines = ["Syntax Errors:"] + parser.errors
+        return "\n".join(lines) + "\n", "error"
+    if mode == "syntax":
+        return "", "ok"
+
+    interpreter = Interpreter()
+    undeclared = interpreter.resolve(ast)
+    if undeclared:
+        return "\n".join(["Semantic Errors:"] + undeclared) + "\n", "error"
+
+    #the interpreter prints and calls input(), so both are pointed at strings while it runs
+    out = io.StringIO()
+    stdin = sys.stdin
+    sys.stdin = io.StringIO(input_text)
+    try:
+        with contextlib.redirect_stdout(out):
+            interpreter.execute(ast)
+    finally:
+        sys.stdin = stdin
+    #execute prints a runtime error itself and returns
+    return out.getvalue(), "ok" if interpreter.runtime_error is None else "error"
+
+#runs in a worker: gives (path, status, output, seconds). status is ok, error (syntax, undeclared variable
+#or runtime errors), failed (the file couldn't be read, or something crashed) or timeout (it ran longer
+#than timeout seconds, None for no limit)
+def run_file(path, mode, input_text, timeout=None):
+    started = time.perf_counter()
+    if timeout:
+        #fires again every 0.1s until it's cleared, in case a bare except in the interpreter swallows one
+        signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout, 0.1)
+    try:
+        if not path.lower().endswith(".lol"):
+            raise ValueError("Input file is not a LOLCODE file (.lol)")
+        with open(path, "r", encoding="utf-8") as f:
+            code = f.read()
+        output, status = run_mode(mode, code, input_text)
+    except FileTimeout:
+        output, status = f"Timed out after {timeout} s\n", "timeout"
+    except (OSError, UnicodeDecodeError) as e:
+        output, status = f"Error reading {path}: {e}\n", "failed"
+    except Exception as e:
+        output, status = f"Error: {e}\n", "failed"
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return path, status, output, time.perf_counter() - started
+
+def run_batch(files, mode, jobs, input_text, timeout=None):
+    #a few files per task keeps the pool busy without one round trip per file
+    chunk_size = max(1, len(files) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(run_file, files, [mode] * len(files), [input_text] * len(files),
+                            [timeout] * len(files), chunksize=chunk_size)
+
+#name of the output file of path inside out_dir (the path with .out added, relative paths kept)
+def output_path(out_dir, path):
+    relative = os.path.relpath(os.path.abspath(path), os.getcwd())
+    if relative.startswith(".."):
+        relative = os.path.abspath(path).lstrip(os.sep)
+    return os.path.join(out_dir, relative + ".out")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Lexes, parses or runs many LOLCODE files")
+    arg_parser.add_argument("paths", nargs="+", help=".lol files and directories to search for them")
+    arg_parser.add_argument("--mode", choices=MODES, default="semantics")
+    arg_parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                            help="worker processes (default: one per cpu)")
+    arg_parser.add_argument("--out", metavar="DIR",
+                            help="write each file's output to DIR/<path>.out instead of printing it")
+    arg_parser.add_argument("--input", metavar="FILE",
+                            help="stdin given to every program in semantics mode (default: nothing)")
+    arg_parser.add_argument("--summary-json", metavar="FILE", help="also write the summary as json")
+    arg_parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                            help="stop a file that runs longer than this and report it as timeout")
+    args = arg_parser.parse_args()
+    if args.jobs < 1:
+        arg_parser.error("--jobs has to be at least 1")
+    if args.timeout is not None:
+        if args.timeout <= 0:
+            arg_parser.error("--timeout has to be more than 0")
+        if not hasattr(signal, "setitimer"):
+            arg_parser.error("--timeout needs SIGALRM, which this platform doesn't have")
+
+    input_text = ""
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            input_text = f.read()
+
+    files = collect_files(args.paths)
+    if not files:
+        print("No .lol files found", file=sys.stderr)
+        sys.exit(2)
+
+    started = time.perf_counter()
+    results = []
+    for path, status, output, seconds in run_batch(files, args.mode, min(args.jobs, len(files)), input_text,
+                                                    args.timeout):
+        results.append((path, status, seconds))
+        if args.out:
+            target = output_path(args.out, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w", encoding="utf-8") as f:
+                f.write(output)
+        else:
+            sys.stdout.write(f"===== {path} =====\n{output}")
+            if output and not output.endswith("\n"):
+                sys.stdout.write("\n")
+    wall = time.perf_counter() - started
+
+    counts = {status: 0 for status in STATUSES}
+    print("\n--- SUMMARY ---")
+    for path, status, seconds in results:
+        counts[status] += 1
+        print(f"{seconds * 1000:10.2f} ms  {status:<7}  {path}")
+    total = sum(seconds for path, status, seconds in results)
+    print(f"Files: {len(results)}, ok: {counts['ok']}, errors: {counts['error']}, failed: {counts['failed']}, "
+          f"timeouts: {counts['timeout']}, time: {total * 1000:.2f} ms in files, {wall * 1000:.2f} ms wall")
+
+    if args.summary_json:
+        with open(args.summary_json, "w", encoding="utf-8") as f:
+            json.dump({
+                "mode": args.mode,
+                "wall_seconds": wall,
+                "files": [{"path": path, "status": status, "seconds": seconds} for path, status, seconds in results],
+            }, f, indent=2)
+
+    sys.exit(0 if counts["ok"] == len(results) else 1)
+
+if __name__ == "__main__":
+    main()
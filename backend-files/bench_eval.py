@@ -0,0 +1,90 @@
+import argparse
+import time
+
+from lexer1 import TokenStream
+from syntax2 import Parser
+from semantics1 import Interpreter
+from ast_nodes import OPERAND, expression_operands
+
+#times Interpreter.evaluate on formulas nested deeper and deeper, to check that every subexpression
+#is worked out exactly once. the time per level has to stay about the same while the depth doubles
+#(when an arithmetic operator evaluated its operands again to cast them, every level doubled the
+#time instead). it also counts how many times an operator was applied, which has to be the number
+#of operators in the formula
+#
+#   python bench_eval.py [--depths 1000,2000,...] [--repeat N]
+
+# the source of a formula depth operators deep
+FORMULAS = {
+    "SUM OF": lambda depth: "SUM OF " * depth + "1" + " AN 1" * depth,
+    "PRODUKT OF": lambda depth: "PRODUKT OF " * depth + "2" + " AN 1" * depth,
+    "mixed": lambda depth: "".join(("SUM OF ", "PRODUKT OF ", "DIFF OF ")[i % 3] for i in range(depth))
+                           + "1" + " AN 1" * depth,
+    "BOTH SAEM": lambda depth: "BOTH SAEM " * depth + "WIN" + " AN WIN" * depth,
+    "MAEK": lambda depth: "MAEK " * depth + "1" + "".join((" A YARN", " A NUMBR")[i % 2] for i in range(depth)),
+}
+
+# the expression node of a formula
+def parse_formula(source):
+    parser = Parser(TokenStream(f"HAI\nI HAS A x ITZ {source}\nKTHXBYE\n"))
+    ast = parser.parse()
+    if parser.errors:
+        raise ValueError(parser.errors[0])
+    return ast.body[0].value
+
+def count_operators(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.tag != OPERAND:
+            count += 1
+            stack.extend(expression_operands(node))
+    return count
+
+# makes every operator of interpreter add one to the list it gives back when it's applied
+def count_applies(interpreter):
+    counts = [0]
+    def counted(apply):
+        def run(node, values):
+            counts[0] += 1
+            return apply(node, values)
+        return run
+    interpreter.appliers = [counted(apply) for apply in interpreter.appliers]
+    return counts
+
+# (best seconds of repeat evaluations, times an operator was applied in one evaluation)
+def time_formula(node, repeat):
+    interpreter = Interpreter()
+    counts = count_applies(interpreter)
+    interpreter.evaluate(node)
+    applied = counts[0]
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        interpreter.evaluate(node)
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best, applied
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Checks that expression evaluation grows linearly with depth")
+    arg_parser.add_argument("--depths", default="1000,2000,4000,8000,16000",
+                            help="comma separated nesting depths (default: 1000 up to 16000)")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="evaluations per formula, the best one counts")
+    args = arg_parser.parse_args()
+    depths = [int(depth) for depth in args.depths.split(",")]
+
+    print(f"{'formula':<12}{'depth':>8}{'ms':>10}{'us/level':>10}{'applied':>10}{'operators':>11}")
+    all_once = True
+    for name, build in FORMULAS.items():
+        for depth in depths:
+            node = parse_formula(build(depth))
+            operators = count_operators(node)
+            seconds, applied = time_formula(node, args.repeat)
+            all_once = all_once and applied == operators
+            print(f"{name:<12}{depth:>8}{seconds * 1000:>10.2f}{seconds * 1e6 / depth:>10.2f}{applied:>10}{operators:>11}")
+    print("every operator applied once" if all_once else "SOME OPERATORS WERE APPLIED MORE THAN ONCE")
+
+if __name__ == "__main__":
+    main()
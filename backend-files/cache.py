@@ -0,0 +1,191 @@
+from collections import OrderedDict
+import hashlib
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+
+import ast_nodes
+import lexer1
+import syntax2
+from lexer1 import TokenStream
+from syntax2 import Parser
+
+#on-disk cache of what lexing and parsing a source gives (the tokens, the AST and the syntax
+#errors), so running an unchanged program again goes straight to the interpreter.
+#entries are named by a hash of the source and the version stamp, and the least recently used
+#ones are deleted once the directory is bigger than max_size
+
+#bump when what's stored in an entry changes
+CACHE_FORMAT = 1
+DEFAULT_MAX_SIZE = 64 << 20
+#entries of every kind of cache, they all count for max_size
+ENTRY_SUFFIXES = (".pickle", ".code")
+
+def default_directory():
+    if os.environ.get("LOLCODE_CACHE_DIR"):
+        return os.environ["LOLCODE_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "lolcode")
+
+#changes whenever the lexer, the parser or the AST nodes change (and with the python version,
+#pickles of a newer python can't always be read by an older one), so old entries just stop being found
+def version_stamp():
+    digest = hashlib.sha256(f"{CACHE_FORMAT} {sys.version}".encode())
+    for module in (lexer1, syntax2, ast_nodes):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.digest()
+
+class ParseCache:
+    #what the names of this kind of entry end with
+    SUFFIX = ".pickle"
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory if directory is not None else default_directory()
+        self.max_size = max_size
+        self.version = self.stamp()
+        self.hits = 0
+        self.misses = 0
+
+    def stamp(self):
+        return version_stamp()
+
+    def key(self, code):
+        digest = hashlib.sha256(self.version)
+        digest.update(code.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    #(TokenStream, ast, errors) of code if it's cached, None if not
+    def load(self, code):
+        entry = self.read(code, pickle.load)
+        if entry is None:
+            return None
+        arrays, ast, errors = entry
+        return TokenStream(code, arrays=arrays), ast, errors
+
+    def store(self, code, tokens, ast, errors):
+        arrays = (tokens.types, tokens.starts, tokens.ends, tokens.lines, tokens.columns)
+        #(pickle recurses into the AST, so expressions nested thousands deep can't be stored)
+        self.write(code, lambda f: pickle.dump((arrays, ast, errors), f, protocol=pickle.HIGHEST_PROTOCOL))
+
+    #the entry of code read with load(file), None if there's none
+    def read(self, code, load):
+        path = self.path(self.key(code))
+        try:
+            with open(path, "rb") as f:
+                entry = load(f)
+            #the modification time is what the eviction goes by
+            os.utime(path)
+        except Exception:
+            #missing, half written by a crashed run, unreadable: all just a miss
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    #the entry of code, written by dump(file)
+    def write(self, code, dump):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            #written under a temporary name first, so another run never reads half an entry
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    dump(f)
+                os.replace(temp_path, self.path(self.key(code)))
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            self.evict()
+        except (OSError, RecursionError, ValueError):
+            #a cache that can't be written only means the next run does the work again
+            pass
+
+    #deletes the least recently used entries until the directory fits in max_size
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(ENTRY_SUFFIXES):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= self.max_size:
+            return
+        entries.sort()
+        for mtime, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_size:
+                break
+
+    def clear(self):
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(self.SUFFIX):
+                    os.remove(entry.path)
+
+#python code objects compiled from the source transpiler.py generates, by that source and the
+#filename it's compiled with (the code object keeps it). they're only good for the python that
+#compiled them, so that's what the stamp goes by
+class CodeCache(ParseCache):
+    SUFFIX = ".code"
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        super().__init__(directory, max_size)
+        #compiled in this process already, so a long running one compiles a program once. key ->
+        #(code, marshalled size), least recently used first and dropped past max_size like the files
+        self.memory = OrderedDict()
+        self.memory_size = 0
+
+    def stamp(self):
+        return hashlib.sha256(f"code {CACHE_FORMAT} {sys.version}".encode()).digest()
+
+    #the code object of source (compiled with filename), compiling it if it isn't cached
+    def compile(self, source, filename):
+        #what the entry is named by, the filename can't have a NUL so it can't run into the source
+        text = f"{filename}\0{source}"
+        key = self.key(text)
+        cached = self.memory.get(key)
+        if cached is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return cached[0]
+        code = self.read(text, marshal.load)
+        if code is None:
+            code = compile(source, filename, "exec")
+            self.write(text, lambda f: marshal.dump(code, f))
+        self.remember(key, code)
+        return code
+
+    def remember(self, key, code):
+        size = len(marshal.dumps(code))
+        self.memory[key] = (code, size)
+        self.memory_size += size
+        while self.memory_size > self.max_size and len(self.memory) > 1:
+            old_code, old_size = self.memory.popitem(last=False)[1]
+            self.memory_size -= old_size
+
+#lexes and parses code, going through cache (a ParseCache, or None to not use one).
+#gives (TokenStream, ast, errors)
+def parse_source(code, cache=None):
+    if cache is not None:
+        cached = cache.load(code)
+        if cached is not None:
+            return cached
+
+    tokens = TokenStream(code)
+    parser = Parser(tokens)
+    ast = parser.parse()
+    if cache is not None:
+        cache.store(code, tokens, ast, parser.errors)
+    return tokens, ast, parser.errors
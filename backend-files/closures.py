@@ -0,0 +1,542 @@
+import sys
+
+from ast_nodes import (PROGRAM, VAR_BLOCK, VAR_DECL, ASSIGNMENT, TYPE_CAST, INPUT, VISIBLE, IF_STMT, SWITCH_STMT,
+                       LOOP, BREAK, FUNC_DEF, FUNC_CALL, RETURN, BINARY_OP, N_ARY_OP, UNARY_OP, MAEK, OPERAND,
+                       NODE_TAG_COUNT, expression_operands, has_break)
+from resolver import GLOBAL, UNDECLARED
+from semantics1 import Types, NOOB_VALUE, WIN_VALUE, FAIL_VALUE
+
+#compiles an AST (after the resolver, see Interpreter.resolve) into a tree of python closures, one per
+#node, so running it doesn't dispatch on node tags or look at node fields any more: the operator,
+#the cast and the closures of the children are picked once, when compiling. running the program
+#is calling the closure of the root.
+#a GTFO ends the innermost loop or WTF? around it, however deep in O RLY?s it is. a GTFO in a
+#function with no loop or WTF? around it ends the function (which gives NOOB), also when it's
+#nested in O RLY?s. a GTFO outside all of them does nothing
+#the closures work on the state of an Interpreter (its frames, IT, functions, should_return and
+#should_break) and use its cast_value and operators for everything but the common cases, so what
+#gets printed, IT and the error messages are the same as Interpreter.execute's
+
+NUMBR = Types.NUMBR
+NUMBAR = Types.NUMBAR
+YARN = Types.YARN
+TROOF = Types.TROOF
+
+# an expression nested deeper than this is left to Interpreter.evaluate, closures calling closures
+# would run out of python stack (generated code nests operators thousands deep)
+MAX_CLOSURE_DEPTH = 32
+
+def expression_depth(node):
+    deepest = 0
+    stack = [(node, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if node is None:
+            continue
+        deepest = max(deepest, depth)
+        for operand in expression_operands(node):
+            stack.append((operand, depth + 1))
+    return deepest
+
+def nothing():
+    pass
+
+class ClosureCompiler:
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        # (body closure, parameter slots) of every function compiled, by its FuncDef node
+        self.functions = {}
+        # whether a GTFO in the code being compiled has a loop, WTF? or function to end
+        self.breakable = False
+
+        self.compilers = [self.compile_nothing] * NODE_TAG_COUNT
+        self.compilers[PROGRAM] = self.compile_body
+        self.compilers[VAR_BLOCK] = self.compile_body
+        self.compilers[VAR_DECL] = self.compile_var_decl
+        self.compilers[ASSIGNMENT] = self.compile_assignment
+        self.compilers[TYPE_CAST] = self.compile_type_cast
+        self.compilers[INPUT] = self.compile_input
+        self.compilers[VISIBLE] = self.compile_visible
+        self.compilers[IF_STMT] = self.compile_if
+        self.compilers[SWITCH_STMT] = self.compile_switch
+        self.compilers[LOOP] = self.compile_loop
+        self.compilers[FUNC_DEF] = self.compile_func_def
+        self.compilers[FUNC_CALL] = self.compile_func_call
+        self.compilers[RETURN] = self.compile_return
+        self.compilers[BREAK] = self.compile_break
+
+    # the closure running node (a program or a statement)
+    def compile(self, node):
+        if not node:
+            return nothing
+        return self.compilers[node.tag](node)
+
+    # runs statements one after the other until a FOUND YR (like execute_node checking should_return)
+    # or a GTFO
+    def compile_block(self, statements):
+        interpreter = self.interpreter
+        compiled = [self.compile(stmt) for stmt in statements]
+        if not compiled:
+            return nothing
+        if has_break(statements):
+            def run():
+                for stmt in compiled:
+                    if interpreter.should_return or interpreter.should_break:
+                        return
+                    stmt()
+            return run
+        if len(compiled) == 1:
+            only = compiled[0]
+            def run():
+                if not interpreter.should_return:
+                    only()
+            return run
+
+        def run():
+            for stmt in compiled:
+                if interpreter.should_return:
+                    return
+                stmt()
+        return run
+
+    def compile_body(self, node):
+        return self.compile_block(node.body)
+
+    # nodes that do nothing as a statement
+    def compile_nothing(self, node):
+        return nothing
+
+    # GTFO, like Interpreter.execute_break. outside a loop, WTF? or function it does nothing
+    def compile_break(self, node):
+        interpreter = self.interpreter
+        if not self.breakable:
+            return nothing
+
+        def run():
+            interpreter.should_break = True
+        return run
+
+    # the closure of a block a GTFO ends (the body of a loop, WTF? or function)
+    def compile_breakable(self, statements):
+        breakable = self.breakable
+        self.breakable = True
+        run = self.compile_block(statements)
+        self.breakable = breakable
+        return run
+
+    # (value, type) of the variable, binding is where the resolver put it
+    def compile_read(self, name, binding):
+        interpreter = self.interpreter
+        frames = interpreter.frames
+        if binding is None:
+            def read():
+                return interpreter.find_variable(name, len(frames) - 1)
+            return read
+
+        depth, slot = binding
+        if depth == GLOBAL:
+            globals_ = frames[0]
+            def read():
+                value = globals_[slot]
+                if value is None:
+                    raise Exception(f"Undeclared variable '{name}'")
+                return value
+        elif depth == UNDECLARED:
+            def read():
+                raise Exception(f"Undeclared variable '{name}'")
+        else:
+            index = -1 - depth
+            def read():
+                value = frames[index][slot]
+                if value is None:
+                    return interpreter.find_variable(name, len(frames) - 2 - depth)
+                return value
+        return read
+
+    # sets the variable to a (value, type)
+    def compile_write(self, name, binding):
+        interpreter = self.interpreter
+        frames = interpreter.frames
+        if binding is None or binding[0] == UNDECLARED:
+            def write(value):
+                interpreter.write_variable(name, binding, value)
+            return write
+
+        depth, slot = binding
+        if depth == GLOBAL:
+            globals_ = frames[0]
+            def write(value):
+                if globals_[slot] is None:
+                    raise Exception(f"Undeclared variable '{name}'")
+                globals_[slot] = value
+        else:
+            index = -1 - depth
+            def write(value):
+                frame = frames[index]
+                if frame[slot] is None:
+                    interpreter.write_variable(name, binding, value)
+                else:
+                    frame[slot] = value
+        return write
+
+    def compile_var_decl(self, node):
+        name = node.name
+        depth, slot = node.binding
+        is_global = depth == GLOBAL
+        frames = self.interpreter.frames
+        declared = self.interpreter.declared
+        value_of = self.compile_expression(node.value) if node.value else None
+
+        def run():
+            value = value_of() if value_of is not None else NOOB_VALUE
+            frame = frames[-1]
+            if frame[slot] is not None:
+                raise Exception(f"Variable '{name}' already declared in current scope")
+            frame[slot] = value
+            if is_global:
+                declared.append(slot)
+        return run
+
+    def compile_assignment(self, node):
+        interpreter = self.interpreter
+        value_of = self.compile_expression(node.expr)
+        if node.target == 'IT':
+            def run():
+                interpreter.it_register = value_of()
+            return run
+
+        write = self.compile_write(node.target, node.binding)
+        def run():
+            write(value_of())
+        return run
+
+    def compile_type_cast(self, node):
+        cast_value = self.interpreter.cast_value
+        target_type = node.type
+        read = self.compile_read(node.target, node.binding)
+        write = self.compile_write(node.target, node.binding)
+
+        def run():
+            val, t = read()
+            write((cast_value(val, t, target_type), target_type))
+        return run
+
+    def compile_input(self, node):
+        write = self.compile_write(node.variable, node.binding)
+
+        def run():
+            try:
+                user_input = input()
+                write((user_input, YARN))
+            except EOFError:
+                write(("", YARN))
+        return run
+
+    def compile_visible(self, node):
+        cast_value = self.interpreter.cast_value
+        output_buffer = self.interpreter.output_buffer
+        args = [self.compile_expression(arg) for arg in node.args]
+
+        def run():
+            out_parts = []
+            for arg in args:
+                try:
+                    val, t = arg()
+                    out_parts.append(str(val if t == YARN else cast_value(val, t, YARN)))
+                except Exception as e:
+                    out_parts.append(f"[Error: {str(e)}]")
+            output = "".join(out_parts)
+            output_buffer.append(output)
+            print(output)
+            sys.stdout.flush()
+        return run
+
+    def compile_if(self, node):
+        interpreter = self.interpreter
+        cast_value = interpreter.cast_value
+        true_block = self.compile_block(node.true_block)
+        else_ifs = [(self.compile_expression(else_if.condition), self.compile_block(else_if.body))
+                    for else_if in node.else_if_blocks]
+        else_block = self.compile_block(node.else_block)
+
+        def run():
+            val, t = interpreter.it_register
+            if cast_value(val, t, TROOF):
+                true_block()
+                return
+            # a MEBBE condition goes in IT before it's checked
+            for condition, body in else_ifs:
+                value = interpreter.it_register = condition()
+                if cast_value(value[0], value[1], TROOF):
+                    body()
+                    return
+            else_block()
+        return run
+
+    def compile_switch(self, node):
+        interpreter = self.interpreter
+        bodies = {case: self.compile_breakable(case.body) for case in node.cases}
+        default = self.compile_breakable(node.default)
+
+        def run():
+            val, t = interpreter.it_register
+            case = interpreter.matching_case(node, val, t)
+            if case is not None:
+                bodies[case]()
+            else:
+                default()
+            # a GTFO in it ends here
+            interpreter.should_break = False
+        return run
+
+    def compile_loop(self, node):
+        interpreter = self.interpreter
+        cast_value = interpreter.cast_value
+
+        # a GTFO right in the body ends the loop once it's reached, what comes after it never runs.
+        # one deeper in it (in an O RLY?) sets should_break
+        statements = node.body
+        breaks = False
+        for i, stmt in enumerate(statements):
+            if stmt is not None and stmt.tag == BREAK:
+                statements = statements[:i]
+                breaks = True
+                break
+        escapes = has_break(statements)
+        breakable = self.breakable
+        self.breakable = True
+        body = [self.compile(stmt) for stmt in statements]
+        self.breakable = breakable
+
+        stop = None
+        cond = node.condition
+        if cond:
+            condition = self.compile_expression(cond.expr)
+            til = cond.type == 'TIL'
+            wile = cond.type == 'WILE'
+            def stop():
+                val, t = condition()
+                bool_val = val if t == TROOF else cast_value(val, t, TROOF)
+                return (til and bool_val) or (wile and not bool_val)
+
+        step = self.compile_step(node.operation) if node.operation else None
+
+        def run():
+            while True:
+                if stop is not None and stop():
+                    return
+                for stmt in body:
+                    stmt()
+                    if interpreter.should_return:
+                        return
+                    if escapes and interpreter.should_break:
+                        interpreter.should_break = False
+                        return
+                if breaks:
+                    return
+                if step is not None:
+                    step()
+        return run
+
+    # UPPIN/NERFIN of a loop
+    def compile_step(self, op):
+        cast_value = self.interpreter.cast_value
+        var_name = op.variable
+        read = self.compile_read(var_name, op.binding)
+        write = self.compile_write(var_name, op.binding)
+        delta = 1 if op.type == 'UPPIN' else -1 if op.type == 'NERFIN' else 0
+
+        def step():
+            val, current_type = read()
+            if current_type == NUMBR:
+                write((val + delta, NUMBR))
+                return
+            if current_type != NUMBAR:
+                # same casts as Interpreter.execute_loop
+                try:
+                    val = cast_value(val, current_type, NUMBR)
+                    current_type = NUMBR
+                except Exception:
+                    try:
+                        val = cast_value(val, current_type, NUMBAR)
+                        current_type = NUMBAR
+                    except Exception:
+                        raise Exception(f"Loop variable '{var_name}' value cannot be cast to numerical type for UPPIN/NERFIN.")
+            val += delta
+            if current_type == NUMBR:
+                val = int(val)
+            elif current_type == NUMBAR:
+                val = float(val)
+            write((val, current_type))
+        return step
+
+    def compile_func_def(self, node):
+        functions = self.interpreter.functions
+        self.functions[node] = (self.compile_breakable(node.body), [node.layout[param] for param in node.params])
+
+        def run():
+            functions[node.name] = node
+        return run
+
+    def compile_func_call(self, node):
+        interpreter = self.interpreter
+        functions = interpreter.functions
+        compiled = self.functions
+        frames = interpreter.frames
+        layouts = interpreter.layouts
+        func_name = node.name
+        args = [self.compile_expression(arg) for arg in node.args]
+        arg_count = len(args)
+
+        def run():
+            func_node = functions.get(func_name)
+            if func_node is None:
+                raise Exception(f"Function '{func_name}' not defined")
+            params = func_node.params
+            if len(params) != arg_count:
+                raise Exception(f"Function '{func_name}' expects {len(params)} arguments, got {arg_count}")
+            body, slots = compiled[func_node]
+
+            layout = func_node.layout
+            frame = [None] * len(layout)
+            frames.append(frame)
+            layouts.append(layout)
+            for param, slot, arg in zip(params, slots, args):
+                value = arg()
+                if frame[slot] is not None:
+                    raise Exception(f"Variable '{param}' already declared in current scope")
+                frame[slot] = value
+
+            body()
+
+            ret_val = interpreter.return_value
+            interpreter.return_value = None
+            interpreter.should_return = False
+            interpreter.should_break = False
+            frames.pop()
+            layouts.pop()
+            interpreter.it_register = ret_val if ret_val else NOOB_VALUE
+        return run
+
+    def compile_return(self, node):
+        interpreter = self.interpreter
+        value_of = self.compile_expression(node.value)
+
+        def run():
+            interpreter.return_value = value_of()
+            interpreter.should_return = True
+        return run
+
+    # the closure giving the (value, type) of an expression
+    def compile_expression(self, node):
+        if node is None or expression_depth(node) > MAX_CLOSURE_DEPTH:
+            evaluate = self.interpreter.evaluate
+            return lambda: evaluate(node)
+        return self.compile_operator(node)
+
+    def compile_operator(self, node):
+        tag = node.tag
+        if tag == OPERAND:
+            return self.compile_operand(node)
+        if tag == BINARY_OP:
+            return self.compile_binary_op(node)
+
+        interpreter = self.interpreter
+        operands = [self.compile_operator(operand) for operand in expression_operands(node)]
+        if tag == N_ARY_OP and node.op == 'SMOOSH':
+            def run():
+                return "".join([str(operand()[0]) for operand in operands]), YARN
+        elif tag == UNARY_OP and node.op == 'NOT':
+            operand = operands[0]
+            def run():
+                return FAIL_VALUE if operand()[0] else WIN_VALUE
+        elif tag == MAEK:
+            cast_value = interpreter.cast_value
+            operand = operands[0]
+            target_type = node.type
+            def run():
+                val, t = operand()
+                return cast_value(val, t, target_type), target_type
+        else:
+            # ALL OF / ANY OF and the rest, every operand is still worked out before applying
+            apply = interpreter.appliers[tag]
+            def run():
+                return apply(node, [operand() for operand in operands])
+        return run
+
+    def compile_operand(self, node):
+        interpreter = self.interpreter
+        kind = node.kind
+        if kind == 'IT':
+            def run():
+                return interpreter.it_register
+            return run
+        if kind == 'IDENTIFIER':
+            return self.compile_read(node.value, node.binding)
+        if kind in ('INTEGER_LITERAL', 'FLOAT_LITERAL', 'STRING', 'TROOF_LITERAL'):
+            value = interpreter.evaluate_operand(node)
+            return lambda: value
+        return lambda: interpreter.evaluate_operand(node)
+
+    # the common cases (both NUMBR, or both the same type for a comparison) are worked out right in
+    # the closure, the rest goes to Interpreter.apply_binary_op
+    def compile_binary_op(self, node):
+        apply = self.interpreter.apply_binary_op
+        left = self.compile_operator(node.left)
+        right = self.compile_operator(node.right)
+        op = node.op
+
+        if op == 'SUM_OF':
+            def run():
+                l = left()
+                r = right()
+                if l[1] == NUMBR and r[1] == NUMBR:
+                    return l[0] + r[0], NUMBR
+                return apply(node, (l, r))
+        elif op == 'DIFF_OF':
+            def run():
+                l = left()
+                r = right()
+                if l[1] == NUMBR and r[1] == NUMBR:
+                    return l[0] - r[0], NUMBR
+                return apply(node, (l, r))
+        elif op == 'PRODUKT_OF':
+            def run():
+                l = left()
+                r = right()
+                if l[1] == NUMBR and r[1] == NUMBR:
+                    return l[0] * r[0], NUMBR
+                return apply(node, (l, r))
+        elif op == 'MOD_OF':
+            def run():
+                l = left()
+                r = right()
+                if l[1] == NUMBR and r[1] == NUMBR and r[0] != 0:
+                    return l[0] % r[0], NUMBR
+                return apply(node, (l, r))
+        elif op == 'BIGGR_OF' or op == 'SMALLR_OF':
+            pick = max if op == 'BIGGR_OF' else min
+            def run():
+                l = left()
+                r = right()
+                if l[1] == NUMBR and r[1] == NUMBR:
+                    return pick(l[0], r[0]), NUMBR
+                return apply(node, (l, r))
+        elif op == 'BOTH_SAEM':
+            def run():
+                l = left()
+                r = right()
+                if l[1] == r[1]:
+                    return WIN_VALUE if l[0] == r[0] else FAIL_VALUE
+                return apply(node, (l, r))
+        elif op == 'DIFFRINT':
+            def run():
+                l = left()
+                r = right()
+                if l[1] == r[1]:
+                    return WIN_VALUE if l[0] != r[0] else FAIL_VALUE
+                return apply(node, (l, r))
+        else:
+            def run():
+                return apply(node, (left(), right()))
+        return run
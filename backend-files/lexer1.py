@@ -1,6 +1,15 @@
+import argparse
+from array import array
+from bisect import bisect_right
+import codecs
+from concurrent.futures import ProcessPoolExecutor
+import gc
+import io
+import json
+from itertools import chain
 import re
+import struct
 import sys
-from collections import OrderedDict
 
 #this dictionary is for properly identifying the token types to see if it's being properly captured
 TOKEN_LABELS = {
@@ -90,275 +99,988 @@ TOKEN_LABELS = {
     "TROOF_FALSE": "Boolean Value (False)",
 }
 
-#this dictionary provides the regex for the tokens, whether it expects spaces etc or another arguments
-#ordered dictionary is essential since the order in which regular expressions are defined directly 
-#determines the priority of token matching
+#every token type the lexer produces, in the order of their ids. a TokenStream stores the id
+#instead of the name. EOF is never scanned, it stands for "past the last token"
+TOKEN_TYPES = (
+    "BTW", "OBTW", "TLDR",
+    "HAI", "KTHXBYE", "WAZZUP", "BUHBYE",
+    "I_HAS_A", "IS_NOW_A",
+    "SUM_OF", "DIFF_OF", "PRODUKT_OF", "QUOSHUNT_OF", "MOD_OF", "BIGGR_OF", "SMALLR_OF",
+    "BOTH_SAEM", "DIFFRINT", "BOTH_OF", "EITHER_OF", "WON_OF", "ALL_OF", "ANY_OF",
+    "ITZ", "R", "NOT", "SMOOSH", "MAEK", "A", "VISIBLE", "GIMMEH", "AN", "PLUS", "IT", "VERSION",
+    "ORLY", "YA_RLY", "MEBBE", "NO_WAI", "OIC", "WTF", "OMG", "OMGWTF", "GTFO",
+    "HOW_IZ_I", "IF_U_SAY_SO", "I_IZ", "FOUND_YR", "MKAY",
+    "IM_IN_YR", "UPPIN", "NERFIN", "YR", "TIL", "WILE", "IM_OUTTA_YR",
+    "TROOF_LITERAL", "STRING", "FLOAT_LITERAL", "INTEGER_LITERAL", "TYPE",
+    "IDENTIFIER", "UNKNOWN", "EOF",
+)
+TYPE_IDS = {type: id for id, type in enumerate(TOKEN_TYPES)}
 
-#we follow the maximal munch principle where tokens that are substrings of longer tokens must be 
-#defined before the longer token
+#instead of trying ~70 keyword patterns in order at every position, the scanner reads one whole
+#word (or number, string, newline) with a small regex and then classifies it with the tables below
 
-#also, reserved keywords must always be checked before the generic identifier pattern
-TOKEN_REGEX = OrderedDict([
+#single-word keywords and literals. a word is only looked up here if it starts on a word boundary,
+#which is what the \b in front of every keyword pattern used to check
+KEYWORDS = {
     #comments
-    ("BTW", r"BTW[^\n]*"),           #single Comment
-    ("OBTW", r"\bOBTW\b"),           #multiline comment start
-    ("TLDR", r"\bTLDR\b"),           #multiline comment end
-
-    #spaces or newlines
-    ("WHITESPACE", r"[ \t]+"),
-    ("NEWLINE", r"\n"),
-    ("LINEBREAK", r"newline"),
+    "OBTW": "OBTW",
+    "TLDR": "TLDR",
 
     #delimiters
-    ("HAI", r"\bHAI\b(?:\s+VERSION)?"), #optional version after hai
-    ("KTHXBYE", r"\bKTHXBYE\b"),
-    ("WAZZUP", r"\bWAZZUP\b"),
-    ("BUHBYE", r"\bBUHBYE\b"),
+    "KTHXBYE": "KTHXBYE",
+    "WAZZUP": "WAZZUP",
+    "BUHBYE": "BUHBYE",
 
     #keywords
-    ("I_HAS_A", r"\bI\s+HAS\s+A\b"),
-    ("IS_NOW_A", r"\bIS\s+NOW\s+A\b"),
-
-    ("SUM_OF", r"\bSUM\s+OF\b"),
-    ("DIFF_OF", r"\bDIFF\s+OF\b"),
-    ("PRODUKT_OF", r"\bPRODUKT\s+OF\b"),
-    ("QUOSHUNT_OF", r"\bQUOSHUNT\s+OF\b"),
-    ("MOD_OF", r"\bMOD\s+OF\b"),
-    ("BIGGR_OF", r"\bBIGGR\s+OF\b"),
-    ("SMALLR_OF", r"\bSMALLR\s+OF\b"),
-    ("BOTH_SAEM", r"\bBOTH\s+SAEM\b"),
-    ("DIFFRINT", r"\bDIFFRINT\b"),
-    ("BOTH_OF", r"\bBOTH\s+OF\b"),
-    ("EITHER_OF", r"\bEITHER\s+OF\b"),
-    ("WON_OF", r"\bWON\s+OF\b"),
-    ("ALL_OF", r"\bALL\s+OF\b"),
-    ("ANY_OF", r"\bANY\s+OF\b"),
-
-    ("ITZ", r"\bITZ\b"),
-    ("R", r"\bR\b"),
-    ("NOT", r"\bNOT\b"),
-    ("SMOOSH", r"\bSMOOSH\b"),
-    ("MAEK", r"\bMAEK\b"),
-    ("A", r"\bA\b"),
-    ("VISIBLE", r"\bVISIBLE\b"),
-    ("GIMMEH", r"\bGIMMEH\b"),
-    ("AN", r"\bAN\b"),
-    ("PLUS", r"\+"),
-    ("IT", r"\bIT\b"),
-    ("VERSION", r"\bVERSION\b"),
+    "DIFFRINT": "DIFFRINT",
+    "ITZ": "ITZ",
+    "R": "R",
+    "NOT": "NOT",
+    "SMOOSH": "SMOOSH",
+    "MAEK": "MAEK",
+    "A": "A",
+    "VISIBLE": "VISIBLE",
+    "GIMMEH": "GIMMEH",
+    "AN": "AN",
+    "IT": "IT",
+    "VERSION": "VERSION",
 
     #control flow
-    ("ORLY", r"\b(O\s+RLY|ORLY)\??"),
-    ("YA_RLY", r"\bYA\s+RLY\b"),
-    ("MEBBE", r"\bMEBBE\b"),
-    ("NO_WAI", r"\bNO\s+WAI\b"),
-    ("OIC", r"\bOIC\b"),
-    ("WTF", r"\bWTF\??"),
-    ("OMG", r"\bOMG\b"),
-    ("OMGWTF", r"\bOMGWTF\b"),
-    ("GTFO", r"\bGTFO\b"),
+    "MEBBE": "MEBBE",
+    "OIC": "OIC",
+    "OMG": "OMG",
+    "OMGWTF": "OMGWTF",
+    "GTFO": "GTFO",
 
     #functions
-    ("HOW_IZ_I", r"\bHOW\s+IZ\s+I\b"),
-    ("IF_U_SAY_SO", r"\bIF\s+U\s+SAY\s+SO\b"),
-    ("I_IZ", r"\bI\s+IZ\b"),
-    ("FOUND_YR", r"\bFOUND\s+YR\b"),
-    ("MKAY", r"\bMKAY\b"),
+    "MKAY": "MKAY",
 
     #loops
-    ("IM_IN_YR", r"\bIM\s+IN\s+YR\b"),
-    ("UPPIN", r"\bUPPIN\b"),
-    ("NERFIN", r"\bNERFIN\b"),
-    ("YR", r"\bYR\b"),
-    ("TIL", r"\bTIL\b"),
-    ("WILE", r"\bWILE\b"),
-    ("IM_OUTTA_YR", r"\bIM\s+OUTTA\s+YR\b"),
+    "UPPIN": "UPPIN",
+    "NERFIN": "NERFIN",
+    "YR": "YR",
+    "TIL": "TIL",
+    "WILE": "WILE",
 
     #literals
-    ("TROOF_LITERAL", r"\b(WIN|FAIL|true|false)\b"),
-    ("STRING", r'"([^"\\]|\\.)*"'),
-    ("FLOAT_LITERAL", r"[+-]?\d+\.\d+"),
-    ("INTEGER_LITERAL", r"[+-]?\d+"),
-    ("TYPE", r"\b(NUMBR|NUMBAR|YARN|TROOF|NOOB)\b"),
-    
-    #identifiers
-    ("IDENTIFIER", r"[a-zA-Z][a-zA-Z0-9_]*"),
-    
-    #catch all
-    ("UNKNOWN", r"."),
-])
-
-#join all patterns into one big regex with named groups
-
-#1. loops through every token name and its corresponding regex
-#2. for each token, it wraps the pattern in a named capturing group
-#3. when the scanner finds "WAZZUP", it doesn't just know what was found;
-#   it knows what kind of token it is.
-#4. it allows the scanner to check for all possible tokens simultaneously at every position in the source code
-tok_regex = "|".join(f"(?P<{name}>{pattern})" for name, pattern in TOKEN_REGEX.items())
-
-#1. pre-processes the regular expression string into a regex object
-#2. correctly recognize the beginning and end of lines
-#contains all tokens in a specific order, arranged how they were defined in the dict
-token_re = re.compile(tok_regex, re.MULTILINE)
+    "WIN": "TROOF_LITERAL",
+    "FAIL": "TROOF_LITERAL",
+    "true": "TROOF_LITERAL",
+    "false": "TROOF_LITERAL",
+    "NUMBR": "TYPE",
+    "NUMBAR": "TYPE",
+    "YARN": "TYPE",
+    "TROOF": "TYPE",
+    "NOOB": "TYPE",
+}
 
-def print_token(type, value):
+#lookahead trie for multi-word keywords, keyed by their first word. the words in between can be
+#separated by any whitespace (even newlines), and the last word must end on a word boundary
+MULTI_WORD_KEYWORDS = {
+    "I": {"HAS": {"A": "I_HAS_A"}, "IZ": "I_IZ"},
+    "IS": {"NOW": {"A": "IS_NOW_A"}},
+
+    "SUM": {"OF": "SUM_OF"},
+    "DIFF": {"OF": "DIFF_OF"},
+    "PRODUKT": {"OF": "PRODUKT_OF"},
+    "QUOSHUNT": {"OF": "QUOSHUNT_OF"},
+    "MOD": {"OF": "MOD_OF"},
+    "BIGGR": {"OF": "BIGGR_OF"},
+    "SMALLR": {"OF": "SMALLR_OF"},
+    "BOTH": {"SAEM": "BOTH_SAEM", "OF": "BOTH_OF"},
+    "EITHER": {"OF": "EITHER_OF"},
+    "WON": {"OF": "WON_OF"},
+    "ALL": {"OF": "ALL_OF"},
+    "ANY": {"OF": "ANY_OF"},
+
+    "YA": {"RLY": "YA_RLY"},
+    "NO": {"WAI": "NO_WAI"},
+
+    "HOW": {"IZ": {"I": "HOW_IZ_I"}},
+    "IF": {"U": {"SAY": {"SO": "IF_U_SAY_SO"}}},
+    "FOUND": {"YR": "FOUND_YR"},
+
+    "IM": {"IN": {"YR": "IM_IN_YR"}, "OUTTA": {"YR": "IM_OUTTA_YR"}},
+}
+
+#the few keywords that don't end on a word boundary keep a small regex of their own
+hai_re = re.compile(r"HAI(?:\s+VERSION)?")      #optional version after hai
+orly_re = re.compile(r"(?:O\s+RLY|ORLY)\??")
+wtf_re = re.compile(r"WTF\??")
+
+#one regex that reads a whole lexeme. leading spaces/tabs are skipped in the same match
+#since they are never a token
+scan_re = re.compile(r"""
+    [ \t]*
+    (?:
+        (?P<WORD>[A-Za-z]\w*)           #keywords, literals and identifiers
+      | (?P<FLOAT_LITERAL>-?\d+\.\d+)   #a leading + is always read as PLUS
+      | (?P<INTEGER_LITERAL>-?\d+)
+      | (?P<NEWLINE>\n)
+      | (?P<STRING>"(?:[^"\\]|\\.)*")
+      | (?P<OTHER>.)                    #PLUS or unknown
+    )?
+""", re.VERBOSE)
+
+#the next word of a multi-word keyword
+next_word_re = re.compile(r"\s+(\w+)")
+identifier_re = re.compile(r"[a-zA-Z][a-zA-Z0-9_]*")
+
+#how far a multi-word keyword looks ahead, and how far an unclosed string was read before it failed.
+#only needed to know when a lexeme at the end of a partial source is complete
+lookahead_re = re.compile(r"\s*\w*")
+string_prefix_re = re.compile(r'"(?:[^"\\]|\\.)*')
+
+#characters read at a time when tokens are streamed from a file
+CHUNK_SIZE = 1 << 16
+#sources smaller than this are lexed serially even when workers are asked for, starting a
+#process pool costs more than it saves
+PARALLEL_MIN_SIZE = 1 << 20
+#output formats of the cli, and how much output is collected before it's written out
+FORMATS = ("text", "json", "ndjson", "binary")
+FLUSH_SIZE = 1 << 16
+#binary format: BINARY_MAGIC, a version byte, the number of token kinds, each kind name (length
+#byte + ascii), then one record per token: kind id (index into the names), start and end offset
+#(in characters of the source, with \r\n read as \n)
+BINARY_MAGIC = b"LOLT"
+BINARY_VERSION = 1
+binary_record = struct.Struct("<BII")
+
+#same characters as \w, used for the word boundary check
+def is_word_char(char):
+    return char.isalnum() or char == "_"
+
+#follows the trie from the first word of a multi-word keyword
+#returns the token type and where it ends, or None and where the words after it stopped matching
+def match_multi_word(code, node, position):
+    while True:
+        match = next_word_re.match(code, position)
+        if not match:
+            return None, position
+        node = node.get(match.group(1))
+        if node is None:
+            return None, position
+        position = match.end()
+        if isinstance(node, str):
+            return node, position
+
+#the text the lexer prints for a token, one line per part (nothing for skipped tokens)
+def format_token(type, value):
 
     if type == "TROOF_LITERAL":
         if value in ("WIN", "true"):
-            print(f"{TOKEN_LABELS['TROOF_TRUE']} {value} {value}")
+            return f"{TOKEN_LABELS['TROOF_TRUE']} {value} {value}\n"
         else:
-            print(f"{TOKEN_LABELS['TROOF_FALSE']} {value} {value}")
+            return f"{TOKEN_LABELS['TROOF_FALSE']} {value} {value}\n"
 
     elif type == "FLOAT_LITERAL":
-        print(f"Float Literal {value} {value}")
+        return f"Float Literal {value} {value}\n"
 
     elif type == "INTEGER_LITERAL":
-        print(f"Integer Literal {value} {value}")
+        return f"Integer Literal {value} {value}\n"
 
     elif type == "STRING":
         content = value.strip('"')
-        print('String Delimiter "')
-        print(f"String Literal {content} {content}") 
-        print('String Delimiter "')
+        return f'String Delimiter "\nString Literal {content} {content}\nString Delimiter "\n'
 
     elif type == "IDENTIFIER":
-        print(f"Variable Identifier {value}")
+        return f"Variable Identifier {value}\n"
 
     elif type in TOKEN_LABELS:
         #manually check for the multi-word op used in the test case
         if type in ("BIGGR_OF", "SMALLR_OF", "BOTH_SAEM", "DIFFRINT"):
-            print(f"Comparison Operator {value}")
+            return f"Comparison Operator {value}\n"
         elif type in ("SUM_OF", "DIFF_OF", "PRODUKT_OF", "QUOSHUNT_OF", "MOD_OF"):
-            print(f"Arithmetic Operator {value}")
+            return f"Arithmetic Operator {value}\n"
         else:
-            print(f"{TOKEN_LABELS[type]} {value}")
+            return f"{TOKEN_LABELS[type]} {value}\n"
 
     elif type in ("BTW", "WHITESPACE", "NEWLINE", "LINEBREAK"):
-        pass
+        return ""
+
+    else:
+        return f"Unknown token: {value}\n"
+
+def print_token(type, value):
+    print(format_token(type, value), end="")
 
+#classification shown for a token in the IDE's lexeme table
+def token_label(type, value):
+    if type == "IDENTIFIER":
+        return "Variable Identifier"
+    elif type == "INTEGER_LITERAL":
+        return "Integer Literal"
+    elif type == "FLOAT_LITERAL":
+        return "Float Literal"
+    elif type == "STRING":
+        return "String Literal"
+    elif type == "TROOF_LITERAL":
+        if value in ("WIN", "true"):
+            return "Boolean Value (True)"
+        else:
+            return "Boolean Value (False)"
     else:
-        print(f"Unknown token: {value}")
-    return
+        return TOKEN_LABELS.get(type, "Unknown")
 
 class Token:
+    __slots__ = ("type", "value", "line", "column")
+
     def __init__(self, type, value, line, column):
         self.type = type
         self.value = value
         self.line = line
         self.column = column
-        
-        if type == "IDENTIFIER":
-            self.label = "Variable Identifier"
-        elif type == "INTEGER_LITERAL":
-            self.label = "Integer Literal"
-        elif type == "FLOAT_LITERAL":
-            self.label = "Float Literal"
-        elif type == "STRING":
-            self.label = "String Literal"
-        elif type == "TROOF_LITERAL":
-            if value in ("WIN", "true"):
-                self.label = "Boolean Value (True)"
+
+    #only the token dump reads the label, so it's worked out when asked for
+    @property
+    def label(self):
+        return token_label(self.type, self.value)
+
+    def __repr__(self):
+        return f"Token({self.type}, {self.value}, {self.line}, {self.column})"
+
+#scans source text into (type, start, end, line, column) tuples, start/end being offsets into the text
+#whitespace, newlines and comments are consumed here and never yielded
+#the line/comment state is kept on the object so a source that arrives in pieces can be scanned
+#piece by piece (see iter_tokens)
+class Scanner:
+    def __init__(self):
+        self.position = 0
+        self.line_num = 1
+        self.line_start = 0
+        self.in_comment = False
+        #set to a list to have every line start recorded as (position, line_num, in_comment, reach),
+        #reach being how far the lexemes since the line start before it looked ahead (0 if they didn't
+        #look past their own line). see IncrementalLexer
+        self.checkpoints = None
+        self.reach = 0
+
+    #with final=False the text is only the beginning of the source. scanning then stops in front of
+    #the first lexeme that might still change once more text is added, and self.position says where
+    def scan(self, code, final=True):
+        match_lexeme = scan_re.match
+        in_comment = self.in_comment
+        position = self.position
+        line_num = self.line_num
+        line_start = self.line_start
+        checkpoints = self.checkpoints
+        reach = self.reach
+        code_len = len(code)
+        #a lexeme that had to look at the character at limit (which isn't there yet) is not complete
+        limit = code_len if not final else sys.maxsize
+
+        try:
+            while position < code_len:
+                match = match_lexeme(code, position)
+                kind = match.lastgroup
+                if kind is None:
+                    #only trailing spaces were left
+                    position = code_len
+                    break
+                start = match.start(kind)
+                end = match.end()
+
+                if kind == "WORD":
+                    if end >= limit:
+                        break
+                    if code.startswith("BTW", start):
+                        newline_pos = code.find('\n', start)
+                        if newline_pos == -1:
+                            if not final:
+                                break
+                            reach = code_len + 1
+                        position = newline_pos + 1 if newline_pos != -1 else code_len
+                        line_num += 1
+                        line_start = position
+                        if checkpoints is not None:
+                            checkpoints.append((position, line_num, in_comment, reach))
+                            reach = 0
+                        continue
+
+                    word = match.group(kind)
+                    #keywords need a word boundary in front, so after a number or a stray _ it's an identifier
+                    if start > position or start == 0 or not is_word_char(code[start - 1]):
+                        type = KEYWORDS.get(word)
+                        if type is None:
+                            node = MULTI_WORD_KEYWORDS.get(word)
+                            if node is not None:
+                                type, multi_end = match_multi_word(code, node, end)
+                                if type is not None:
+                                    end = multi_end
+                                    if end >= limit:
+                                        break
+                                else:
+                                    horizon = lookahead_re.match(code, multi_end).end()
+                                    if horizon >= limit:
+                                        break
+                                    if horizon >= reach:
+                                        reach = horizon + 1
+                            elif word == "HAI":
+                                horizon = lookahead_re.match(code, end).end()
+                                if horizon >= limit:
+                                    break
+                                if horizon >= reach:
+                                    reach = horizon + 1
+                                type = "HAI"
+                                end = hai_re.match(code, start).end()
+                            elif word == "O" or word.startswith("ORLY"):
+                                horizon = lookahead_re.match(code, end).end()
+                                if horizon >= limit:
+                                    break
+                                if horizon >= reach:
+                                    reach = horizon + 1
+                                orly = orly_re.match(code, start)
+                                if orly:
+                                    type = "ORLY"
+                                    end = orly.end()
+                            elif word.startswith("WTF"):
+                                type = "WTF"
+                                end = wtf_re.match(code, start).end()
+                        elif type == "OBTW":
+                            in_comment = True
+                            position = end
+                            continue
+                        elif type == "TLDR":
+                            in_comment = False
+                            position = end
+                            continue
+
+                    else:
+                        type = None
+
+                    if type is None:
+                        if word.startswith("newline"):
+                            #LINEBREAK, skipped like whitespace
+                            position = start + 7
+                            continue
+                        type = "IDENTIFIER"
+                        if not word.isascii():
+                            end = identifier_re.match(code, start).end()
+
+                elif kind == "NEWLINE":
+                    line_num += 1
+                    line_start = end
+                    position = end
+                    if checkpoints is not None:
+                        checkpoints.append((position, line_num, in_comment, reach))
+                        reach = 0
+                    continue
+                elif kind == "OTHER":
+                    char = code[start]
+                    if char == "+":
+                        type = "PLUS"
+                    else:
+                        #a " here starts a string that is never closed, which is only known once it was read
+                        #to the end. a - could still turn out to be a negative number
+                        stop = string_prefix_re.match(code, start).end() if char == '"' else start
+                        if stop + 1 >= limit:
+                            break
+                        if stop + 2 > reach:
+                            reach = stop + 2
+                        type = "UNKNOWN"
+                elif kind == "STRING":
+                    type = kind
+                else:
+                    #FLOAT_LITERAL or INTEGER_LITERAL, a number is only complete once a non-digit follows
+                    if end + 1 >= limit:
+                        break
+                    type = kind
+
+                if in_comment:
+                    value = code[start:end]
+                    if '\n' in value:
+                        line_num += value.count('\n')
+                        last_newline = value.rfind('\n')
+                        line_start = start + last_newline + 1
+                    position = end
+                    continue
+
+                yield type, start, end, line_num, start - line_start + 1
+                position = end
+        finally:
+            self.position = position
+            self.line_num = line_num
+            self.line_start = line_start
+            self.in_comment = in_comment
+            self.reach = reach
+
+#with workers > 1 a big source is lexed in that many processes (see lex_parallel), the tokens
+#are the same either way
+def get_tokens(code, workers=1):
+    #Token objects never reference each other, so the cyclic garbage collector only slows down
+    #building a big list of them. it's switched off while the list is built
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if workers <= 1 or len(code) < PARALLEL_MIN_SIZE:
+            return [Token(type, code[start:end], line, column) for type, start, end, line, column in Scanner().scan(code)]
+
+        tokens = []
+        for (types, starts, ends, lines, columns, state), line_shift in lex_parallel(code, workers):
+            tokens += [Token(TOKEN_TYPES[type], code[start:end], line + line_shift, column)
+                       for type, start, end, line, column in zip(types, starts, ends, lines, columns)]
+        return tokens
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+#lexes text from position on with the scanner in the given state, text being the piece of a
+#bigger source starting at offset base (position and line_start are offsets into text). gives
+#the token arrays of a TokenStream, with offsets into the whole source, and the state the scanner
+#stopped in as (position, line_start, line_num, in_comment), again with whole-source offsets.
+#this is what the workers of lex_parallel run
+def lex_shard(text, base, position, line_start, line_num, in_comment, final=True):
+    scanner = Scanner()
+    scanner.position = position
+    scanner.line_start = line_start
+    scanner.line_num = line_num
+    scanner.in_comment = in_comment
+    types = array("B")
+    starts = array("q")
+    ends = array("q")
+    lines = array("I")
+    columns = array("I")
+
+    add_type = types.append
+    add_start = starts.append
+    add_end = ends.append
+    add_line = lines.append
+    add_column = columns.append
+    for type, start, end, line, column in scanner.scan(text, final):
+        add_type(TYPE_IDS[type])
+        add_start(base + start)
+        add_end(base + end)
+        add_line(line)
+        add_column(column)
+    state = (base + scanner.position, base + scanner.line_start, scanner.line_num, scanner.in_comment)
+    return types, starts, ends, lines, columns, state
+
+#guesses whether offset is inside an OBTW..TLDR comment from the last of the two before it.
+#an OBTW or TLDR in a string or a BTW comment fools it, lex_parallel catches that
+def guess_in_comment(code, offset):
+    opened = code.rfind("OBTW", 0, offset)
+    return opened != -1 and opened > code.rfind("TLDR", 0, offset)
+
+#lexes code in a process pool. the source is cut into shards after newlines and every shard is
+#lexed on its own as if it started at line 1, in the comment state guess_in_comment gives. the
+#shards are then checked in order: one is only kept if the shard before it stopped right at its
+#start, at a line start, in the guessed comment state. otherwise (a string or multi-word keyword
+#going over the cut, a wrong guess) it's lexed again here from where the one before stopped.
+#gives a (lex_shard result, line number shift) per shard, the line numbers of a shard lexed on
+#its own are only right after adding the shift
+def lex_parallel(code, workers):
+    cuts = [0]
+    for i in range(1, workers):
+        cut = code.find("\n", max(cuts[-1], len(code) * i // workers)) + 1
+        if cut == 0 or cut >= len(code):
+            break
+        if cut > cuts[-1]:
+            cuts.append(cut)
+    cuts.append(len(code))
+    last = len(cuts) - 2
+    guesses = [guess_in_comment(code, cut) for cut in cuts[:-1]]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(lex_shard, code[cuts[i]:cuts[i + 1]], cuts[i], 0, 0, 1, guesses[i], i == last)
+                   for i in range(last + 1)]
+        state = (0, 0, 1, False)
+        for i, future in enumerate(futures):
+            result = future.result()
+            position, line_start, line_num, in_comment = state
+            if position == cuts[i] and line_start == position and in_comment == guesses[i]:
+                line_shift = line_num - 1
             else:
-                self.label = "Boolean Value (False)"
-        else:
-            self.label = TOKEN_LABELS.get(type, "Unknown")
+                #the character before is kept for the word boundary check
+                start = max(position - 1, 0)
+                result = lex_shard(code[start:cuts[i + 1]], start, position - start, line_start - start,
+                                   line_num, in_comment, i == last)
+                line_shift = 0
+            results.append((result, line_shift))
+            position, line_start, line_num, in_comment = result[5]
+            state = (position, line_start, line_num + line_shift, in_comment)
+    return results
+
+#yields tokens while reading the source, so a huge file never has to be in memory all at once
+#source can be a str, a file object (text or binary), an mmap or any other bytes-like object
+def iter_tokens(source, chunk_size=CHUNK_SIZE):
+    for type, value, start, end, line, column in iter_lexemes(source, chunk_size):
+        yield Token(type, value, line, column)
+
+#same as iter_tokens, but gives (type, value, start, end, line, column) with start/end being
+#offsets into the whole (decoded) source
+def iter_lexemes(source, chunk_size=CHUNK_SIZE):
+    if isinstance(source, str):
+        for type, start, end, line, column in Scanner().scan(source):
+            yield type, source[start:end], start, end, line, column
+        return
+
+    scanner = Scanner()
+    buffer = ""
+    #offset of the buffer in the source
+    base = 0
+    rescan_size = 0
+    for chunk in read_chunks(source, chunk_size):
+        buffer += chunk
+        #a lexeme longer than a chunk (like a string that's never closed) waits until the buffer
+        #doubled instead of being rescanned after every chunk
+        if len(buffer) < rescan_size:
+            continue
+        for type, start, end, line, column in scanner.scan(buffer, final=False):
+            yield type, buffer[start:end], base + start, base + end, line, column
+
+        #drop what was scanned, but keep the character before the next lexeme for the word boundary check
+        keep = max(scanner.position - 1, 0)
+        buffer = buffer[keep:]
+        base += keep
+        scanner.position -= keep
+        scanner.line_start -= keep
+        rescan_size = 2 * len(buffer)
+
+    for type, start, end, line, column in scanner.scan(buffer):
+        yield type, buffer[start:end], base + start, base + end, line, column
+
+#all tokens of a source in a few flat arrays instead of one Token object each: the type id, the
+#start/end offsets into the source, the line and the column. a lexeme is only sliced out of the
+#source (and a label only worked out) when it's read. indexing gives a TokenView, which reads
+#like a Token, so a TokenStream can be used wherever a list of tokens was
+class TokenStream:
+    #arrays is (types, starts, ends, lines, columns) of an earlier lex of the same code, which
+    #are used as they are (see cache.py)
+    def __init__(self, code, workers=1, arrays=None):
+        self.code = code
+        self.last_view = None
+
+        if arrays is not None:
+            self.types, self.starts, self.ends, self.lines, self.columns = arrays
+            return
+        if workers <= 1 or len(code) < PARALLEL_MIN_SIZE:
+            self.types, self.starts, self.ends, self.lines, self.columns, state = lex_shard(code, 0, 0, 0, 1, False)
+            return
+
+        self.types = array("B")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.lines = array("I")
+        self.columns = array("I")
+        for (types, starts, ends, lines, columns, state), line_shift in lex_parallel(code, workers):
+            self.types += types
+            self.starts += starts
+            self.ends += ends
+            self.lines += array("I", [line + line_shift for line in lines]) if line_shift else lines
+            self.columns += columns
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TokenView(self, i) for i in range(*index.indices(len(self.types)))]
+        #the parser asks for the same token several times in a row, so the last view is reused
+        view = self.last_view
+        if view is not None and view.index == index:
+            return view
+        if index < 0:
+            index += len(self.types)
+            if index < 0:
+                raise IndexError("token index out of range")
+        view = TokenView(self, index)
+        self.last_view = view
+        return view
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield TokenView(self, index)
+
+    #(type, value, start, end, line, column) for every token, like iter_lexemes gives
+    def spans(self):
+        code = self.code
+        for id, start, end, line, column in zip(self.types, self.starts, self.ends, self.lines, self.columns):
+            yield TOKEN_TYPES[id], code[start:end], start, end, line, column
+
+    def type_at(self, index):
+        return TOKEN_TYPES[self.types[index]]
+
+    def value_at(self, index):
+        return self.code[self.starts[index]:self.ends[index]]
+
+#one token of a TokenStream
+class TokenView:
+    __slots__ = ("stream", "index", "type")
+
+    def __init__(self, stream, index):
+        self.stream = stream
+        self.index = index
+        #the type is read far more than anything else, so it's looked up right away
+        #(this also raises the IndexError for an index past the end)
+        self.type = TOKEN_TYPES[stream.types[index]]
+
+    @property
+    def value(self):
+        return self.stream.value_at(self.index)
+
+    @property
+    def line(self):
+        return self.stream.lines[self.index]
+
+    @property
+    def column(self):
+        return self.stream.columns[self.index]
+
+    @property
+    def label(self):
+        return token_label(self.type, self.value)
 
     def __repr__(self):
         return f"Token({self.type}, {self.value}, {self.line}, {self.column})"
 
-def get_tokens(code):
-    tokens = []
-    in_comment = False
-    position = 0
-    line_num = 1
-    line_start = 0
-
-    while position < len(code):
-        match = token_re.match(code, position)
-        
-        if match:
-            type = match.lastgroup
-            value = match.group()
-            
-            # Calculate column
-            column = position - line_start + 1
-
-            if type == "NEWLINE":
-                line_num += 1
-                line_start = match.end()
-                position = match.end()
-                continue
-            
-            if type == "BTW":
-                newline_pos = code.find('\n', position)
-                position = newline_pos + 1 if newline_pos != -1 else len(code)
-                line_num += 1
-                line_start = position
-                continue
-            elif type == "OBTW":
-                in_comment = True
-                position = match.end()
-                continue
-            elif type == "TLDR":
-                in_comment = False
-                position = match.end()
-                continue
-                
-            if in_comment:
-                if '\n' in value:
-                     line_num += value.count('\n')
-                     last_newline = value.rfind('\n')
-                     line_start = position + last_newline + 1
-                position = match.end()
-                continue
-            
-            if type in ("WHITESPACE", "LINEBREAK"):
-                position = match.end()
-                continue
-
-            tokens.append(Token(type, value, line_num, column))
-            position = match.end()
-            
+#one line of an IncrementalLexer, from one line start the scanner recorded up to the next. a
+#multi-word keyword or a string running over a newline keeps those lines together as one.
+#tokens are (type, start, end, line, column) with start/end relative to the start of the line and
+#line relative to its first line number, so lines can be moved around without touching them.
+#reach is how far (relative again) the lexemes of the line looked at the source, at least its length
+class LexedLine:
+    __slots__ = ("length", "line_count", "in_comment", "reach", "tokens")
+
+    def __init__(self, length, line_count, in_comment, reach, tokens):
+        self.length = length
+        self.line_count = line_count
+        self.in_comment = in_comment
+        self.reach = reach
+        self.tokens = tokens
+
+#keeps the tokens of a source that's being edited (for the ide) and only re-lexes around an edit.
+#an edit starts lexing again from the first line whose lexemes could have looked at the edited
+#text, with the state (line number, OBTW comment) saved at the start of that line, and stops as
+#soon as it's back at an old line start past the edit in the same state. everything after that
+#is kept as is
+class IncrementalLexer:
+    def __init__(self, code=""):
+        self.code = code
+        #running totals over self.lines, entry i being for everything before line i: the offset
+        #into the source, the line number, the number of tokens and the farthest reach. an edit
+        #throws away the entries after the line it re-lexed from, they're filled in again on demand
+        self.line_offsets = [0]
+        self.line_numbers = [1]
+        self.token_offsets = [0]
+        self.reaches = [0]
+        #line the last token_at was in
+        self.last_line = 0
+        self.lines, stopped, position, line_num = self.lex(code, 0, 1, False)
+
+    #lexes code from a line start in the given state into LexedLines, until the end or until
+    #resync(position, in_comment) says yes at a line start. returns the lines, whether it was
+    #stopped, and the position and line number it ended at
+    def lex(self, code, position, line_num, in_comment, resync=None):
+        scanner = Scanner()
+        scanner.position = scanner.line_start = position
+        scanner.line_num = line_num
+        scanner.in_comment = in_comment
+        checkpoints = scanner.checkpoints = []
+        lines = []
+        tokens = []
+        start = position
+        start_line = line_num
+        done = 0
+        scan = scanner.scan(code)
+
+        #None marks the end, so the line starts recorded after the last token are handled too
+        for token in chain(scan, (None,)):
+            #line starts are recorded before the token after them is given back
+            while done < len(checkpoints):
+                position, line_num, next_in_comment, reach = checkpoints[done]
+                done += 1
+                lines.append(LexedLine(position - start, line_num - start_line, in_comment, max(position, reach) - start,
+                                       [(type, token_start - start, end - start, line - start_line, column)
+                                        for type, token_start, end, line, column in tokens]))
+                tokens = []
+                start = position
+                start_line = line_num
+                in_comment = next_in_comment
+                if resync is not None and resync(position, in_comment):
+                    scan.close()
+                    return lines, True, position, line_num
+            if token is None:
+                break
+            tokens.append(token)
+
+        #the last line (usually an empty one after the last newline) also looked at the end of the source
+        lines.append(LexedLine(len(code) - start, scanner.line_num - start_line, in_comment,
+                               max(len(code) + 1, scanner.reach) - start,
+                               [(type, token_start - start, end - start, line - start_line, column)
+                                for type, token_start, end, line, column in tokens]))
+        return lines, False, len(code), scanner.line_num
+
+    #fills in the running totals up to and including entry index
+    def extend_totals(self, index):
+        offsets = self.line_offsets
+        numbers = self.line_numbers
+        counts = self.token_offsets
+        reaches = self.reaches
+        for i in range(len(offsets) - 1, min(index, len(self.lines))):
+            line = self.lines[i]
+            offsets.append(offsets[i] + line.length)
+            numbers.append(numbers[i] + line.line_count)
+            counts.append(counts[i] + len(line.tokens))
+            reaches.append(max(reaches[i], offsets[i] + line.reach))
+
+    #index of the line the offset is in (the last line for the end of the source)
+    def line_index(self, offset):
+        offsets = self.line_offsets
+        while offsets[-1] <= offset and len(offsets) <= len(self.lines):
+            self.extend_totals(len(offsets) + 64)
+        return min(bisect_right(offsets, offset) - 1, len(self.lines) - 1)
+
+    #tokens of lines first..stop-1 with absolute offsets and line numbers
+    def line_tokens(self, lines, offset, line_num):
+        tokens = []
+        for line in lines:
+            tokens.extend((type, start + offset, end + offset, line_no + line_num, column)
+                          for type, start, end, line_no, column in line.tokens)
+            offset += line.length
+            line_num += line.line_count
+        return tokens
+
+    #replaces removed characters from offset start with inserted. returns (first, old_stop, new_stop):
+    #tokens first..old_stop-1 of the old token list were replaced by tokens first..new_stop-1 of the
+    #new one, and every token after that only moved
+    def edit(self, start, removed, inserted):
+        code = self.code
+        if start < 0 or removed < 0 or start + removed > len(code):
+            raise ValueError(f"Edit ({start}, {removed}) is outside of the source (length {len(code)})")
+
+        new_code = code[:start] + inserted + code[start + removed:]
+        delta = len(inserted) - removed
+        lines = self.lines
+        offsets = self.line_offsets
+        k = self.line_index(start)
+        #the lines before the first one whose reach goes past the edit can't change
+        r = bisect_right(self.reaches, start, 0, k + 1) - 1
+        m = k
+
+        def resync(position, in_comment):
+            nonlocal m
+            if position < start + len(inserted):
+                return False
+            old = position - delta
+            while m < len(lines):
+                if m >= len(offsets):
+                    self.extend_totals(m + 64)
+                if offsets[m] >= old:
+                    break
+                m += 1
+            return m < len(lines) and offsets[m] == old and lines[m].in_comment == in_comment
+
+        new_lines, stopped, position, line_num = self.lex(new_code, offsets[r], self.line_numbers[r], lines[r].in_comment, resync)
+        if not stopped:
+            m = len(lines)
+        self.extend_totals(m)
+        line_shift = line_num - self.line_numbers[m]
+
+        #the re-lexed lines usually give back some of the same tokens at the start and the end
+        old_tokens = self.line_tokens(lines[r:m], offsets[r], self.line_numbers[r])
+        new_tokens = self.line_tokens(new_lines, offsets[r], self.line_numbers[r])
+        same = 0
+        #(a token running over the edit can keep its offsets and still change)
+        while (same < len(old_tokens) and same < len(new_tokens) and old_tokens[same] == new_tokens[same]
+               and (old_tokens[same][2] <= start or code[old_tokens[same][1]:old_tokens[same][2]] == new_code[new_tokens[same][1]:new_tokens[same][2]])):
+            same += 1
+        moved = 0
+        while moved < len(old_tokens) - same and moved < len(new_tokens) - same:
+            type, token_start, end, line, column = old_tokens[-1 - moved]
+            if (type, token_start + delta, end + delta, line + line_shift, column) != new_tokens[-1 - moved]:
+                break
+            if token_start < start + removed and code[token_start:end] != new_code[token_start + delta:end + delta]:
+                break
+            moved += 1
+
+        first = self.token_offsets[r] + same
+        old_stop = self.token_offsets[m] - moved
+        new_stop = self.token_offsets[r] + len(new_tokens) - moved
+
+        lines[r:m] = new_lines
+        del self.line_offsets[r + 1:], self.line_numbers[r + 1:], self.token_offsets[r + 1:], self.reaches[r + 1:]
+        self.last_line = 0
+        self.code = new_code
+        return first, old_stop, new_stop
+
+    #token index as (type, start, end, line, column) with absolute offsets and line number,
+    #raises IndexError past the last token. reading tokens in order only looks up their line once
+    def token_at(self, index):
+        k = self.last_line
+        counts = self.token_offsets
+        if not (k < len(counts) - 1 and counts[k] <= index < counts[k + 1]):
+            if index < 0:
+                raise IndexError(index)
+            while counts[-1] <= index and len(counts) <= len(self.lines):
+                self.extend_totals(len(counts) + 64)
+            k = bisect_right(counts, index) - 1
+            if k >= len(self.lines) or index - counts[k] >= len(self.lines[k].tokens):
+                raise IndexError(index)
+            self.last_line = k
+        type, start, end, line, column = self.lines[k].tokens[index - counts[k]]
+        offset = self.line_offsets[k]
+        return type, start + offset, end + offset, line + self.line_numbers[k], column
+
+    #all tokens as a list of Token, the same get_tokens(self.code) would give
+    def get_tokens(self):
+        code = self.code
+        return [Token(type, code[start:end], line, column)
+                for type, start, end, line, column in self.line_tokens(self.lines, 0, 1)]
+
+#splits a source into decoded text chunks. bytes are decoded as utf-8 with the same newline
+#translation open(path, "r") does, so \r\n files give the same tokens either way
+def read_chunks(source, chunk_size):
+    if not hasattr(source, "read"):
+        #bytes, bytearray or memoryview. mmap and file objects have read() already
+        source = io.BytesIO(source)
+    decoder = None
+
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if not isinstance(chunk, str):
+            if decoder is None:
+                decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+            chunk = decoder.decode(chunk)
+        yield chunk
+
+    if decoder is not None:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+#writes tokens to a binary stream in one of FORMATS. everything goes through one buffer that's
+#only written out once flush_size bytes are waiting (0 writes every token right away), instead of
+#a print per line
+class TokenWriter:
+    def __init__(self, out, format="text", flush_size=FLUSH_SIZE):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown token format '{format}'")
+        self.out = out
+        self.format = format
+        self.flush_size = flush_size
+        self.parts = []
+        self.size = 0
+        self.count = 0
+
+        if format == "binary":
+            header = bytearray(BINARY_MAGIC)
+            header += bytes((BINARY_VERSION, len(TOKEN_TYPES)))
+            for name in TOKEN_TYPES:
+                header.append(len(name))
+                header += name.encode("ascii")
+            self.add(bytes(header))
+        elif format == "json":
+            self.add(b"[")
+
+    def add(self, data):
+        self.parts.append(data)
+        self.size += len(data)
+        if self.size >= self.flush_size:
+            self.flush()
+
+    def write(self, type, value, start, end, line, column):
+        format = self.format
+        if format == "text":
+            text = format_token(type, value)
+            if text:
+                self.add(text.encode("utf-8"))
+        elif format == "binary":
+            self.add(binary_record.pack(TYPE_IDS[type], start, end))
         else:
-            # Handle unknown character
-            unknown_char = code[position]
-            if unknown_char == '\n':
-                line_num += 1
-                line_start = position + 1
+            #the lexeme and the classification are the fields the IDE's token table reads
+            text = (f'{{"type":"{type}","lexeme":{json.dumps(value, ensure_ascii=False)},'
+                    f'"classification":"{token_label(type, value)}","line":{line},"column":{column},'
+                    f'"start":{start},"end":{end}}}')
+            if format == "ndjson":
+                text += "\n"
+            elif self.count:
+                #one token per line keeps the array from turning into one giant line
+                text = ",\n" + text
             else:
-                print(f"Unknown token: {unknown_char}")
-            position += 1
-            
-    return tokens
+                text = "\n" + text
+            self.add(text.encode("utf-8"))
+        self.count += 1
+
+    def flush(self):
+        if self.parts:
+            self.out.write(b"".join(self.parts))
+            self.parts = []
+            self.size = 0
+        self.out.flush()
+
+    #ends the output (closes the json array) and writes out what's left
+    def close(self):
+        if self.format == "json":
+            self.add(b"\n]\n" if self.count else b"]\n")
+        self.flush()
 
-def tokenize(code):
-    tokens = get_tokens(code)
-    for token in tokens:
-        print_token(token.type, token.value)
+#reads back the binary format, giving (type, start, end) per token
+def read_binary_tokens(data):
+    data = memoryview(data)
+    if bytes(data[:len(BINARY_MAGIC)]) != BINARY_MAGIC or data[len(BINARY_MAGIC)] != BINARY_VERSION:
+        raise ValueError("Not a binary token stream")
+    position = len(BINARY_MAGIC) + 2
+    names = []
+    for _ in range(data[len(BINARY_MAGIC) + 1]):
+        length = data[position]
+        names.append(bytes(data[position + 1:position + 1 + length]).decode("ascii"))
+        position += 1 + length
+    if (len(data) - position) % binary_record.size:
+        raise ValueError("Truncated binary token stream")
+    for id, start, end in binary_record.iter_unpack(data[position:]):
+        yield names[id], start, end
+
+#source can be anything iter_tokens accepts, tokens are written as soon as they're read.
+#with workers > 1 the whole source is read first and lexed in parallel
+def tokenize(source, format="text", flush_size=FLUSH_SIZE, out=None, workers=1):
+    if out is None:
+        sys.stdout.flush()
+        out = sys.stdout.buffer
+    if workers > 1:
+        code = source if isinstance(source, str) else "".join(read_chunks(source, CHUNK_SIZE))
+        lexemes = TokenStream(code, workers).spans()
+    else:
+        lexemes = iter_lexemes(source)
+    writer = TokenWriter(out, format, flush_size)
+    try:
+        for type, value, start, end, line, column in lexemes:
+            writer.write(type, value, start, end, line, column)
+    finally:
+        writer.close()
 
 def main():
     #use argv to only provide input during runtime
-    if len(sys.argv) != 2:
-        print("Wrong format", file=sys.stderr)
-        sys.exit(2)
-    
-    path = sys.argv[1] 
+    arg_parser = argparse.ArgumentParser(description="Prints the tokens of a LOLCODE file")
+    arg_parser.add_argument("path", help="the .lol file, or - to read stdin")
+    arg_parser.add_argument("--format", choices=FORMATS, default="text",
+                            help="text (default, for people), json (one array), ndjson (one object per line) "
+                                 "or binary (kind ids and offsets)")
+    arg_parser.add_argument("--flush-size", type=int, default=FLUSH_SIZE,
+                            help=f"bytes of output collected before it's written (default {FLUSH_SIZE})")
+    arg_parser.add_argument("--jobs", type=int, default=1,
+                            help="processes to lex a big file with (default 1)")
+    args = arg_parser.parse_args()
+    if args.flush_size < 0:
+        arg_parser.error("--flush-size can't be negative")
+    if args.jobs < 1:
+        arg_parser.error("--jobs has to be at least 1")
+
+    path = args.path
 
     if path == "-":
-        code = sys.stdin.read()
+        tokenize(sys.stdin, args.format, args.flush_size, workers=args.jobs)
     else:
         if not path.lower().endswith(".lol"):
             print("Error: Input file is not a LOLCODE file (.lol)", file=sys.stderr)
             sys.exit(2)
         try:
             with open(path, "r", encoding="utf-8") as f:
-                code = f.read()
-        except Exception:
+                tokenize(f, args.format, args.flush_size, workers=args.jobs)
+        except (OSError, UnicodeDecodeError):
             print(f"Error reading {path}", file=sys.stderr)
             sys.exit(1)
-    
-    tokenize(code)
 
 if __name__ == "__main__":
     main()
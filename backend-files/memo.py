@@ -0,0 +1,215 @@
+from collections import OrderedDict
+
+from ast_nodes import (VAR_BLOCK, VAR_DECL, ASSIGNMENT, TYPE_CAST, INPUT, VISIBLE, IF_STMT, SWITCH_STMT, LOOP,
+                       FUNC_DEF, FUNC_CALL, RETURN, OPERAND, expression_operands)
+from semantics1 import Types
+
+#memoization of pure functions for Interpreter.execute_func_call. a HOW IZ I is pure when what it
+#gives only depends on its arguments and running it changes nothing else:
+#   - it reads only its parameters, variables it declared before, and IT once something in the
+#     call set it (IT at the start is the caller's)
+#   - it writes only those, and has no VISIBLE, GIMMEH or HOW IZ I
+#   - the functions it calls are pure too
+#every pure function gets a MemoCache, a least recently used table of what calls with the same
+#(value, type) arguments gave. defining a function forgets all of them, the new one can change
+#what the others give.
+#
+#   python semantics1.py program.lol --memoize                (the functions found pure)
+#   python semantics1.py program.lol --memoize=fib,ack       (these too, pure or not)
+#   python semantics1.py program.lol --memoize --no-memoize=f --memo-size=100
+
+# entries a MemoCache keeps before it drops the least recently used one
+MEMO_SIZE = 4096
+
+# whether the variables an expression reads are all in known, and IT only if it_known
+def reads_only(node, known, it_known):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if node.tag == OPERAND:
+            if node.kind == 'IDENTIFIER' and node.value not in known:
+                return False
+            if node.kind == 'IT' and not it_known:
+                return False
+        else:
+            stack.extend(expression_operands(node))
+    return True
+
+# whether statements only work with the variables in known (see reads_only) and call only the
+# functions named in pure. declarations add to known from there on, not outside the block
+class PurityCheck:
+    def __init__(self, pure):
+        self.pure = pure
+
+    def function(self, func):
+        return self.block(func.body, set(func.params), False) is not None
+
+    # whether IT is known after the statements, None if they aren't pure
+    def block(self, statements, known, it_known):
+        known = set(known)
+        for stmt in statements:
+            it_known = self.statement(stmt, known, it_known)
+            if it_known is None:
+                return None
+        return it_known
+
+    def statement(self, stmt, known, it_known):
+        if stmt is None:
+            return it_known
+        tag = stmt.tag
+        if tag == VAR_DECL:
+            if not reads_only(stmt.value, known, it_known):
+                return None
+            known.add(stmt.name)
+        elif tag == ASSIGNMENT:
+            if not reads_only(stmt.expr, known, it_known):
+                return None
+            if stmt.target == 'IT':
+                return True
+            if stmt.target not in known:
+                return None
+        elif tag == TYPE_CAST:
+            if stmt.target not in known:
+                return None
+        elif tag == INPUT or tag == VISIBLE or tag == FUNC_DEF:
+            return None
+        elif tag == IF_STMT:
+            # O RLY? goes by IT, and a MEBBE sets it
+            if not it_known:
+                return None
+            if self.block(stmt.true_block, known, True) is None:
+                return None
+            for else_if in stmt.else_if_blocks:
+                if not reads_only(else_if.condition, known, True) or self.block(else_if.body, known, True) is None:
+                    return None
+            if self.block(stmt.else_block, known, True) is None:
+                return None
+        elif tag == SWITCH_STMT:
+            if not it_known:
+                return None
+            for case in stmt.cases:
+                if self.block(case.body, known, True) is None:
+                    return None
+            if self.block(stmt.default, known, True) is None:
+                return None
+        elif tag == LOOP:
+            if stmt.operation and stmt.operation.variable not in known:
+                return None
+            if stmt.condition and not reads_only(stmt.condition.expr, known, it_known):
+                return None
+            if self.block(stmt.body, known, it_known) is None:
+                return None
+        elif tag == FUNC_CALL:
+            if stmt.name not in self.pure:
+                return None
+            if not all(reads_only(arg, known, it_known) for arg in stmt.args):
+                return None
+            # the call sets IT
+            return True
+        elif tag == RETURN:
+            if not reads_only(stmt.value, known, it_known):
+                return None
+        elif tag == VAR_BLOCK:
+            for inner in stmt.body:
+                it_known = self.statement(inner, known, it_known)
+                if it_known is None:
+                    return None
+        return it_known
+
+# the names of the functions (name -> FuncDef) that are pure, counting the ones in assumed as
+# pure. every function is taken to be pure until one it calls turns out not to be, so functions
+# calling themselves or each other can be
+def pure_functions(functions, assumed=()):
+    pure = set(functions) | set(assumed)
+    changed = True
+    while changed:
+        changed = False
+        check = PurityCheck(pure)
+        for name, func in functions.items():
+            if name in pure and name not in assumed and not check.function(func):
+                pure.discard(name)
+                changed = True
+    return pure
+
+# what the calls of one function gave, by their arguments
+class MemoCache:
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # the key of the (value, type) arguments of a call, None if it can't have one: 0.0 and -0.0
+    # are equal as keys but don't print the same, and a NaN isn't equal to itself
+    def key(self, args):
+        for value, type in args:
+            if type == Types.NUMBAR and (value == 0 or value != value):
+                return None
+        return tuple(args)
+
+    # what the call gave (its IT), None if it isn't in the table
+    def get(self, key):
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        self.entries[key] = result
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+# picks the functions Interpreter.execute_func_call memoizes (set it as the interpreter's
+# memoizer). force are names memoized even if they aren't found pure, forbid never are
+class Memoizer:
+    def __init__(self, size=MEMO_SIZE, force=(), forbid=()):
+        self.size = size
+        self.force = set(force)
+        self.forbid = set(forbid)
+        # FuncDef -> its MemoCache, None if it isn't memoized
+        self.caches = {}
+        # names of the pure functions, worked out when a call first needs it
+        self.pure = None
+        # every MemoCache made, for report
+        self.made = []
+
+    # the MemoCache of func, functions is what's defined (the interpreter's functions)
+    def cache_for(self, func, functions):
+        if func in self.caches:
+            return self.caches[func]
+        if self.pure is None:
+            self.pure = pure_functions(functions, self.force)
+        cache = None
+        name = func.name
+        if name in self.pure and name not in self.forbid:
+            cache = MemoCache(name, self.size)
+            self.made.append(cache)
+        self.caches[func] = cache
+        return cache
+
+    # a function got defined, what every function gives can be different now
+    def forget(self):
+        self.caches = {}
+        self.pure = None
+
+    # a line of hits and misses for every function memoized (over all its MemoCaches, kept is
+    # what the last one has)
+    def report(self):
+        totals = {}
+        for cache in self.made:
+            hits, misses, kept = totals.get(cache.name, (0, 0, 0))
+            totals[cache.name] = (hits + cache.hits, misses + cache.misses, len(cache.entries))
+        lines = []
+        for name, (hits, misses, kept) in totals.items():
+            calls = hits + misses
+            rate = 100 * hits / calls if calls else 0
+            lines.append(f"memoized {name}: {hits} hits, {misses} misses ({rate:.0f}% hits), {kept} kept")
+        if not lines:
+            lines.append("memoized no functions")
+        return lines
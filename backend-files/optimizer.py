@@ -0,0 +1,227 @@
+from ast_nodes import (VAR_BLOCK, VAR_DECL, ASSIGNMENT, VISIBLE, IF_STMT, SWITCH_STMT, LOOP, FUNC_DEF,
+                       FUNC_CALL, RETURN, BINARY_OP, N_ARY_OP, UNARY_OP, MAEK, OPERAND, SwitchStmt, Operand,
+                       expression_operands, has_break)
+from semantics1 import Interpreter, Types
+
+#optional pass over the AST of Parser.parse() before it runs:
+#   - operators whose operands are all literals are worked out once and become a literal
+#   - literals next to each other in a SMOOSH are joined into one
+#   - an O RLY? or WTF? right after a literal bare expression (so IT is known) keeps only the
+#     branch it takes, and a loop whose TIL/WILE is a literal that stops it right away is dropped
+#the values come from the interpreter's own operators and cast_value, so a folded program prints
+#exactly what the original does. an operation that fails (QUOSHUNT OF 1 AN 0) is left for the
+#interpreter to fail on when it gets there. report has a line for every change
+
+# the literal operand kinds and the type their value has
+LITERAL_TYPES = {
+    'INTEGER_LITERAL': Types.NUMBR,
+    'FLOAT_LITERAL': Types.NUMBAR,
+    'STRING': Types.YARN,
+    'TROOF_LITERAL': Types.TROOF,
+}
+# the operand kind for a value of a type, and the python type the value has to have
+LITERAL_KINDS = {
+    Types.NUMBR: ('INTEGER_LITERAL', int),
+    Types.NUMBAR: ('FLOAT_LITERAL', float),
+    Types.YARN: ('STRING', str),
+    Types.TROOF: ('TROOF_LITERAL', bool),
+}
+
+def is_literal(node):
+    return node is not None and node.tag == OPERAND and node.kind in LITERAL_TYPES
+
+# sets the operand nodes of an expression node, the same order expression_operands gives them
+def set_operands(node, operands):
+    tag = node.tag
+    if tag == BINARY_OP:
+        node.left, node.right = operands
+    elif tag == N_ARY_OP:
+        node.operands = operands
+    elif tag == UNARY_OP:
+        node.operand = operands[0]
+    elif tag == MAEK:
+        node.expr = operands[0]
+
+class Optimizer:
+    def __init__(self):
+        # only its operators and cast_value are used
+        self.interpreter = Interpreter()
+        self.report = []
+
+    def optimize(self, program):
+        program.body = list(self.optimized(program.body))
+        return program
+
+    # the statements of a block, optimized. a generator so a program can be optimized a statement
+    # at a time while it's parsed (see Interpreter.execute_stream)
+    def optimized(self, statements):
+        previous = None
+        for stmt in statements:
+            for result in self.optimize_statement(stmt, previous):
+                yield result
+                previous = result
+
+    # what stmt becomes (a list of statements), previous is the one that runs right before it
+    def optimize_statement(self, stmt, previous):
+        if stmt is None:
+            return [stmt]
+        tag = stmt.tag
+        if tag == VAR_DECL or tag == RETURN:
+            stmt.value = self.fold(stmt.value, stmt.line)
+        elif tag == ASSIGNMENT:
+            stmt.expr = self.fold(stmt.expr, stmt.line)
+        elif tag == VISIBLE or tag == FUNC_CALL:
+            stmt.args = [self.fold(arg, stmt.line) for arg in stmt.args]
+        elif tag == VAR_BLOCK or tag == FUNC_DEF:
+            stmt.body = list(self.optimized(stmt.body))
+        elif tag == IF_STMT:
+            return self.optimize_if(stmt, previous)
+        elif tag == SWITCH_STMT:
+            return self.optimize_switch(stmt, previous)
+        elif tag == LOOP:
+            return self.optimize_loop(stmt)
+        return [stmt]
+
+    # the value of IT before stmt, if previous is a bare expression that's a literal. None if not known
+    def known_it(self, previous):
+        if previous is not None and previous.tag == ASSIGNMENT and previous.target == 'IT' and is_literal(previous.expr):
+            return self.interpreter.evaluate_operand(previous.expr)
+        return None
+
+    def optimize_if(self, stmt, previous):
+        stmt.true_block = list(self.optimized(stmt.true_block))
+        for else_if in stmt.else_if_blocks:
+            else_if.condition = self.fold(else_if.condition, stmt.line)
+            else_if.body = list(self.optimized(else_if.body))
+        stmt.else_block = list(self.optimized(stmt.else_block))
+
+        it = self.known_it(previous)
+        if it is None:
+            return [stmt]
+        if self.interpreter.cast_value(it[0], it[1], Types.TROOF):
+            block, branch = stmt.true_block, "YA RLY"
+        elif not stmt.else_if_blocks:
+            block, branch = stmt.else_block, "NO WAI"
+        else:
+            # the MEBBE conditions still have to be worked out (they set IT), only YA RLY can go
+            if stmt.true_block:
+                self.report.append(f"Line {stmt.line}: O RLY? never takes YA RLY, dropped it")
+                stmt.true_block = []
+            return [stmt]
+
+        # a GTFO in it ends the same loop, WTF? or function without the O RLY? around it
+        self.report.append(f"Line {stmt.line}: O RLY? always takes {branch}, replaced it with that branch")
+        return block
+
+    def optimize_switch(self, stmt, previous):
+        for case in stmt.cases:
+            case.body = list(self.optimized(case.body))
+        stmt.default = list(self.optimized(stmt.default))
+
+        it = self.known_it(previous)
+        if it is None:
+            return [stmt]
+        case = self.interpreter.matching_case(stmt, it[0], it[1])
+        block = case.body if case is not None else stmt.default
+        branch = f"OMG {case.value}" if case is not None else "OMGWTF"
+
+        if has_break(block):
+            self.report.append(f"Line {stmt.line}: WTF? always takes {branch}, dropped the other cases")
+            if case is not None:
+                return [SwitchStmt([case], [], stmt.line)]
+            return [SwitchStmt([], block, stmt.line)]
+        self.report.append(f"Line {stmt.line}: WTF? always takes {branch}, replaced it with that case")
+        return block
+
+    def optimize_loop(self, stmt):
+        cond = stmt.condition
+        if cond:
+            cond.expr = self.fold(cond.expr, stmt.line)
+            if is_literal(cond.expr):
+                val, t = self.interpreter.evaluate_operand(cond.expr)
+                troof = self.interpreter.cast_value(val, t, Types.TROOF)
+                if (cond.type == 'TIL' and troof) or (cond.type == 'WILE' and not troof):
+                    self.report.append(f"Line {stmt.line}: loop {stmt.label} never runs its body, dropped it")
+                    return []
+        stmt.body = list(self.optimized(stmt.body))
+        return [stmt]
+
+    # node with its constant operators worked out and SMOOSH literals joined.
+    # expressions nest thousands deep, so the operators still waiting for their operands are kept
+    # on a stack of (node, operands, new operands) like in Interpreter.evaluate
+    def fold(self, node, line):
+        if node is None or node.tag == OPERAND:
+            return node
+
+        folded = 0
+        stack = [(node, expression_operands(node), [])]
+        while True:
+            node, operands, results = stack[-1]
+            if len(results) < len(operands):
+                operand = operands[len(results)]
+                if operand is None or operand.tag == OPERAND:
+                    results.append(operand)
+                else:
+                    stack.append((operand, expression_operands(operand), []))
+                continue
+
+            stack.pop()
+            set_operands(node, results)
+            result = self.fold_node(node, results)
+            if result is not node:
+                folded += 1
+            if not stack:
+                break
+            stack[-1][2].append(result)
+
+        if folded:
+            if is_literal(result):
+                self.report.append(f"Line {line}: folded {folded} operation(s) into {self.describe(result)}")
+            else:
+                self.report.append(f"Line {line}: folded {folded} operation(s)")
+        return result
+
+    # a literal for node if its operands are all literals and working it out doesn't fail, else node
+    def fold_node(self, node, operands):
+        if not all(is_literal(operand) for operand in operands):
+            if node.tag == N_ARY_OP and node.op == 'SMOOSH':
+                self.join_smoosh(node, operands)
+            return node
+        values = [self.interpreter.evaluate_operand(operand) for operand in operands]
+        try:
+            val, t = self.interpreter.appliers[node.tag](node, values)
+        except Exception:
+            return node
+        if t not in LITERAL_KINDS:
+            return node
+        kind, value_type = LITERAL_KINDS[t]
+        if type(val) is not value_type:
+            return node
+        if kind == 'TROOF_LITERAL':
+            val = 'WIN' if val else 'FAIL'
+        return Operand(val, kind, node.line)
+
+    # literals next to each other in a SMOOSH become one YARN literal (SMOOSH joins str() of the values)
+    def join_smoosh(self, node, operands):
+        joined = []
+        run = []
+        for operand in operands + [None]:
+            if is_literal(operand):
+                run.append(operand)
+                continue
+            if len(run) > 1:
+                text = "".join(str(self.interpreter.evaluate_operand(literal)[0]) for literal in run)
+                joined.append(Operand(text, 'STRING', run[0].line))
+            else:
+                joined.extend(run)
+            run = []
+            joined.append(operand)
+        joined.pop()
+        if len(joined) < len(operands):
+            self.report.append(f"Line {node.line}: joined {len(operands)} SMOOSH operands into {len(joined)}")
+            node.operands = joined
+
+    def describe(self, literal):
+        if literal.kind == 'STRING':
+            return f'"{literal.value}"'
+        return str(literal.value)
@@ -0,0 +1,170 @@
+from ast_nodes import (PROGRAM, VAR_BLOCK, VAR_DECL, ASSIGNMENT, TYPE_CAST, INPUT, VISIBLE, IF_STMT, SWITCH_STMT,
+                       LOOP, FUNC_DEF, FUNC_CALL, RETURN, OPERAND, expression_operands)
+
+#works out before the program runs where every variable lives, so the interpreter reads and
+#writes them by index instead of looking names up in a dict per scope.
+#a frame is a flat list with a slot per name: the global frame has one for every I HAS A of the
+#top-level code, a function call's frame one for every parameter and every I HAS A of the body
+#(the layout, name -> slot, is kept on the FuncDef). a slot is None until its I HAS A runs.
+#each variable node gets a binding:
+#   (GLOBAL, slot)   the slot of the global frame
+#   (depth, slot)    the slot of the frame depth below the top one. 0 is the frame of the function
+#                    the code is in, 1 for the arguments of a call (they're worked out after the
+#                    called function's frame is pushed). variables are scoped dynamically, so if
+#                    the slot is still empty the frames under it are looked through by name
+#   None             looked up by name through all the frames, for names the frame of some caller
+#                    could have
+#   UNDECLARED_BINDING   no frame can ever have the name, it's an error when it's reached
+
+GLOBAL = -1
+UNDECLARED = -2
+UNDECLARED_BINDING = (UNDECLARED, None)
+
+class Resolver:
+    def __init__(self):
+        self.global_layout = {}
+        self.errors = []
+        # the names any function has in its frame, and the names of parameters. None while not
+        # every function of the program is known (see resolve_statement), then a variable that
+        # isn't in the function's own frame or could be in the called function's one is looked
+        # up by name
+        self.function_names = None
+        self.param_names = None
+
+    # the whole program at once, gives the errors (variables no frame ever has)
+    def resolve_program(self, program):
+        functions = self.declare(program.body)
+        if self.function_names is None:
+            self.function_names = set()
+            self.param_names = set()
+        for function in functions:
+            self.function_names.update(function.layout)
+            self.param_names.update(function.params)
+        self.resolve_block(program.body, None)
+        for function in functions:
+            self.resolve_block(function.body, function)
+        return self.errors
+
+    # one more top-level statement, for a program that runs while it's still being parsed.
+    # every statement before it has to have been given already
+    def resolve_statement(self, stmt):
+        functions = self.declare([stmt])
+        self.resolve_block([stmt], None)
+        for function in functions:
+            self.resolve_block(function.body, function)
+        return self.errors
+
+    # gives slots to the names the top-level statements declare and sets the layout of every function
+    # defined in them (and in those functions). gives the functions
+    def declare(self, statements):
+        functions = []
+        self.collect(statements, self.global_layout, functions)
+        for function in functions:
+            function.layout = {}
+            for param in function.params:
+                function.layout.setdefault(param, len(function.layout))
+            self.collect(function.body, function.layout, functions)
+        return functions
+
+    # the I HAS A names of statements and the blocks in them go in layout, functions defined in
+    # them (their bodies are another frame) in functions
+    def collect(self, statements, layout, functions):
+        stack = list(reversed(statements))
+        while stack:
+            stmt = stack.pop()
+            if stmt is None:
+                continue
+            tag = stmt.tag
+            if tag == VAR_DECL:
+                if stmt.name is not None:
+                    layout.setdefault(stmt.name, len(layout))
+            elif tag == FUNC_DEF:
+                functions.append(stmt)
+            else:
+                blocks = statement_blocks(stmt)
+                for block in reversed(blocks):
+                    stack.extend(reversed(block))
+
+    # where a name used in function (None for top-level code) lives. in_args is for the arguments of a call
+    def bind(self, name, function, in_args, line):
+        if in_args and (self.param_names is None or name in self.param_names):
+            return None
+        if function is not None:
+            slot = function.layout.get(name)
+            if slot is not None:
+                return (1 if in_args else 0, slot)
+            if self.function_names is None or name in self.function_names:
+                return None
+        slot = self.global_layout.get(name)
+        if slot is not None:
+            return (GLOBAL, slot)
+        error = f"Line {line}: Undeclared variable '{name}'"
+        if error not in self.errors:
+            self.errors.append(error)
+        return UNDECLARED_BINDING
+
+    # binds the variables of statements, the code of function (None for top-level code).
+    # function bodies defined in them are left to the caller
+    def resolve_block(self, statements, function):
+        stack = list(reversed(statements))
+        while stack:
+            stmt = stack.pop()
+            if stmt is None:
+                continue
+            tag = stmt.tag
+            if tag == VAR_DECL:
+                self.resolve_expression(stmt.value, function, False)
+                if stmt.name is not None:
+                    layout = function.layout if function is not None else self.global_layout
+                    stmt.binding = (0 if function is not None else GLOBAL, layout[stmt.name])
+            elif tag == ASSIGNMENT:
+                self.resolve_expression(stmt.expr, function, False)
+                if stmt.target != 'IT':
+                    stmt.binding = self.bind(stmt.target, function, False, stmt.line)
+            elif tag == TYPE_CAST:
+                stmt.binding = self.bind(stmt.target, function, False, stmt.line)
+            elif tag == INPUT:
+                stmt.binding = self.bind(stmt.variable, function, False, stmt.line)
+            elif tag == VISIBLE:
+                for arg in stmt.args:
+                    self.resolve_expression(arg, function, False)
+            elif tag == IF_STMT:
+                for else_if in stmt.else_if_blocks:
+                    self.resolve_expression(else_if.condition, function, False)
+            elif tag == LOOP:
+                if stmt.operation:
+                    stmt.operation.binding = self.bind(stmt.operation.variable, function, False, stmt.line)
+                if stmt.condition:
+                    self.resolve_expression(stmt.condition.expr, function, False)
+            elif tag == FUNC_CALL:
+                for arg in stmt.args:
+                    self.resolve_expression(arg, function, True)
+            elif tag == RETURN:
+                self.resolve_expression(stmt.value, function, False)
+            elif tag == FUNC_DEF:
+                continue
+            for block in reversed(statement_blocks(stmt)):
+                stack.extend(reversed(block))
+
+    def resolve_expression(self, node, function, in_args):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if node.tag == OPERAND:
+                if node.kind == 'IDENTIFIER':
+                    node.binding = self.bind(node.value, function, in_args, node.line)
+            else:
+                stack.extend(reversed(expression_operands(node)))
+
+# the blocks of statements directly in stmt (not a function's body, that's another frame)
+def statement_blocks(stmt):
+    tag = stmt.tag
+    if tag == PROGRAM or tag == VAR_BLOCK or tag == LOOP:
+        return (stmt.body,)
+    if tag == IF_STMT:
+        return (stmt.true_block,) + tuple(else_if.body for else_if in stmt.else_if_blocks) + (stmt.else_block,)
+    if tag == SWITCH_STMT:
+        return tuple(case.body for case in stmt.cases) + (stmt.default,)
+    return ()
@@ -1,6 +1,11 @@
 import sys
 import json
 
+from ast_nodes import (PROGRAM, VAR_BLOCK, VAR_DECL, ASSIGNMENT, TYPE_CAST, INPUT, VISIBLE, IF_STMT, SWITCH_STMT,
+                       LOOP, BREAK, FUNC_DEF, FUNC_CALL, RETURN, BINARY_OP, N_ARY_OP, UNARY_OP, MAEK, OPERAND,
+                       NODE_TAG_COUNT, from_dict, expression_operands)
+from resolver import Resolver, GLOBAL, UNDECLARED
+
 # data types
 class Types:
     NOOB = 'NOOB'       # uninitialized
@@ -10,49 +15,289 @@ class Types:
     TROOF = 'TROOF'     # boolean
     TYPE = 'TYPE'       # type literal
 
+# a value is a (value, type) tuple everywhere: in a frame slot, in IT, what a function returns.
+# the ones that come up all the time are made once
+NOOB_VALUE = (None, Types.NOOB)
+WIN_VALUE = (True, Types.TROOF)
+FAIL_VALUE = (False, Types.TROOF)
+
+NUMERIC_TYPES = (Types.NUMBR, Types.NUMBAR)
+ARITHMETIC_OPS = ('SUM_OF', 'DIFF_OF', 'PRODUKT_OF', 'QUOSHUNT_OF', 'MOD_OF', 'BIGGR_OF', 'SMALLR_OF')
+
+# the arithmetic of apply_binary_op for one operator and one pair of operand types (both NUMBR or
+# NUMBAR), as a function of the two values. no casts to look up, no op name to compare: same result
+# and same errors as going through get_numeric_operands
+def specialize_arithmetic(op, left_type, right_type):
+    if op == 'QUOSHUNT_OF' or left_type == Types.NUMBAR or right_type == Types.NUMBAR:
+        # the values of the other type are made floats first, like cast_value does
+        result_type = Types.NUMBAR
+        if op == 'SUM_OF':
+            return lambda a, b: (float(a) + float(b), result_type)
+        if op == 'DIFF_OF':
+            return lambda a, b: (float(a) - float(b), result_type)
+        if op == 'PRODUKT_OF':
+            return lambda a, b: (float(a) * float(b), result_type)
+        if op == 'BIGGR_OF':
+            return lambda a, b: (float(max(float(a), float(b))), result_type)
+        if op == 'SMALLR_OF':
+            return lambda a, b: (float(min(float(a), float(b))), result_type)
+        # QUOSHUNT OF always divides as NUMBAR, even two NUMBR
+        def divide(a, b):
+            b = float(b)
+            if b == 0:
+                raise Exception(f"Division or Modulo by zero error in {op}.")
+            return (float(a) / b if op == 'QUOSHUNT_OF' else float(a) % b), result_type
+        return divide
+
+    result_type = Types.NUMBR
+    if op == 'SUM_OF':
+        return lambda a, b: (a + b, result_type)
+    if op == 'DIFF_OF':
+        return lambda a, b: (a - b, result_type)
+    if op == 'PRODUKT_OF':
+        return lambda a, b: (a * b, result_type)
+    if op == 'BIGGR_OF':
+        return lambda a, b: (max(a, b), result_type)
+    if op == 'SMALLR_OF':
+        return lambda a, b: (min(a, b), result_type)
+    def modulo(a, b):
+        if b == 0:
+            raise Exception(f"Division or Modulo by zero error in {op}.")
+        return a % b, result_type
+    return modulo
+
+# BOTH SAEM / DIFFRINT of operands of the same type, or both numeric
+def specialize_comparison(op, left_type, right_type):
+    same = op == 'BOTH_SAEM'
+    if left_type == right_type:
+        return lambda a, b: WIN_VALUE if (a == b) == same else FAIL_VALUE
+    return lambda a, b: WIN_VALUE if (float(a) == float(b)) == same else FAIL_VALUE
+
+# (op, left type, right type) -> the function apply_binary_op's inline caches use for them
+SPECIALIZED_BINARY_OPS = {}
+for op in ARITHMETIC_OPS:
+    for left_type in NUMERIC_TYPES:
+        for right_type in NUMERIC_TYPES:
+            SPECIALIZED_BINARY_OPS[op, left_type, right_type] = specialize_arithmetic(op, left_type, right_type)
+for op in ('BOTH_SAEM', 'DIFFRINT'):
+    for left_type in (Types.NOOB, Types.NUMBR, Types.NUMBAR, Types.YARN, Types.TROOF):
+        SPECIALIZED_BINARY_OPS[op, left_type, left_type] = specialize_comparison(op, left_type, left_type)
+    for left_type in NUMERIC_TYPES:
+        for right_type in NUMERIC_TYPES:
+            if left_type != right_type:
+                SPECIALIZED_BINARY_OPS[op, left_type, right_type] = specialize_comparison(op, left_type, right_type)
+del op, left_type, right_type
+
+# the names of the variables statements can change (I HAS A, R, IS NOW A, GIMMEH, the UPPIN/NERFIN
+# of a loop), at any depth. None if they call a function, that can change any variable
+def written_names(statements):
+    names = set()
+    stack = list(statements)
+    while stack:
+        stmt = stack.pop()
+        if stmt is None:
+            continue
+        tag = stmt.tag
+        if tag == FUNC_CALL:
+            return None
+        if tag == VAR_DECL:
+            names.add(stmt.name)
+        elif tag == ASSIGNMENT or tag == TYPE_CAST:
+            names.add(stmt.target)
+        elif tag == INPUT:
+            names.add(stmt.variable)
+        elif tag == IF_STMT:
+            stack.extend(stmt.true_block)
+            for else_if in stmt.else_if_blocks:
+                stack.extend(else_if.body)
+            stack.extend(stmt.else_block)
+        elif tag == SWITCH_STMT:
+            for case in stmt.cases:
+                stack.extend(case.body)
+            stack.extend(stmt.default)
+        elif tag == LOOP:
+            if stmt.operation:
+                names.add(stmt.operation.variable)
+            stack.extend(stmt.body)
+        elif tag == PROGRAM or tag == VAR_BLOCK:
+            stack.extend(stmt.body)
+    return names
+
+# how a loop of the shape UPPIN/NERFIN YR i TIL/WILE BOTH SAEM/DIFFRINT i AN bound can run as a
+# counted loop (see Interpreter.run_counted_loop): (left operand, right operand, whether i is the
+# left one, whether the loop stops when i is the bound, step). bound is a literal or a variable
+# the body never changes, and the body doesn't change i either. False for any other loop
+def counted_loop_plan(node):
+    op = node.operation
+    cond = node.condition
+    if not op or not cond or op.type not in ('UPPIN', 'NERFIN') or cond.type not in ('TIL', 'WILE'):
+        return False
+    expr = cond.expr
+    if expr is None or expr.tag != BINARY_OP or expr.op not in ('BOTH_SAEM', 'DIFFRINT'):
+        return False
+    left, right = expr.left, expr.right
+    if left is None or right is None or left.tag != OPERAND or right.tag != OPERAND:
+        return False
+    counter = op.variable
+    counter_left = left.kind == 'IDENTIFIER' and left.value == counter
+    bound = right if counter_left else left
+    if not counter_left and not (right.kind == 'IDENTIFIER' and right.value == counter):
+        return False
+
+    written = written_names(node.body)
+    if written is None or counter in written:
+        return False
+    if bound.kind == 'IDENTIFIER':
+        if bound.value == counter or bound.value in written:
+            return False
+    elif bound.kind not in ('INTEGER_LITERAL', 'FLOAT_LITERAL', 'STRING', 'TROOF_LITERAL'):
+        return False
+    stop_equal = (expr.op == 'BOTH_SAEM') == (cond.type == 'TIL')
+    return left, right, counter_left, stop_equal, 1 if op.type == 'UPPIN' else -1
+
+# how a call site runs the HOW IZ I it calls: the layout and size of its frame, the slot of every
+# parameter in order, the index of the first parameter named like one before it (binding it
+# fails, None if there's none), the (executor, statement) of the body, with None for a FOUND YR
+# (the call works out its value itself), and its memo.MemoCache if it's memoized.
+# it's made when the call site first runs with that definition, after the number of arguments is
+# checked, so the calls after that don't check it or look anything up
+class CallPlan:
+    __slots__ = ("function", "layout", "size", "slots", "duplicate", "body", "memo")
+
+    def __init__(self, function, executors, memo):
+        self.function = function
+        self.memo = memo
+        self.body = [(None if stmt.tag == RETURN else executors[stmt.tag], stmt) for stmt in function.body if stmt]
+        self.layout = function.layout
+        self.size = len(function.layout)
+        self.slots = [function.layout[param] for param in function.params]
+        self.duplicate = None
+        for i, slot in enumerate(self.slots):
+            if slot in self.slots[:i]:
+                self.duplicate = i
+                break
+
 # main class for lolcode
 class Interpreter:
     def __init__(self):
-        # store var
-        self.scopes = [{}]  # Stack of scopes: {var_name: {'value': val, 'type': type}}
+        # store var. frames are flat lists with a slot per variable (see resolver): the global one,
+        # then one per function call running. a slot holds (value, type), None until it's declared
+        self.resolver = Resolver()
+        self.frames = [[]]
+        self.layouts = [self.resolver.global_layout]
+        # slots of the global frame in the order they got declared, for dump_symbol_table
+        self.declared = []
+        self.resolved = None
         self.functions = {} # func_name -> {params, body}
         # here sin-save ng interpreter yung text
         self.output_buffer = []
-        self.it_register = {'value': None, 'type': Types.NOOB}
-        self.return_value = None # For function returns
+        self.it_register = NOOB_VALUE
+        self.return_value = None # For function returns, a (value, type)
+        # inline caches of the binary operators: node -> (left type, right type, specialized function)
+        # for the types its operands had the last time, see apply_binary_op
+        self.binary_caches = {}
+        # counted_loop_plan of every loop that ran, by its node
+        self.loop_plans = {}
+        # the CallPlan of every I IZ that ran, by its node
+        self.call_plans = {}
+        # a memo.Memoizer if pure functions are memoized
+        self.memoizer = None
+        # the message of the runtime error that stopped the program (it's printed too), None if none did
+        self.runtime_error = None
         self.should_return = False
+        # a GTFO ran, what's around it stops up to the loop, WTF? or function it ends. breakable
+        # is the number of loops and WTF?s running, a GTFO outside them and functions does nothing
+        self.should_break = False
+        self.breakable = 0
 
-    # adds new dict
-    def push_scope(self):
-        self.scopes.append({})
+        # handlers per node tag (see ast_nodes), so a node is run without comparing node_type strings
+        self.executors = [self.execute_nothing] * NODE_TAG_COUNT
+        self.executors[PROGRAM] = self.execute_block
+        self.executors[VAR_BLOCK] = self.execute_block
+        self.executors[VAR_DECL] = self.execute_var_decl
+        self.executors[ASSIGNMENT] = self.execute_assignment
+        self.executors[TYPE_CAST] = self.execute_type_cast
+        self.executors[INPUT] = self.execute_input
+        self.executors[VISIBLE] = self.execute_visible
+        self.executors[IF_STMT] = self.execute_if
+        self.executors[SWITCH_STMT] = self.execute_switch
+        self.executors[LOOP] = self.execute_loop
+        self.executors[BREAK] = self.execute_break
+        self.executors[FUNC_DEF] = self.execute_func_def
+        self.executors[FUNC_CALL] = self.execute_func_call
+        self.executors[RETURN] = self.execute_return
+        # what an operator node gives once the values of its operands are known (see evaluate)
+        self.appliers = [self.apply_nothing] * NODE_TAG_COUNT
+        self.appliers[BINARY_OP] = self.apply_binary_op
+        self.appliers[N_ARY_OP] = self.apply_n_ary_op
+        self.appliers[UNARY_OP] = self.apply_unary_op
+        self.appliers[MAEK] = self.apply_maek
 
-    # tanggal
-    def pop_scope(self):
-        self.scopes.pop()
+    # binds the variables of a program to frame slots (see resolver), gives the ones never declared
+    def resolve(self, ast):
+        if self.resolved is not ast:
+            self.resolved = ast
+            self.resolver.resolve_program(ast)
+            self.grow_globals()
+        return self.resolver.errors
 
-    def current_scope(self):
-        return self.scopes[-1]
+    # slots for the global names the resolver added since the last time
+    def grow_globals(self):
+        globals_ = self.frames[0]
+        globals_.extend([None] * (len(self.resolver.global_layout) - len(globals_)))
 
-    # creates a variable in the current (topmost) scope
-    def declare_variable(self, name, value=None, type_=Types.NOOB):
-        if name in self.current_scope():
-            raise Exception(f"Variable '{name}' already declared in current scope")
-        self.current_scope()[name] = {'value': value, 'type': type_}
+    # (value, type) of a variable, binding is where it lives
+    def read_variable(self, name, binding):
+        if binding is not None:
+            depth, slot = binding
+            if depth == GLOBAL:
+                value = self.frames[0][slot]
+                if value is not None:
+                    return value
+            elif depth != UNDECLARED:
+                frames = self.frames
+                value = frames[-1 - depth][slot]
+                if value is not None:
+                    return value
+                # not declared in that frame (yet), scoping is dynamic so it's looked for in the callers
+                return self.find_variable(name, len(frames) - 2 - depth)
+            raise Exception(f"Undeclared variable '{name}'")
+        return self.find_variable(name, len(self.frames) - 1)
 
-    # looks at the current scope first and if not found, it checks the outer scope hanngang sa global
-    def get_variable(self, name):
-        for scope in reversed(self.scopes):
-            if name in scope:
-                return scope[name]
-        raise Exception(f"Undeclared variable '{name}'")
+    def write_variable(self, name, binding, value):
+        frame, slot = self.variable_slot(name, binding)
+        frame[slot] = value
 
-    def set_variable(self, name, value, type_):
-        for scope in reversed(self.scopes):
-            if name in scope:
-                scope[name] = {'value': value, 'type': type_}
-                return
+    # (frame, slot) the variable is in right now
+    def variable_slot(self, name, binding):
+        if binding is not None:
+            depth, slot = binding
+            if depth == UNDECLARED:
+                raise Exception(f"Undeclared variable '{name}'")
+            frame = self.frames[0] if depth == GLOBAL else self.frames[-1 - depth]
+            if frame[slot] is not None:
+                return frame, slot
+            if depth == GLOBAL:
+                raise Exception(f"Undeclared variable '{name}'")
+            top = len(self.frames) - 2 - depth
+        else:
+            top = len(self.frames) - 1
+        return self.find_slot(name, top)
+
+    # looks at frame top first and if not found, it checks the ones under it hanggang sa global
+    def find_slot(self, name, top):
+        for i in range(top, -1, -1):
+            slot = self.layouts[i].get(name)
+            if slot is not None:
+                frame = self.frames[i]
+                if slot < len(frame) and frame[slot] is not None:
+                    return frame, slot
         raise Exception(f"Undeclared variable '{name}'")
 
+    def find_variable(self, name, top):
+        frame, slot = self.find_slot(name, top)
+        return frame[slot]
+
     def cast_value(self, value, from_type, to_type, explicit=False):
         if from_type == to_type:
             return value
@@ -135,277 +380,386 @@ class Interpreter:
 
     # main function na magpprocess sa Abstract syntax tree (ast)
     def execute(self, ast):
+        # an AST in the old dict shape (from tools) is turned into nodes first
+        if isinstance(ast, dict):
+            ast = from_dict(ast)
+        self.resolve(ast)
         try:
             self.execute_node(ast)
             # return "\n".join(self.output_buffer) # No longer returning buffer
         except Exception as e:
+            self.runtime_error = str(e)
             print(f"Runtime Error: {str(e)}")
 
+    # like execute, but ast is first compiled by compiler (a closures.ClosureCompiler or another
+    # backend, anything whose compile(node) gives a function running the node) and then run
+    def execute_compiled(self, ast, compiler):
+        if isinstance(ast, dict):
+            ast = from_dict(ast)
+        self.resolve(ast)
+        try:
+            compiler.compile(ast)()
+        except Exception as e:
+            self.runtime_error = str(e)
+            print(f"Runtime Error: {str(e)}")
+
+    # runs top-level statements as they come out of statements (see Parser.iter_statements), so a
+    # program starts running before all of it is parsed. errors is the list the parser records
+    # syntax errors in: once it has one nothing else runs. the rest of the statements are still
+    # read, so errors ends up with every syntax error of the program. with a compiler (see
+    # execute_compiled) every statement is compiled before it runs
+    def execute_stream(self, statements, errors, compiler=None):
+        running = True
+        for stmt in statements:
+            if not running:
+                continue
+            if errors:
+                running = False
+                continue
+            # the variables are bound a statement at a time too, the functions still to come can't be known
+            self.resolver.resolve_statement(stmt)
+            self.grow_globals()
+            try:
+                if compiler is not None:
+                    # what execute_node checks first, a FOUND YR at the top stops the program
+                    if not self.should_return:
+                        compiler.compile(stmt)()
+                else:
+                    self.execute_node(stmt)
+            except Exception as e:
+                self.runtime_error = str(e)
+                print(f"Runtime Error: {str(e)}")
+                running = False
+
     # recursive func that interpret each block/statemt
     def execute_node(self, node):
         if not node: return
         if self.should_return: return
 
-        ntype = node.get('node_type')
-        # print(f"EXECUTE NODE: {ntype}")
+        # the handler for the kind of node, see __init__
+        self.executors[node.tag](node)
 
-        # Loops through a list of statements and executes them one by one
-        if ntype == 'program':
-            for stmt in node.get('body', []):
-                self.execute_node(stmt)
-        
-        elif ntype == 'var_block':
-            for stmt in node.get('body', []):
-                self.execute_node(stmt)
+    # Loops through a list of statements and executes them one by one
+    def execute_block(self, node):
+        for stmt in node.body:
+            self.execute_node(stmt)
 
-        # calculates the initial value
-        elif ntype == 'var_decl':
-            val = None
-            t = Types.NOOB
-            if node.get('value'):
-                val, t = self.evaluate(node.get('value'))
-            self.declare_variable(node.get('name'), val, t)
-
-        # update lag variable depende sa expression
-        elif ntype == 'assignment':
-            val, t = self.evaluate(node.get('expr'))
-            target = node.get('target')
-            if target == 'IT':
-                self.it_register = {'value': val, 'type': t}
-            else:   
-                self.set_variable(target, val, t)
-
-        # handle expr na nag-uupdate sa IT
-        elif ntype == 'expression_stmt':
-            # Bare expression that updates IT
-            val, t = self.evaluate(node.get('expr'))
-            self.it_register = {'value': val, 'type': t}
-
-        # Evaluates arguments, casts them to strings, and adds them sa output_buffer
-        elif ntype == 'visible':
-            out_parts = []
-            for arg in node.get('args', []):
-                try:
-                    val, t = self.evaluate(arg)
-                    out_parts.append(str(self.cast_value(val, t, Types.YARN)))
-                except Exception as e:
-                    out_parts.append(f"[Error: {str(e)}]")
-            
-            output = "".join(out_parts)
-            self.output_buffer.append(output)
-            print(output)
-            sys.stdout.flush()
+    # calculates the initial value
+    def execute_var_decl(self, node):
+        value = NOOB_VALUE
+        if node.value:
+            value = self.evaluate(node.value)
+        # creates the variable in the current (topmost) frame
+        depth, slot = node.binding
+        frame = self.frames[-1]
+        if frame[slot] is not None:
+            raise Exception(f"Variable '{node.name}' already declared in current scope")
+        frame[slot] = value
+        if depth == GLOBAL:
+            self.declared.append(slot)
 
-        elif ntype == 'if_stmt':
+    # update lag variable depende sa expression
+    def execute_assignment(self, node):
+        value = self.evaluate(node.expr)
+        target = node.target
+        if target == 'IT':
+            self.it_register = value
+        else:   
+            self.write_variable(target, node.binding, value)
 
-            # ORLY uses the current value in IT register
-            # Cast IT to TROOF
-            condition_val = self.cast_value(self.it_register['value'], self.it_register['type'], Types.TROOF)
+    # Evaluates arguments, casts them to strings, and adds them sa output_buffer
+    def execute_visible(self, node):
+        out_parts = []
+        for arg in node.args:
+            try:
+                val, t = self.evaluate(arg)
+                out_parts.append(str(self.cast_value(val, t, Types.YARN)))
+            except Exception as e:
+                out_parts.append(f"[Error: {str(e)}]")
+        
+        output = "".join(out_parts)
+        self.output_buffer.append(output)
+        print(output)
+        sys.stdout.flush()
 
-            branch_executed = False
+    def execute_if(self, node):
+        # ORLY uses the current value in IT register
+        # Cast IT to TROOF
+        condition_val = self.cast_value(self.it_register[0], self.it_register[1], Types.TROOF)
 
-            # YA RLY block
-            if condition_val:
-                for stmt in node.get('true_block', []):
-                    self.execute_node(stmt)
-                    if self.should_return: return
-                branch_executed = True
-
-            # MEBBE blocks
-            if not branch_executed:
-                for elif_block in node.get('else_if_blocks', []):
-                    # Evaluate MEBBE condition
-                    # Note: In LOLCODE, expressions in flow control usually update IT.
-                    # We evaluate, update IT, then check TROOFness.
-                    val, t = self.evaluate(elif_block['condition'])
-                    self.it_register = {'value': val, 'type': t}
-                    
-                    cond_val = self.cast_value(val, t, Types.TROOF)
-                    
-                    if cond_val:
-                        for stmt in elif_block['body']:
-                            self.execute_node(stmt)
-                            if self.should_return: return
-                        branch_executed = True
-                        break  # Stop after first true MEBBE
-
-            # NO WAI block
-            if not branch_executed:
-                for stmt in node.get('else_block', []):
-                    self.execute_node(stmt)
-                    if self.should_return: return
+        branch_executed = False
 
+        # YA RLY block
+        if condition_val:
+            for stmt in node.true_block:
+                self.execute_node(stmt)
+                if self.should_return or self.should_break: return
+            branch_executed = True
 
-        # check yung value ng IT reg and compare sa literal values ng bawta case
-        elif ntype == 'switch_stmt':
-            it_val = self.it_register['value']
-            it_type = self.it_register['type']
-            matched = False
-            
-            for case in node.get('cases', []):
-                case_val = case['value']  # Literal value from OMG
+        # MEBBE blocks
+        if not branch_executed:
+            for elif_block in node.else_if_blocks:
+                # Evaluate MEBBE condition
+                # Note: In LOLCODE, expressions in flow control usually update IT.
+                # We evaluate, update IT, then check TROOFness.
+                self.it_register = self.evaluate(elif_block.condition)
+                val, t = self.it_register
                 
-                # Compare values with type coercion
-                # If IT is YARN (from GIMMEH) and case is a number, try converting IT to number
-                if it_type == Types.YARN and isinstance(case_val, (int, float)):
-                    try:
-                        # Try to convert YARN to the appropriate numeric type
-                        if isinstance(case_val, int):
-                            it_val_converted = int(it_val)
-                        else:
-                            it_val_converted = float(it_val)
-                            
-                        if it_val_converted == case_val:
-                            matched = True
-                    except (ValueError, TypeError):
-                        # Can't convert, no match
-                        pass
-                elif it_val == case_val:
-                    # Direct comparison
-                    matched = True
-                    
-                if matched:
-                    for stmt in case['body']:
+                cond_val = self.cast_value(val, t, Types.TROOF)
+                
+                if cond_val:
+                    for stmt in elif_block.body:
                         self.execute_node(stmt)
-                        if self.should_return: return
-                    break
-            
-            if not matched:
-                for stmt in node.get('default', []):
-                    self.execute_node(stmt)
-                    if self.should_return: return
+                        if self.should_return or self.should_break: return
+                    branch_executed = True
+                    break  # Stop after first true MEBBE
 
-        # GIMMEH input
-        elif ntype == 'input':
-            var_name = node.get('variable')
-            try:
-                # Read from stdin
-                user_input = input()
-                # Store as YARN (string)
-                self.set_variable(var_name, user_input, Types.YARN)
-            except EOFError:
-                # Handle end of input gracefully if needed
-                self.set_variable(var_name, "", Types.YARN)
-
-        # check yung TIL or WILE cond para mag break
-        elif ntype == 'loop':
-            op = node.get('operation')
-            cond = node.get('condition')
+        # NO WAI block
+        if not branch_executed:
+            for stmt in node.else_block:
+                self.execute_node(stmt)
+                if self.should_return or self.should_break: return
+
+    # check yung value ng IT reg and compare sa literal values ng bawta case
+    # a GTFO in the case ends the WTF?
+    def execute_switch(self, node):
+        case = self.matching_case(node, self.it_register[0], self.it_register[1])
+        block = case.body if case is not None else node.default
+
+        self.breakable += 1
+        for stmt in block:
+            self.execute_node(stmt)
+            if self.should_return or self.should_break: break
+        self.breakable -= 1
+        self.should_break = False
+
+    # the OMG of a WTF? that IT matches, None if it's the OMGWTF
+    def matching_case(self, node, it_val, it_type):
+        for case in node.cases:
+            case_val = case.value  # Literal value from OMG
             
-            while True:
-                # Check condition
-                if cond:
-                    val, t = self.evaluate(cond['expr'])
-                    bool_val = self.cast_value(val, t, Types.TROOF)
-                    if cond['type'] == 'TIL' and bool_val: break
-                    if cond['type'] == 'WILE' and not bool_val: break
-                
-                # Execute body
-                for stmt in node.get('body', []):
-                    self.execute_node(stmt)
-                    if self.should_return: return
-                    if isinstance(stmt, dict) and stmt.get('node_type') == 'break':
-                        return # Break loop
-                
-                # Operation
-                if op:
-                    var_name = op['variable']
-                    var_info = self.get_variable(var_name)
-                    val = var_info['value']
-                    # Typecast to NUMBR/NUMBAR for UPPIN/NERFIN
-                    # Assume casting to NUMBAR for safety if needed, or NUMBR if it's the current type
-                    # For simplicity, cast to the current numerical type or NUMBR if NOOB/TROOF
-                    current_type = var_info['type']
-                    
-                    if current_type not in [Types.NUMBR, Types.NUMBAR]:
-                        # Attempt to implicitly cast to NUMBR/NUMBAR
-                        # Since this is an operation, the casting rules from arithmetic should apply
-                        try:
-                            val = self.cast_value(val, current_type, Types.NUMBR)
-                            current_type = Types.NUMBR
-                        except:
-                            try:
-                                val = self.cast_value(val, current_type, Types.NUMBAR)
-                                current_type = Types.NUMBAR
-                            except:
-                                raise Exception(f"Loop variable '{var_name}' value cannot be cast to numerical type for UPPIN/NERFIN.")
-
-                    if op['type'] == 'UPPIN': # increment
-                        val += 1
-                    elif op['type'] == 'NERFIN': # decrement
-                        val -= 1
+            # Compare values with type coercion
+            # If IT is YARN (from GIMMEH) and case is a number, try converting IT to number
+            if it_type == Types.YARN and isinstance(case_val, (int, float)):
+                try:
+                    # Try to convert YARN to the appropriate numeric type
+                    if isinstance(case_val, int):
+                        it_val_converted = int(it_val)
+                    else:
+                        it_val_converted = float(it_val)
                         
-                    # Ensure value remains int if original type was NUMBR, and float if NUMBAR
-                    if current_type == Types.NUMBR:
-                        val = int(val)
-                    elif current_type == Types.NUMBAR:
-                        val = float(val)
-
-                    self.set_variable(var_name, val, current_type)
-
-        elif ntype == 'break':
-            pass 
-
-        #save lang buong  function node
-        elif ntype == 'func_def':
-            self.functions[node.get('name')] = node
-
-        # check if same count ng args and params
-        elif ntype == 'func_call':
-            func_name = node.get('name')
-            if func_name not in self.functions:
-                raise Exception(f"Function '{func_name}' not defined")
-            
-            func_node = self.functions[func_name]
-            params = func_node.get('params', [])
-            args = node.get('args', [])
-            
-            if len(params) != len(args):
-                raise Exception(f"Function '{func_name}' expects {len(params)} arguments, got {len(args)}")
-            
-            # Create new scope
-            self.push_scope()
+                    if it_val_converted == case_val:
+                        return case
+                except (ValueError, TypeError):
+                    # Can't convert, no match
+                    pass
+            elif it_val == case_val:
+                # Direct comparison
+                return case
+        return None
+
+    # GIMMEH input
+    def execute_input(self, node):
+        var_name = node.variable
+        try:
+            # Read from stdin
+            user_input = input()
+            # Store as YARN (string)
+            self.write_variable(var_name, node.binding, (user_input, Types.YARN))
+        except EOFError:
+            # Handle end of input gracefully if needed
+            self.write_variable(var_name, node.binding, ("", Types.YARN))
+
+    # a GTFO anywhere in the body (not in a loop or WTF? of its own) ends the loop
+    def execute_loop(self, node):
+        plan = self.loop_plans.get(node)
+        if plan is None:
+            plan = self.loop_plans[node] = counted_loop_plan(node)
+
+        self.breakable += 1
+        if not plan or not self.run_counted_loop(node, plan):
+            self.run_loop(node)
+        self.breakable -= 1
+        self.should_break = False
+
+    # a loop counting i up or down to a bound that doesn't change, see counted_loop_plan. i is
+    # kept in a local and compared with the bound right there, its slot is only written. gives
+    # False, having run nothing, if i or the bound isn't a NUMBR (then it's up to run_loop)
+    def run_counted_loop(self, node, plan):
+        left, right, counter_left, stop_equal, delta = plan
+        # read in the order evaluating the condition would, so a missing one fails the same way
+        left_value = self.evaluate_operand(left)
+        right_value = self.evaluate_operand(right)
+        (i, counter_type), (bound, bound_type) = (left_value, right_value) if counter_left else (right_value, left_value)
+        if counter_type != Types.NUMBR or bound_type != Types.NUMBR:
+            return False
+
+        op = node.operation
+        frame, slot = self.variable_slot(op.variable, op.binding)
+        body = node.body
+        while (i == bound) != stop_equal:
+            for stmt in body:
+                self.execute_node(stmt)
+                if self.should_return or self.should_break: return True
+            i += delta
+            frame[slot] = (i, Types.NUMBR)
+        return True
+
+    # check yung TIL or WILE cond para mag break
+    def run_loop(self, node):
+        op = node.operation
+        cond = node.condition
+        
+        while True:
+            # Check condition
+            if cond:
+                val, t = self.evaluate(cond.expr)
+                bool_val = self.cast_value(val, t, Types.TROOF)
+                if cond.type == 'TIL' and bool_val: break
+                if cond.type == 'WILE' and not bool_val: break
             
-            # Bind args to params
-            for param, arg_expr in zip(params, args):
-                val, t = self.evaluate(arg_expr)
-                self.declare_variable(param, val, t)
-                
             # Execute body
-            for stmt in func_node.get('body', []):
+            for stmt in node.body:
                 self.execute_node(stmt)
-                if self.should_return: break
+                if self.should_return or self.should_break: return
             
-            # Capture return
-            ret_val = self.return_value
-            self.return_value = None
-            self.should_return = False
-            self.pop_scope()
+            # Operation
+            if op:
+                var_name = op.variable
+                val, current_type = self.read_variable(var_name, op.binding)
+                # Typecast to NUMBR/NUMBAR for UPPIN/NERFIN
+                # Assume casting to NUMBAR for safety if needed, or NUMBR if it's the current type
+                # For simplicity, cast to the current numerical type or NUMBR if NOOB/TROOF
+                
+                if current_type not in [Types.NUMBR, Types.NUMBAR]:
+                    # Attempt to implicitly cast to NUMBR/NUMBAR
+                    # Since this is an operation, the casting rules from arithmetic should apply
+                    try:
+                        val = self.cast_value(val, current_type, Types.NUMBR)
+                        current_type = Types.NUMBR
+                    except:
+                        try:
+                            val = self.cast_value(val, current_type, Types.NUMBAR)
+                            current_type = Types.NUMBAR
+                        except:
+                            raise Exception(f"Loop variable '{var_name}' value cannot be cast to numerical type for UPPIN/NERFIN.")
+
+                if op.type == 'UPPIN': # increment
+                    val += 1
+                elif op.type == 'NERFIN': # decrement
+                    val -= 1
+                    
+                # Ensure value remains int if original type was NUMBR, and float if NUMBAR
+                if current_type == Types.NUMBR:
+                    val = int(val)
+                elif current_type == Types.NUMBAR:
+                    val = float(val)
+
+                self.write_variable(var_name, op.binding, (val, current_type))
+
+    # nodes that do nothing as a statement
+    def execute_nothing(self, node):
+        pass
+
+    # GTFO, ends the loop or WTF? it's in, or else the function (which gives NOOB)
+    def execute_break(self, node):
+        if self.breakable or len(self.frames) > 1:
+            self.should_break = True
+
+    #save lang buong  function node
+    def execute_func_def(self, node):
+        self.functions[node.name] = node
+        if self.memoizer is not None:
+            # the new function can change what the memoized ones give
+            self.memoizer.forget()
+            self.call_plans.clear()
+
+    def execute_func_call(self, node):
+        func_node = self.functions.get(node.name)
+        plan = self.call_plans.get(node)
+        if plan is None or plan.function is not func_node:
+            plan = self.call_plans[node] = self.plan_call(node, func_node)
+
+        # Create new frame, a slot for each name in the layout of the function
+        frame = [None] * plan.size
+        self.frames.append(frame)
+        self.layouts.append(plan.layout)
+        
+        # Bind args to params
+        if plan.duplicate is None:
+            for slot, arg_expr in zip(plan.slots, node.args):
+                frame[slot] = self.evaluate(arg_expr)
+        else:
+            for i, (slot, arg_expr) in enumerate(zip(plan.slots, node.args)):
+                value = self.evaluate(arg_expr)
+                if i == plan.duplicate:
+                    raise Exception(f"Variable '{func_node.params[i]}' already declared in current scope")
+                frame[slot] = value
+
+        # a memoized function called with the same arguments before gives what it gave then
+        memo = plan.memo
+        key = None
+        if memo is not None:
+            key = memo.key([frame[slot] for slot in plan.slots])
+            if key is not None:
+                cached = memo.get(key)
+                if cached is not None:
+                    self.frames.pop()
+                    self.layouts.pop()
+                    self.it_register = cached
+                    return
             
-            if ret_val:
-                self.it_register = ret_val
-            else:
-                self.it_register = {'value': None, 'type': Types.NOOB}
-
-        # reutrn para mag stop yung pag run
-        elif ntype == 'return':
-            val, t = self.evaluate(node.get('value'))
-            self.return_value = {'value': val, 'type': t}
-            self.should_return = True
-
-        elif ntype == 'type_cast':
-            # IS NOW A (modifies variable)
-            if 'target' in node:
-                target = node.get('target')
-                target_type_str = node.get('type')
-                var_info = self.get_variable(target)
-                new_val = self.cast_value(var_info['value'], var_info['type'], target_type_str)
-                self.set_variable(target, new_val, target_type_str)
-
-    def get_numeric_operands(self, left_node, right_node, operation_name):
-        left_val, left_type = self.evaluate(left_node)
-        right_val, right_type = self.evaluate(right_node)
+        # Execute body. a FOUND YR right in it gives the value without going through should_return,
+        # one deeper in it (in an O RLY?) sets should_return and return_value
+        ret_val = None
+        for execute, stmt in plan.body:
+            if execute is None:
+                ret_val = self.evaluate(stmt.value)
+                break
+            execute(stmt)
+            if self.should_return or self.should_break:
+                ret_val = self.return_value
+                break
         
+        # Capture return
+        self.return_value = None
+        self.should_return = False
+        self.should_break = False
+        self.frames.pop()
+        self.layouts.pop()
+        
+        if ret_val:
+            self.it_register = ret_val
+        else:
+            self.it_register = NOOB_VALUE
+        if key is not None:
+            memo.put(key, self.it_register)
+
+    # check if same count ng args and params, gives the CallPlan of the call to func_node
+    def plan_call(self, node, func_node):
+        func_name = node.name
+        if func_node is None:
+            raise Exception(f"Function '{func_name}' not defined")
+        params = func_node.params
+        if len(params) != len(node.args):
+            raise Exception(f"Function '{func_name}' expects {len(params)} arguments, got {len(node.args)}")
+        memo = self.memoizer.cache_for(func_node, self.functions) if self.memoizer is not None else None
+        return CallPlan(func_node, self.executors, memo)
+
+    # reutrn para mag stop yung pag run
+    def execute_return(self, node):
+        self.return_value = self.evaluate(node.value)
+        self.should_return = True
+
+    # IS NOW A (modifies variable)
+    def execute_type_cast(self, node):
+        target = node.target
+        target_type_str = node.type
+        val, t = self.read_variable(target, node.binding)
+        new_val = self.cast_value(val, t, target_type_str)
+        self.write_variable(target, node.binding, (new_val, target_type_str))
+
+    def get_numeric_operands(self, left_val, left_type, right_val, right_type, operation_name):
         # Determine the target type for casting and the final result type
         # If at least one is NUMBAR, the target is NUMBAR and result is NUMBAR.
         # If both are NUMBR, the target is NUMBR and result is NUMBR.
@@ -430,164 +784,193 @@ class Interpreter:
 
         return left_num, right_num, result_type
 
-    # compute and turn back the value and type sa expression
+    # compute and turn back the value and type sa expression.
+    # generated code nests operators thousands deep, so instead of recursing the operators still
+    # waiting for the values of their operands are kept on a stack of (node, operands, values)
     def evaluate(self, node):
-        ntype = node.get('node_type')
+        if node.tag == OPERAND:
+            return self.evaluate_operand(node)
+
+        stack = [(node, expression_operands(node), [])]
+        while True:
+            node, operands, values = stack[-1]
+            if len(values) < len(operands):
+                operand = operands[len(values)]
+                if operand.tag == OPERAND:
+                    values.append(self.evaluate_operand(operand))
+                else:
+                    stack.append((operand, expression_operands(operand), []))
+                continue
+
+            stack.pop()
+            result = self.appliers[node.tag](node, values)
+            if not stack:
+                return result
+            stack[-1][2].append(result)
+
+    def evaluate_operand(self, node):
+        val = node.value
+        kind = node.kind
         
-        if ntype == 'operand':
-            val = node.get('value')
-            kind = node.get('kind')
-            
-            if kind == 'IT':
-                return self.it_register['value'], self.it_register['type']
-            
-            if kind == 'IDENTIFIER':
-                # Try to look up variable
-                try:
-                    info = self.get_variable(val)
-                    return info['value'], info['type']
-                except:
-                    raise Exception(f"Undeclared variable '{val}'")
+        if kind == 'IT':
+            return self.it_register
+        
+        if kind == 'IDENTIFIER':
+            # the slot the resolver bound it to
+            return self.read_variable(val, node.binding)
+        
+        # Literals
+        if kind == 'INTEGER_LITERAL': return val, Types.NUMBR
+        if kind == 'FLOAT_LITERAL': return val, Types.NUMBAR
+        if kind == 'STRING': return val, Types.YARN 
+        if kind == 'TROOF_LITERAL':
+            if val == 'WIN' or val == 'true': return WIN_VALUE
+            if val == 'FAIL' or val == 'false': return FAIL_VALUE
+            return val, Types.TROOF # Fallback
+        
+        return val, Types.ANY
+
+    # compute the result of two args operation 
+    def apply_binary_op(self, node, values):
+        (left_val, left_type), (right_val, right_type) = values
+
+        # the operand types are usually the same as the last time this node ran, then the function
+        # specialized for them does it. when they change the node gets the one for the new types
+        cached = self.binary_caches.get(node)
+        if cached is not None and cached[0] == left_type and cached[1] == right_type:
+            return cached[2](left_val, right_val)
+        op = node.op
+        specialized = SPECIALIZED_BINARY_OPS.get((op, left_type, right_type))
+        if specialized is not None:
+            self.binary_caches[node] = (left_type, right_type, specialized)
+            return specialized(left_val, right_val)
+
+        # --- Arithmetic Operations (Require implicit casting) ---
+        if op in ARITHMETIC_OPS:
             
-            # Literals
-            if kind == 'INTEGER_LITERAL': return val, Types.NUMBR
-            if kind == 'FLOAT_LITERAL': return val, Types.NUMBAR
-            if kind == 'STRING': return val, Types.YARN 
-            if kind == 'TROOF_LITERAL':
-                if val == 'WIN' or val == 'true': return True, Types.TROOF
-                if val == 'FAIL' or val == 'false': return False, Types.TROOF
-                return val, Types.TROOF # Fallback
+            left_num, right_num, result_type = self.get_numeric_operands(left_val, left_type, right_val, right_type, op)
             
-            return val, Types.ANY
-
-        # compute the result of two args operation 
-        elif ntype == 'binary_op':
-            left_val, left_type = self.evaluate(node.get('left'))
-            right_val, right_type = self.evaluate(node.get('right'))
-            op = node.get('op')
+            # Check for division by zero
+            if op in ['QUOSHUNT_OF', 'MOD_OF'] and right_num == 0:
+                raise Exception(f"Division or Modulo by zero error in {op}.")
 
-            # --- Arithmetic Operations (Require implicit casting) ---
-            if op in ['SUM_OF', 'DIFF_OF', 'PRODUKT_OF', 'QUOSHUNT_OF', 'MOD_OF', 'BIGGR_OF', 'SMALLR_OF']:
-                
-                left_num, right_num, result_type = self.get_numeric_operands(node.get('left'), node.get('right'), op)
-                
-                # Check for division by zero
-                if op in ['QUOSHUNT_OF', 'MOD_OF'] and right_num == 0:
-                    raise Exception(f"Division or Modulo by zero error in {op}.")
-
-                # Arithmetic calculations
-                if op == 'SUM_OF':
-                    result = left_num + right_num
-                elif op == 'DIFF_OF':
-                    result = left_num - right_num
-                elif op == 'PRODUKT_OF':
-                    result = left_num * right_num
-                elif op == 'QUOSHUNT_OF':
-                    # If both operands evaluated to NUMBR, the result is truncated (integer division)
-                    if result_type == Types.NUMBR:
-                        result = left_num // right_num
-                    else:
-                        result = left_num / right_num
-                elif op == 'MOD_OF':
-                    result = left_num % right_num
-                elif op == 'BIGGR_OF': # Max operation
-                    result = max(left_num, right_num)
-                elif op == 'SMALLR_OF': # Min operation
-                    result = min(left_num, right_num)
-
-                # Ensure result type matches: NUMBR (int) or NUMBAR (float)
+            # Arithmetic calculations
+            if op == 'SUM_OF':
+                result = left_num + right_num
+            elif op == 'DIFF_OF':
+                result = left_num - right_num
+            elif op == 'PRODUKT_OF':
+                result = left_num * right_num
+            elif op == 'QUOSHUNT_OF':
+                # If both operands evaluated to NUMBR, the result is truncated (integer division)
                 if result_type == Types.NUMBR:
-                    result = int(result)
-                elif result_type == Types.NUMBAR:
-                    result = float(result)
+                    result = left_num // right_num
+                else:
+                    result = left_num / right_num
+            elif op == 'MOD_OF':
+                result = left_num % right_num
+            elif op == 'BIGGR_OF': # Max operation
+                result = max(left_num, right_num)
+            elif op == 'SMALLR_OF': # Min operation
+                result = min(left_num, right_num)
+
+            # Ensure result type matches: NUMBR (int) or NUMBAR (float)
+            if result_type == Types.NUMBR:
+                result = int(result)
+            elif result_type == Types.NUMBAR:
+                result = float(result)
 
-                return result, result_type
+            return result, result_type
 
-            # --- Boolean Operations (Require implicit TROOF casting) ---
+        # --- Boolean Operations (Require implicit TROOF casting) ---
+        
+        # Implicitly cast operands to TROOF
+        left_troof = self.cast_value(left_val, left_type, Types.TROOF)
+        right_troof = self.cast_value(right_val, right_type, Types.TROOF)
+        
+        if op == 'BOTH_OF':
+            return (left_troof and right_troof), Types.TROOF
+        elif op == 'EITHER_OF':
+            return (left_troof or right_troof), Types.TROOF
+        elif op == 'WON_OF':
+            return WIN_VALUE if left_troof != right_troof else FAIL_VALUE
+        
+        # --- Comparison Operations (NO implicit casting) ---
+        # Comparisons are done using the raw values/types.
+        elif op == 'BOTH_SAEM':
+            # Relaxed comparison: allow implicit casting
+            if left_type == right_type:
+                return WIN_VALUE if left_val == right_val else FAIL_VALUE
             
-            # Implicitly cast operands to TROOF
-            left_troof = self.cast_value(left_val, left_type, Types.TROOF)
-            right_troof = self.cast_value(right_val, right_type, Types.TROOF)
+            # NUMBR vs NUMBAR
+            if left_type in (Types.NUMBR, Types.NUMBAR) and right_type in (Types.NUMBR, Types.NUMBAR):
+                return WIN_VALUE if float(left_val) == float(right_val) else FAIL_VALUE
             
-            if op == 'BOTH_OF':
-                return (left_troof and right_troof), Types.TROOF
-            elif op == 'EITHER_OF':
-                return (left_troof or right_troof), Types.TROOF
-            elif op == 'WON_OF':
-                return (left_troof != right_troof), Types.TROOF
+            # YARN vs NUMBR/NUMBAR
+            try:
+                if left_type == Types.YARN and right_type in (Types.NUMBR, Types.NUMBAR):
+                    return WIN_VALUE if float(left_val) == float(right_val) else FAIL_VALUE
+                if right_type == Types.YARN and left_type in (Types.NUMBR, Types.NUMBAR):
+                    return WIN_VALUE if float(left_val) == float(right_val) else FAIL_VALUE
+            except ValueError:
+                pass # Casting failed, so they are different
             
-            # --- Comparison Operations (NO implicit casting) ---
-            # Comparisons are done using the raw values/types.
-            elif op == 'BOTH_SAEM':
-                # Relaxed comparison: allow implicit casting
-                if left_type == right_type:
-                    return (left_val == right_val), Types.TROOF
-                
-                # NUMBR vs NUMBAR
-                if left_type in (Types.NUMBR, Types.NUMBAR) and right_type in (Types.NUMBR, Types.NUMBAR):
-                    return (float(left_val) == float(right_val)), Types.TROOF
-                
-                # YARN vs NUMBR/NUMBAR
-                try:
-                    if left_type == Types.YARN and right_type in (Types.NUMBR, Types.NUMBAR):
-                        return (float(left_val) == float(right_val)), Types.TROOF
-                    if right_type == Types.YARN and left_type in (Types.NUMBR, Types.NUMBAR):
-                        return (float(left_val) == float(right_val)), Types.TROOF
-                except ValueError:
-                    pass # Casting failed, so they are different
-                
-                return False, Types.TROOF
+            return FAIL_VALUE
 
-            elif op == 'DIFFRINT':
-                # DIFFRINT is NOT BOTH_SAEM
-                # We can reuse the logic by inverting the result of BOTH_SAEM logic
-                # But for clarity/performance, we can just copy-paste and invert or call a helper.
-                # Let's just duplicate logic but inverted.
-                
-                if left_type == right_type:
-                    return (left_val != right_val), Types.TROOF
-                
-                if left_type in (Types.NUMBR, Types.NUMBAR) and right_type in (Types.NUMBR, Types.NUMBAR):
-                    return (float(left_val) != float(right_val)), Types.TROOF
-                
-                try:
-                    if left_type == Types.YARN and right_type in (Types.NUMBR, Types.NUMBAR):
-                        return (float(left_val) != float(right_val)), Types.TROOF
-                    if right_type == Types.YARN and left_type in (Types.NUMBR, Types.NUMBAR):
-                        return (float(left_val) != float(right_val)), Types.TROOF
-                except ValueError:
-                    pass 
-                
-                return True, Types.TROOF
-                
-            raise Exception(f"Unknown binary operation: {op}")
-                
-        # compute the result of single arg operation
-        elif ntype == 'unary_op':
-            val, t = self.evaluate(node.get('operand'))
-            if node.get('op') == 'NOT':
-                return not bool(val), Types.TROOF
-
-        # multi-arg
-        elif ntype == 'n_ary_op':
-            op = node.get('op')
-            operands = [self.evaluate(x)[0] for x in node.get('operands')]
+        elif op == 'DIFFRINT':
+            # DIFFRINT is NOT BOTH_SAEM
+            # We can reuse the logic by inverting the result of BOTH_SAEM logic
+            # But for clarity/performance, we can just copy-paste and invert or call a helper.
+            # Let's just duplicate logic but inverted.
+            
+            if left_type == right_type:
+                return WIN_VALUE if left_val != right_val else FAIL_VALUE
+            
+            if left_type in (Types.NUMBR, Types.NUMBAR) and right_type in (Types.NUMBR, Types.NUMBAR):
+                return WIN_VALUE if float(left_val) != float(right_val) else FAIL_VALUE
+            
+            try:
+                if left_type == Types.YARN and right_type in (Types.NUMBR, Types.NUMBAR):
+                    return WIN_VALUE if float(left_val) != float(right_val) else FAIL_VALUE
+                if right_type == Types.YARN and left_type in (Types.NUMBR, Types.NUMBAR):
+                    return WIN_VALUE if float(left_val) != float(right_val) else FAIL_VALUE
+            except ValueError:
+                pass 
             
-            if op == 'ALL_OF':
-                return all(operands), Types.TROOF
-            elif op == 'ANY_OF':
-                return any(operands), Types.TROOF
-            elif op == 'SMOOSH':
-                result = "".join(str(self.evaluate(x)[0]) for x in node.get('operands'))
-                return result, Types.YARN
-        # evaluate expression tas typecast
-        elif ntype == 'type_cast':
-            # MAEK
-            val, t = self.evaluate(node.get('expr'))
-            target_type = node.get('type')
-            return self.cast_value(val, t, target_type), target_type
-
-        return None, Types.NOOB
+            return WIN_VALUE
+            
+        raise Exception(f"Unknown binary operation: {op}")
+
+    # compute the result of single arg operation
+    def apply_unary_op(self, node, values):
+        val, t = values[0]
+        if node.op == 'NOT':
+            return FAIL_VALUE if val else WIN_VALUE
+        return NOOB_VALUE
+
+    # multi-arg
+    def apply_n_ary_op(self, node, values):
+        op = node.op
+        operands = [val for val, t in values]
+        
+        if op == 'ALL_OF':
+            return WIN_VALUE if all(operands) else FAIL_VALUE
+        elif op == 'ANY_OF':
+            return WIN_VALUE if any(operands) else FAIL_VALUE
+        elif op == 'SMOOSH':
+            result = "".join(str(x) for x in operands)
+            return result, Types.YARN
+        return NOOB_VALUE
+
+    # evaluate expression tas typecast (MAEK)
+    def apply_maek(self, node, values):
+        val, t = values[0]
+        target_type = node.type
+        return self.cast_value(val, t, target_type), target_type
+
+    # statements aren't expressions
+    def apply_nothing(self, node, values):
+        return NOOB_VALUE
 
     def dump_symbol_table(self):
         # Helper to format value for display
@@ -598,58 +981,204 @@ class Interpreter:
                 return "WIN" if val else "FAIL"
             return val
 
-        # Merge scopes from bottom to top to get current visible variables
+        # Merge frames from bottom to top to get current visible variables
         symbols = {}
-        for scope in self.scopes:
-            for name, info in scope.items():
-                symbols[name] = {
-                    'value': format_val(info['value'], info['type']),
-                    'type': info['type']
+        for frame, layout in zip(self.frames, self.layouts):
+            names = list(layout)
+            slots = self.declared if frame is self.frames[0] else range(len(frame))
+            for slot in slots:
+                if frame[slot] is None:
+                    continue
+                val, t = frame[slot]
+                symbols[names[slot]] = {
+                    'value': format_val(val, t),
+                    'type': t
                 }
         
         # Also include IT variable
         symbols['IT'] = {
-            'value': format_val(self.it_register['value'], self.it_register['type']),
-            'type': self.it_register['type']
+            'value': format_val(self.it_register[0], self.it_register[1]),
+            'type': self.it_register[1]
         }
         
         import json
         return json.dumps(symbols, default=str)
 
+# the compiler of a --backend for interpreter, None for the tree-walking one. code_cache is the
+# cache.CodeCache the python one compiles through, if any
+def new_compiler(backend, interpreter, code_cache=None):
+    if backend == "closures":
+        from closures import ClosureCompiler
+        return ClosureCompiler(interpreter)
+    if backend == "python":
+        from transpiler import Transpiler
+        return Transpiler(interpreter, code_cache)
+    if backend == "vm":
+        from vm import BytecodeCompiler
+        return BytecodeCompiler(interpreter)
+    return None
+
 if __name__ == "__main__":
     # For quick testing, we can import parser if running directly
     if len(sys.argv) > 1:
         import os
         sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from lexer1 import TokenWriter, Token, iter_lexemes
         from syntax2 import Parser
-        from lexer1 import get_tokens
+        from cache import ParseCache, CodeCache, parse_source
         
-        filepath = sys.argv[1]
-        with open(filepath, 'r') as f:
-            code = f.read()
+        # --no-cache lexes and parses even if the same code ran before
+        use_cache = "--no-cache" not in sys.argv
+        # --pipeline runs every top-level statement as soon as it's parsed instead of parsing the
+        # whole file first. a syntax error stops the program where it is
+        pipeline = "--pipeline" in sys.argv
+        # --optimize runs the program through optimizer.Optimizer first, --optimize-report does too
+        # and also prints what it changed (to stderr, so the output stays the program's)
+        report = "--optimize-report" in sys.argv
+        optimizer = None
+        if report or "--optimize" in sys.argv:
+            from optimizer import Optimizer
+            optimizer = Optimizer()
+        # --backend=NAME picks what runs the program: tree (the default) goes over the AST node by
+        # node, closures compiles it into python closures first (see closures.py), python into
+        # python source (see transpiler.py), vm into bytecode for a stack machine (see vm.py)
+        backend = "tree"
+        save_bytecode = None
+        # --memoize has the tree backend keep what calls of pure functions give (see memo.py),
+        # --memoize=NAME,... those functions too, --no-memoize=NAME,... never those, and
+        # --memo-size=N how many calls a function keeps. the hits and misses go to stderr
+        memoize = False
+        memo_force = []
+        memo_forbid = []
+        memo_size = None
+        # --max-depth=N is how many calls the vm backend lets run at once (a tail call doesn't
+        # count, see vm.py), deeper recursion is a runtime error
+        max_depth = None
+        for arg in sys.argv[1:]:
+            if arg == "--memoize":
+                memoize = True
+            elif arg.startswith("--memoize="):
+                memoize = True
+                memo_force += [name for name in arg[len("--memoize="):].split(",") if name]
+            elif arg.startswith("--no-memoize="):
+                memo_forbid += [name for name in arg[len("--no-memoize="):].split(",") if name]
+            elif arg.startswith("--memo-size="):
+                memo_size = int(arg[len("--memo-size="):])
+            elif arg.startswith("--max-depth="):
+                max_depth = int(arg[len("--max-depth="):])
+            if arg.startswith("--backend="):
+                backend = arg[len("--backend="):]
+            # --save-bytecode=FILE writes the program compiled for the vm to FILE instead of running
+            # it (python vm.py FILE runs it)
+            if arg.startswith("--save-bytecode="):
+                save_bytecode = arg[len("--save-bytecode="):]
+        if backend not in ("tree", "closures", "python", "vm"):
+            print(f"Unknown backend '{backend}', expected tree, closures, python or vm")
+            sys.exit(2)
+        memoizer = None
+        if memoize:
+            if backend != "tree":
+                print("--memoize only works with --backend=tree")
+                sys.exit(2)
+            from memo import Memoizer, MEMO_SIZE
+            memoizer = Memoizer(memo_size or MEMO_SIZE, memo_force, memo_forbid)
+        if max_depth is not None and backend != "vm":
+            print("--max-depth only works with --backend=vm")
+            sys.exit(2)
+        code_cache = CodeCache() if use_cache else None
+        # --dump-python prints the python transpiler.py makes of the program instead of running it
+        dump_python = "--dump-python" in sys.argv
+        # --disassemble prints the bytecode vm.py makes of the program instead of running it
+        disassemble = "--disassemble" in sys.argv
+        if dump_python or disassemble or save_bytecode:
+            pipeline = False
+        filepath = [arg for arg in sys.argv[1:] if not arg.startswith("--")][0]
+
+        if pipeline:
+            # the tokens are lexed from the file as the parser gets to them, and kept for the dump
+            spans = []
+            def read_tokens(f):
+                for span in iter_lexemes(f):
+                    spans.append(span)
+                    type, value, start, end, line, column = span
+                    yield Token(type, value, line, column)
+
+            with open(filepath, 'r') as f:
+                tokens = read_tokens(f)
+                parser = Parser(tokens)
+                interpreter = Interpreter()
+                interpreter.memoizer = memoizer
+                compiler = new_compiler(backend, interpreter, code_cache)
+                if max_depth is not None:
+                    compiler.vm.max_depth = max_depth
+                statements = parser.iter_statements()
+                if optimizer is not None:
+                    statements = optimizer.optimized(statements)
+                interpreter.execute_stream(statements, parser.errors, compiler)
+                # whatever the parser didn't have to look at, for the dump
+                for token in tokens:
+                    pass
+            errors = parser.errors
+        else:
+            with open(filepath, 'r') as f:
+                code = f.read()
             
-        tokens = get_tokens(code)
-        parser = Parser(tokens)
-        ast = parser.parse()
+            stream, ast, errors = parse_source(code, ParseCache() if use_cache else None)
+            spans = stream.spans()
   
-        if parser.errors:
+        if errors:
             print("Syntax Errors:")
-            for err in parser.errors:
+            for err in errors:
                 print(err)
             sys.exit(1)
             
-        interpreter = Interpreter()
-        interpreter.execute(ast)
+        if not pipeline:
+            interpreter = Interpreter()
+            interpreter.memoizer = memoizer
+            # variables no I HAS A ever declares are reported before anything runs
+            undeclared = interpreter.resolve(ast)
+            if undeclared:
+                print("Semantic Errors:")
+                for err in undeclared:
+                    print(err)
+                sys.exit(1)
+            if optimizer is not None:
+                optimizer.optimize(ast)
+            if dump_python:
+                from transpiler import Transpiler
+                print(Transpiler(interpreter).source(ast), end="")
+                sys.exit(0)
+            if disassemble or save_bytecode:
+                import vm
+                code = vm.BytecodeCompiler(interpreter).assemble(ast)
+                if disassemble:
+                    print(vm.disassemble(code))
+                if save_bytecode:
+                    with open(save_bytecode, "wb") as f:
+                        vm.save(code, f)
+                sys.exit(0)
+            compiler = new_compiler(backend, interpreter, code_cache)
+            if max_depth is not None:
+                compiler.vm.max_depth = max_depth
+            if compiler is not None:
+                interpreter.execute_compiled(ast, compiler)
+            else:
+                interpreter.execute(ast)
         
-        # Dump tokens
-        token_list = []
-        for t in tokens:
-            token_list.append({
-                'lexeme': t.value,
-                'classification': t.label,
-                'line': t.line
-            })
-        print(f"\n<<TOKENS>>{json.dumps(token_list)}")
+        if report:
+            for change in optimizer.report:
+                print(change, file=sys.stderr)
+        if memoizer is not None:
+            for line in memoizer.report():
+                print(line, file=sys.stderr)
+
+        # Dump tokens, one json object per line between the markers
+        print("\n<<TOKENS>>", flush=True)
+        writer = TokenWriter(sys.stdout.buffer, "ndjson")
+        for span in spans:
+            writer.write(*span)
+        writer.close()
+        print("<<END_TOKENS>>")
 
         # Dump symbol table at the end
         print(f"\n<<SYMBOL_TABLE>>{interpreter.dump_symbol_table()}")
\ No newline at end of file
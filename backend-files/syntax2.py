@@ -6,25 +6,200 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Importing
 try:
-    from lexer1 import get_tokens, Token
+    from lexer1 import iter_tokens, Token, TokenStream, IncrementalLexer, TOKEN_TYPES, TYPE_IDS
 except ImportError:
     try:
-        from lexer1 import get_tokens, Token
+        from lexer1 import iter_tokens, Token, TokenStream, IncrementalLexer, TOKEN_TYPES, TYPE_IDS
     except ImportError:
         print("Error: Could not import 'lexer1.py'. Make sure it's in the parent directory.", file=sys.stderr)
         sys.exit(1)
 
 # import regex
 import re
+from operator import attrgetter
+
+from ast_nodes import (Program, VarBlock, VarDecl, Assignment, TypeCast, Input, Visible, IfStmt, ElseIf,
+                       SwitchStmt, Case, Loop, LoopOperation, LoopCondition, Break, FuncDef, FuncCall, Return,
+                       BinaryOp, NAryOp, UnaryOp, Maek, Operand, N_ARY_OP, shift_lines)
 
 VAR_NAME_REGEX = re.compile(r"^[A-Za-z][A-Za-z0-9_]*$")
 
+# token kinds the parser looks at, as the ids a TokenStream stores (see lexer1.TOKEN_TYPES).
+# comparing small ints and looking them up in frozensets and lists is what makes the parser fast
+K_BTW = TYPE_IDS["BTW"]
+K_OBTW = TYPE_IDS["OBTW"]
+K_TLDR = TYPE_IDS["TLDR"]
+K_HAI = TYPE_IDS["HAI"]
+K_VERSION = TYPE_IDS["VERSION"]
+K_KTHXBYE = TYPE_IDS["KTHXBYE"]
+K_WAZZUP = TYPE_IDS["WAZZUP"]
+K_BUHBYE = TYPE_IDS["BUHBYE"]
+K_I_HAS_A = TYPE_IDS["I_HAS_A"]
+K_ITZ = TYPE_IDS["ITZ"]
+K_R = TYPE_IDS["R"]
+K_IS_NOW_A = TYPE_IDS["IS_NOW_A"]
+K_TYPE = TYPE_IDS["TYPE"]
+K_A = TYPE_IDS["A"]
+K_IDENTIFIER = TYPE_IDS["IDENTIFIER"]
+K_IT = TYPE_IDS["IT"]
+K_VISIBLE = TYPE_IDS["VISIBLE"]
+K_GIMMEH = TYPE_IDS["GIMMEH"]
+K_AN = TYPE_IDS["AN"]
+K_PLUS = TYPE_IDS["PLUS"]
+K_MKAY = TYPE_IDS["MKAY"]
+K_ORLY = TYPE_IDS["ORLY"]
+K_YA_RLY = TYPE_IDS["YA_RLY"]
+K_MEBBE = TYPE_IDS["MEBBE"]
+K_NO_WAI = TYPE_IDS["NO_WAI"]
+K_OIC = TYPE_IDS["OIC"]
+K_WTF = TYPE_IDS["WTF"]
+K_OMG = TYPE_IDS["OMG"]
+K_OMGWTF = TYPE_IDS["OMGWTF"]
+K_GTFO = TYPE_IDS["GTFO"]
+K_IM_IN_YR = TYPE_IDS["IM_IN_YR"]
+K_IM_OUTTA_YR = TYPE_IDS["IM_OUTTA_YR"]
+K_UPPIN = TYPE_IDS["UPPIN"]
+K_NERFIN = TYPE_IDS["NERFIN"]
+K_YR = TYPE_IDS["YR"]
+K_TIL = TYPE_IDS["TIL"]
+K_WILE = TYPE_IDS["WILE"]
+K_HOW_IZ_I = TYPE_IDS["HOW_IZ_I"]
+K_IF_U_SAY_SO = TYPE_IDS["IF_U_SAY_SO"]
+K_I_IZ = TYPE_IDS["I_IZ"]
+K_FOUND_YR = TYPE_IDS["FOUND_YR"]
+K_NOT = TYPE_IDS["NOT"]
+K_MAEK = TYPE_IDS["MAEK"]
+K_SMOOSH = TYPE_IDS["SMOOSH"]
+K_INTEGER_LITERAL = TYPE_IDS["INTEGER_LITERAL"]
+K_FLOAT_LITERAL = TYPE_IDS["FLOAT_LITERAL"]
+K_STRING = TYPE_IDS["STRING"]
+K_TROOF_LITERAL = TYPE_IDS["TROOF_LITERAL"]
+K_UNKNOWN = TYPE_IDS["UNKNOWN"]
+K_EOF = TYPE_IDS["EOF"]
+KIND_COUNT = len(TOKEN_TYPES)
+
+def kinds_of(names):
+    return frozenset(TYPE_IDS[name] for name in names)
+
+# operators with two operands (x AN y)
+BINARY_OPS = kinds_of(("SUM_OF", "DIFF_OF", "PRODUKT_OF", "QUOSHUNT_OF", "MOD_OF",
+                       "BIGGR_OF", "SMALLR_OF", "BOTH_OF", "EITHER_OF", "WON_OF",
+                       "BOTH_SAEM", "DIFFRINT"))
+# operators with any number of operands (x AN y AN z ...)
+N_ARY_OPS = kinds_of(("ALL_OF", "ANY_OF", "SMOOSH"))
+UNARY_OPS = kinds_of(("NOT", "MAEK"))
+
+def string_literal(value):
+    return value.strip('"')
+
+def troof_literal(value):
+    return value # keep as WIN/FAIL string for now, or convert to bool
+
+# literal kinds and how their lexeme becomes the operand's value
+LITERALS = {
+    K_INTEGER_LITERAL: int,
+    K_FLOAT_LITERAL: float,
+    K_STRING: string_literal,
+    K_TROOF_LITERAL: troof_literal,
+}
+
+# FIRST sets: the kinds a construct can start with
+EXPRESSION_START = BINARY_OPS | N_ARY_OPS | UNARY_OPS | frozenset(LITERALS) | {K_IDENTIFIER, K_IT}
+COMMENT_START = frozenset((K_BTW, K_OBTW))
+# kinds that end the statements of a block
+IF_BLOCK_END = frozenset((K_NO_WAI, K_OIC, K_MEBBE, K_EOF))
+ELSE_BLOCK_END = frozenset((K_OIC, K_EOF))
+CASE_BLOCK_END = frozenset((K_OMG, K_OMGWTF, K_OIC, K_EOF))
+ARG_SEPARATORS = frozenset((K_AN, K_PLUS))
+# what can come next in a VISIBLE that isn't over yet
+VISIBLE_CONTINUE = ARG_SEPARATORS | EXPRESSION_START
+LOOP_OPERATIONS = frozenset((K_UPPIN, K_NERFIN))
+LOOP_CONDITIONS = frozenset((K_TIL, K_WILE))
+
+# stands for the left operand of a binary operator that isn't parsed yet (None is a failed operand)
+NO_OPERAND = object()
+
+# what current() and peek() give past the last token
+EOF_TOKEN = Token("EOF", "", -1, -1)
+
+# lets the parser index into a token iterator (like lexer1.iter_tokens)
+# the parser never goes back more than one token, so only the last few tokens are kept
+class TokenWindow:
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.window = []
+        # index of the first token still in the window
+        self.offset = 0
+
+    def __getitem__(self, index):
+        # drop tokens the parser moved past, keeping the one before for good measure
+        drop = index - 1 - self.offset
+        if drop > 0:
+            del self.window[:drop]
+            self.offset += drop
+        while index - self.offset >= len(self.window):
+            token = next(self.tokens, None)
+            if token is None:
+                raise IndexError(index)
+            self.window.append(token)
+        return self.window[index - self.offset]
+
+# the tokens of an IncrementalLexer, made into Token objects as they're read
+class LexerTokens:
+    def __init__(self, lexer):
+        self.lexer = lexer
+        # the parser reads the same token a few times in a row
+        self.last_index = -1
+        self.last_token = None
+
+    def __getitem__(self, index):
+        if index != self.last_index:
+            type, start, end, line, column = self.lexer.token_at(index)
+            self.last_token = Token(type, self.lexer.code[start:end], line, column)
+            self.last_index = index
+        return self.last_token
+
+# one field of every token of an indexable token source (a TokenWindow or LexerTokens),
+# read from the token when it's asked for
+class TokenField:
+    def __init__(self, tokens, read):
+        self.tokens = tokens
+        self.read = read
+
+    def __getitem__(self, index):
+        return self.read(self.tokens[index])
+
+def format_error(line, message, value):
+    return f"Line {line}: {message} (token: '{value}')"
+
+# a token of a type the lexer doesn't make is one no rule starts with
+def token_kind(token):
+    return TYPE_IDS.get(token.type, K_UNKNOWN)
+
 class Parser:
-    # take a list of tokens
+    # take a list of tokens, a TokenStream, a LexerTokens, or any iterator of tokens
     def __init__(self, tokens):
-        # store
+        # store. kinds and lines are sequences, value_at(index) gives a lexeme. only tokens
+        # that are there are read through them, current() is what gives EOF_TOKEN past the end
+        if isinstance(tokens, TokenStream):
+            # the stream has them already
+            self.kinds = tokens.types
+            self.lines = tokens.lines
+            self.value_at = tokens.value_at
+        elif isinstance(tokens, (list, tuple)):
+            self.kinds = [token_kind(token) for token in tokens]
+            self.lines = [token.line for token in tokens]
+            self.value_at = [token.value for token in tokens].__getitem__
+        else:
+            if not hasattr(tokens, "__getitem__"):
+                tokens = TokenWindow(tokens)
+            self.kinds = TokenField(tokens, token_kind)
+            self.lines = TokenField(tokens, attrgetter("line"))
+            self.value_at = TokenField(tokens, attrgetter("value")).__getitem__
         self.tokens = tokens
         self.position = 0
+        # kind of the current token, kept in step with position by advance() and seek()
+        self.kind = self.kind_at(0)
         # list to store any syntax errors
         self.errors = []
         # to  track declared var
@@ -32,205 +207,252 @@ class Parser:
         # flagg
         self.in_wazzup = False
 
+        # what parses a statement, per kind of its first token
+        self.statement_parsers = [self.skip_statement] * KIND_COUNT
+        self.statement_parsers[K_I_HAS_A] = self.var_declaration
+        self.statement_parsers[K_IDENTIFIER] = self.identifier_statement
+        self.statement_parsers[K_VISIBLE] = self.output_statement
+        self.statement_parsers[K_GIMMEH] = self.input_statement
+        self.statement_parsers[K_ORLY] = self.if_statement
+        self.statement_parsers[K_IM_IN_YR] = self.loop_statement
+        self.statement_parsers[K_HOW_IZ_I] = self.function_def
+        self.statement_parsers[K_WTF] = self.switch_statement
+        self.statement_parsers[K_GTFO] = self.break_statement
+        self.statement_parsers[K_FOUND_YR] = self.return_statement
+        self.statement_parsers[K_I_IZ] = self.function_call
+        for kind in EXPRESSION_START - {K_IDENTIFIER}:
+            self.statement_parsers[kind] = self.expression_statement
+
     # returns the current token
     def current(self):
-        return self.tokens[self.position] if self.position < len(self.tokens) else Token("EOF", "", -1, -1)
+        return self.token_at(self.position)
 
     # returns the token aftre the current one
     def peek(self):
-        if self.position + 1 < len(self.tokens):
-            return self.tokens[self.position + 1]
-        return Token("EOF", "", -1, -1)
-
-    # eat or consume the current token if nag-mamatch sa expected type
-    def eat(self, token_type):
-        if self.current().type == token_type:
+        return self.token_at(self.position + 1)
+
+    def token_at(self, index):
+        try:
+            return self.tokens[index]
+        except IndexError:
+            return EOF_TOKEN
+
+    def kind_at(self, index):
+        try:
+            return self.kinds[index]
+        except IndexError:
+            return K_EOF
+
+    # moves to the next token
+    def advance(self):
+        self.position += 1
+        try:
+            self.kind = self.kinds[self.position]
+        except IndexError:
+            self.kind = K_EOF
+
+    # moves to the token at position
+    def seek(self, position):
+        self.position = position
+        self.kind = self.kind_at(position)
+
+    # eat or consume the current token if nag-mamatch sa expected kind
+    def eat(self, kind):
+        if self.kind == kind:
             token = self.current()
-            self.position += 1
+            self.advance()
             return token
         # if hindi nagmamatch
         else:
-            self.record_error(f"Expected {token_type}, got {self.current().type}", self.current())
-            self.position += 1
+            self.record_error(f"Expected {TOKEN_TYPES[kind]}, got {self.current().type}", self.current())
+            self.advance()
             return None
 
     # function to format and record a syntax error
     def record_error(self, message, token):
-        self.errors.append(f"Line {token.line}: {message} (token: '{token.value}')")
+        self.errors.append(format_error(token.line, message, token.value))
 
     # main function for parsing process
     def parse(self):
         self.skip_comments()
         program_node = self.program()
-        if self.current().type != "EOF":
-            self.record_error("Unexpected tokens after program end", self.current())
+        self.check_trailing()
         return program_node
 
+    # parses the program like parse(), but gives each top-level statement (the statements in a
+    # WAZZUP block one by one too) as soon as it's parsed, so it can be run before the rest of
+    # the program is read. errors go to self.errors as usual
+    def iter_statements(self):
+        self.skip_comments()
+        self.program_start()
+        if self.kind == K_WAZZUP:
+            self.in_wazzup = True
+            self.advance()
+            yield from self.statements_until(K_BUHBYE)
+            self.var_block_end([])
+        yield from self.statements_until(K_KTHXBYE)
+        self.program_end()
+        self.check_trailing()
+
+    # nothing may come after KTHXBYE
+    def check_trailing(self):
+        if self.kind != K_EOF:
+            self.record_error("Unexpected tokens after program end", self.current())
+
     # skips over BTW (single-line) and OBTW/TLDR (multi-line) comments
     def skip_comments(self):
-        while self.current().type in ("BTW", "OBTW"):
-            if self.current().type == "BTW":
-                self.position += 1
-            elif self.current().type == "OBTW":
-                self.position += 1
-                while self.current().type != "TLDR" and self.current().type != "EOF":
-                    self.position += 1
-                if self.current().type == "TLDR":
-                    self.position += 1
+        while self.kind in COMMENT_START:
+            if self.kind == K_BTW:
+                self.advance()
+            else:
+                self.advance()
+                while self.kind != K_TLDR and self.kind != K_EOF:
+                    self.advance()
+                if self.kind == K_TLDR:
+                    self.advance()
 
     # parses the main LOLCODE program structure
     def program(self):
         nodes = []
-        if self.current().type != "HAI":
-            self.record_error("Program must start with HAI", self.current())
-            if self.current().type != "HAI":
-                 self.position += 1
-        # if 'HAI' is founnd
-        else:
-            self.eat("HAI")
-            if self.current().type == "VERSION":
-                self.eat("VERSION") 
+        self.program_start()
 
         # checks for the optional variable declaration blockk
-        if self.current().type == "WAZZUP":
+        if self.kind == K_WAZZUP:
             self.in_wazzup = True
-            self.eat("WAZZUP")
-            var_block = []
-            while self.current().type != "BUHBYE" and self.current().type != "EOF":
-                stmt = self.statement()
-                if stmt:
-                    var_block.append(stmt)
-            
-            nodes.append({"node_type": "var_block", "body": var_block, "line": self.current().line})
-
-            # check for closing token of the variable block
-            if self.current().type != "BUHBYE":
-                self.record_error("Missing BUHBYE after WAZZUP", self.current())
-            # if 'BUHBYE' is found
-            else:
-                self.eat("BUHBYE")
-            self.in_wazzup = False
+            self.advance()
+            var_block = list(self.statements_until(K_BUHBYE))
+            nodes.append(self.var_block_end(var_block))
 
         # Parse main program statements until KTHXBYE or EOF
-        while self.current().type != "KTHXBYE" and self.current().type != "EOF":
+        nodes += self.statements_until(K_KTHXBYE)
+
+        self.program_end()
+        return Program(nodes)
+
+    # parses statements until a token of kind end (or EOF), giving each one when it's done
+    def statements_until(self, end):
+        while self.kind != end and self.kind != K_EOF:
             stmt = self.statement()
             if stmt:
-                nodes.append(stmt)
+                yield stmt
 
-        if self.current().type != "KTHXBYE":
+    # HAI (VERSION)
+    def program_start(self):
+        if self.kind != K_HAI:
+            self.record_error("Program must start with HAI", self.current())
+            self.advance()
+        # if 'HAI' is founnd
+        else:
+            self.advance()
+            if self.kind == K_VERSION:
+                self.advance()
+
+    # the BUHBYE closing a WAZZUP block, gives the VarBlock of the statements in it
+    def var_block_end(self, var_block):
+        node = VarBlock(var_block, self.current().line)
+
+        # check for closing token of the variable block
+        if self.kind != K_BUHBYE:
+            self.record_error("Missing BUHBYE after WAZZUP", self.current())
+        # if 'BUHBYE' is found
+        else:
+            self.advance()
+        self.in_wazzup = False
+        return node
+
+    # the closing KTHXBYE
+    def program_end(self):
+        if self.kind != K_KTHXBYE:
             self.record_error("Program must end with KTHXBYE", self.current())
         else:
-            self.eat("KTHXBYE")
-        
-        return {"node_type": "program", "body": nodes}
+            self.advance()
 
     # parses a single LOLCODE statement
     def statement(self):
         self.skip_comments()
-        # get the type of the current token
-        tok = self.current().type
-        if tok == "I_HAS_A":
-            return self.var_declaration()
-        elif tok == "IDENTIFIER":
-            if self.peek().type == "R":
-                return self.assignment()
-            elif self.peek().type == "IS_NOW_A":
-                return self.type_cast()
-            else:
-                # Bare identifier should assign to IT
-                expr = self.parse_expression()
-                return {"node_type": "assignment", "target": "IT", "expr": expr, "line": expr.get('line')} # Expression as statement (e.g. IT = expr)
-        elif tok == "VISIBLE":
-            return self.output_statement()
-        elif tok == "GIMMEH":
-            return self.input_statement()
-        elif tok == "ORLY":
-            return self.if_statement()
-        elif tok == "IM_IN_YR":
-            return self.loop_statement()
-        elif tok == "HOW_IZ_I":
-            return self.function_def()
-        elif tok == "WTF":
-            return self.switch_statement()
-        elif tok == "GTFO":
-            line = self.current().line
-            self.eat("GTFO")
-            return {"node_type": "break", "line": line}
-        elif tok == "FOUND_YR":
-            return self.return_statement()
-        elif tok == "I_IZ":
-            return self.function_call()
-        elif tok in ("SUM_OF", "DIFF_OF", "PRODUKT_OF", "QUOSHUNT_OF", "MOD_OF", 
-                     "BIGGR_OF", "SMALLR_OF", "BOTH_OF", "EITHER_OF", "WON_OF", 
-                     "NOT", "ALL_OF", "ANY_OF", "BOTH_SAEM", "DIFFRINT", "SMOOSH", "MAEK",
-                     "INTEGER_LITERAL", "FLOAT_LITERAL", "STRING", "TROOF_LITERAL", "IT"):
-            # Standalone expression, implicitly assigns to IT
-            expr = self.parse_expression()
-            return {"node_type": "assignment", "target": "IT", "expr": expr, "line": expr.get('line')}
-        # if the token doesn't match any known statement type
+        # pick the rule by the kind of the current token
+        return self.statement_parsers[self.kind]()
+
+    # if the token doesn't start any known statement type
+    def skip_statement(self):
+        # self.record_error(f"Unexpected token {tok} in statement", self.current())
+        self.advance()
+        return None
+
+    # an identifier starts an assignment, a type cast or an expression
+    def identifier_statement(self):
+        next_kind = self.kind_at(self.position + 1)
+        if next_kind == K_R:
+            return self.assignment()
+        elif next_kind == K_IS_NOW_A:
+            return self.type_cast()
         else:
-            # self.record_error(f"Unexpected token {tok} in statement", self.current())
-            self.position += 1
-            return None
+            # Bare identifier should assign to IT
+            return self.expression_statement()
+
+    # Standalone expression, implicitly assigns to IT
+    def expression_statement(self):
+        expr = self.parse_expression()
+        return Assignment("IT", expr, expr.line)
 
     # parses a var declaration
     def var_declaration(self):
-        line = self.current().line
-        self.eat("I_HAS_A")
+        line = self.lines[self.position]
+        self.advance()
         name = None
-        if self.current().type != "IDENTIFIER":
+        if self.kind != K_IDENTIFIER:
             self.record_error("Invalid variable name in declaration", self.current())
         # If it is an identifier
         else:
-            if not VAR_NAME_REGEX.match(self.current().value):
-                 self.record_error(f"Invalid variable name format '{self.current().value}'", self.current())
-            name = self.current().value
+            name = self.value_at(self.position)
+            if not VAR_NAME_REGEX.match(name):
+                 self.record_error(f"Invalid variable name format '{name}'", self.current())
             self.variables_declared.add(name)
-            self.eat("IDENTIFIER")
+            self.advance()
         
         init_val = None
         # check for optional initialization (ITZ expression)
-        if self.current().type == "ITZ":
-            self.eat("ITZ")
+        if self.kind == K_ITZ:
+            self.advance()
             init_val = self.parse_expression()
             
-        return {"node_type": "var_decl", "name": name, "value": init_val, "line": line}
+        return VarDecl(name, init_val, line)
 
     # Parses an assignment statement
     def assignment(self):
-        line = self.current().line
-        target = self.current().value
-        self.eat("IDENTIFIER")
-        self.eat("R")
+        line = self.lines[self.position]
+        target = self.value_at(self.position)
+        self.advance()
+        self.advance()
         expr = self.parse_expression()
-        return {"node_type": "assignment", "target": target, "expr": expr, "line": line}
+        return Assignment(target, expr, line)
 
     # Parses an explicit type cast
     def type_cast(self):
-        line = self.current().line
-        target = self.current().value
-        self.eat("IDENTIFIER")
-        self.eat("IS_NOW_A")
+        line = self.lines[self.position]
+        target = self.value_at(self.position)
+        self.advance()
+        self.advance()
         target_type = self.current().value
-        self.eat("TYPE") 
-        return {"node_type": "type_cast", "target": target, "type": target_type, "line": line}
+        self.eat(K_TYPE) 
+        return TypeCast(target, target_type, line)
 
     # Parses an input statement
     def input_statement(self):
-        line = self.current().line
-        self.eat("GIMMEH")
+        line = self.lines[self.position]
+        self.advance()
         var_name = None
-        if self.current().type != "IDENTIFIER":
+        if self.kind != K_IDENTIFIER:
             self.record_error("GIMMEH must be followed by variable", self.current())
         else:
-            var_name = self.current().value
-            self.eat("IDENTIFIER")
-        return {"node_type": "input", "variable": var_name, "line": line}
+            var_name = self.value_at(self.position)
+            self.advance()
+        return Input(var_name, line)
 
     # Parses an output statement
     def output_statement(self):
-        line = self.current().line
-        self.eat("VISIBLE")
+        line = self.lines[self.position]
+        self.advance()
         args = []
 
         # Expect at least one expression
@@ -238,313 +460,300 @@ class Parser:
         args.append(first_arg)
         
         # Track the line of the last argument to detect implicit newlines
-        last_arg_line = first_arg.get('line', line)
+        last_arg_line = first_arg.line
 
-        while self.current().type in ("AN", "PLUS") or self.is_expression_start(self.current().type):
-            # Check for implicit concatenation across lines
-            if self.current().type not in ("AN", "PLUS"):
-                if self.current().line > last_arg_line:
-                    break
-
-            # Only eat AN if it is NOT inside SMOOSH
-            if self.current().type in ("AN", "PLUS"):
+        while self.kind in VISIBLE_CONTINUE:
+            if self.kind in ARG_SEPARATORS:
+                # Only eat AN if it is NOT inside SMOOSH
                 # Peek previous node
-                if args[-1]['node_type'] != 'n_ary_op' or args[-1].get('op') != 'SMOOSH':
-                    self.eat(self.current().type)
+                if args[-1].tag != N_ARY_OP or args[-1].op != 'SMOOSH':
+                    self.advance()
                 else:
                     break  # Stop eating ANs for SMOOSH
+            # Check for implicit concatenation across lines
+            elif self.lines[self.position] > last_arg_line:
+                break
             
             args.append(self.parse_expression())
-            last_arg_line = args[-1].get('line', last_arg_line)
+            last_arg_line = args[-1].line
 
-        return {"node_type": "visible", "args": args, "line": line}
+        return Visible(args, line)
 
     # Parses an if statement
     def if_statement(self):
-        line = self.current().line
-        self.eat("ORLY")
-        if self.current().type != "YA_RLY":
+        line = self.lines[self.position]
+        self.advance()
+        if self.kind != K_YA_RLY:
             self.record_error("Missing YA_RLY after ORLY", self.current())
         # If 'YA_RLY' is present
         else:
-            self.eat("YA_RLY")
+            self.advance()
         
-        true_block = []
         # Parse statements in the 'YA RLY' block
-        while self.current().type not in ("NO_WAI", "OIC", "MEBBE", "EOF"):
-            stmt = self.statement()
-            if stmt: true_block.append(stmt)
+        true_block = self.block(IF_BLOCK_END)
             
         else_if_blocks = []
         # Loop for optional ELSE IF blocks
-        while self.current().type == "MEBBE":
-            self.eat("MEBBE")
+        while self.kind == K_MEBBE:
+            self.advance()
             cond = self.parse_expression()
-            block = []
-            while self.current().type not in ("NO_WAI", "OIC", "MEBBE", "EOF"):
-                stmt = self.statement()
-                if stmt: block.append(stmt)
-            else_if_blocks.append({"condition": cond, "body": block})
+            block = self.block(IF_BLOCK_END)
+            else_if_blocks.append(ElseIf(cond, block))
 
         else_block = []
         # Check for optional ELSE block
-        if self.current().type == "NO_WAI":
-            self.eat("NO_WAI")
-            while self.current().type not in ("OIC", "EOF"):
-                stmt = self.statement()
-                if stmt: else_block.append(stmt)
+        if self.kind == K_NO_WAI:
+            self.advance()
+            else_block = self.block(ELSE_BLOCK_END)
         
         # Check for the mandatory IF block end
-        if self.current().type != "OIC":
+        if self.kind != K_OIC:
             self.record_error("Missing OIC at end of IF block", self.current())
         else:
-            self.eat("OIC")
+            self.advance()
             
-        return {
-            "node_type": "if_stmt",
-            "true_block": true_block,
-            "else_if_blocks": else_if_blocks,
-            "else_block": else_block,
-            "line": line
-        }
+        return IfStmt(true_block, else_if_blocks, else_block, line)
 
     # Parses a switch statement
     def switch_statement(self):
-        line = self.current().line
-        self.eat("WTF")
-        if self.current().type != "OMG":
+        line = self.lines[self.position]
+        self.advance()
+        if self.kind != K_OMG:
              self.record_error("Expected OMG after WTF", self.current())
         
         cases = []
         # Loop for one or more case blocks
-        while self.current().type == "OMG":
-            self.eat("OMG")
+        while self.kind == K_OMG:
+            self.advance()
             val = self.parse_literal()
-            body = []
-            while self.current().type not in ("OMG", "OMGWTF", "OIC", "EOF"):
-                stmt = self.statement()
-                if stmt: body.append(stmt)
-            cases.append({"value": val, "body": body})
+            body = self.block(CASE_BLOCK_END)
+            cases.append(Case(val, body))
         
         default_case = []
         # Check for optional default case
-        if self.current().type == "OMGWTF":
-            self.eat("OMGWTF")
-            while self.current().type not in ("OIC", "EOF"):
-                stmt = self.statement()
-                if stmt: default_case.append(stmt)
+        if self.kind == K_OMGWTF:
+            self.advance()
+            default_case = self.block(ELSE_BLOCK_END)
         
-        self.eat("OIC")
-        return {"node_type": "switch_stmt", "cases": cases, "default": default_case, "line": line}
+        self.eat(K_OIC)
+        return SwitchStmt(cases, default_case, line)
 
     # Parses a loop
     def loop_statement(self):
-        line = self.current().line
-        self.eat("IM_IN_YR")
+        line = self.lines[self.position]
+        self.advance()
         label = None
-        if self.current().type == "IDENTIFIER":
-            label = self.current().value
-            self.eat("IDENTIFIER")
+        if self.kind == K_IDENTIFIER:
+            label = self.value_at(self.position)
+            self.advance()
         
         operation = None
         var = None
         # Check for optional loop counter operation
-        if self.current().type in ("UPPIN", "NERFIN"):
-            op_type = self.current().type
-            self.eat(op_type)
-            if self.current().type == "YR":
-                self.eat("YR")
+        if self.kind in LOOP_OPERATIONS:
+            op_type = TOKEN_TYPES[self.kind]
+            self.advance()
+            if self.kind == K_YR:
+                self.advance()
                 var = self.current().value
-                self.eat("IDENTIFIER")
-                operation = {"type": op_type, "variable": var}
+                self.eat(K_IDENTIFIER)
+                operation = LoopOperation(op_type, var)
         
         condition = None
         # Check for optional loop termination/continuation condition
-        if self.current().type in ("TIL", "WILE"):
-            cond_type = self.current().type
-            self.eat(cond_type)
+        if self.kind in LOOP_CONDITIONS:
+            cond_type = TOKEN_TYPES[self.kind]
+            self.advance()
             expr = self.parse_expression()
-            condition = {"type": cond_type, "expr": expr}
+            condition = LoopCondition(cond_type, expr)
             
-        body = []
          # Parse statements inside the loop body
-        while self.current().type not in ("IM_OUTTA_YR", "EOF"):
-            stmt = self.statement()
-            if stmt: body.append(stmt)
+        body = self.block_until(K_IM_OUTTA_YR)
             
         # Check for the mandatory loop end
-        if self.current().type != "IM_OUTTA_YR":
+        if self.kind != K_IM_OUTTA_YR:
             self.record_error("Missing IM_OUTTA_YR at end of loop", self.current())
         else:
-            self.eat("IM_OUTTA_YR")
-            if self.current().type == "IDENTIFIER":
-                self.eat("IDENTIFIER") # consume label
+            self.advance()
+            if self.kind == K_IDENTIFIER:
+                self.advance() # consume label
                 
-        return {
-            "node_type": "loop",
-            "label": label,
-            "operation": operation,
-            "condition": condition,
-            "body": body,
-            "line": line
-        }
+        return Loop(label, operation, condition, body, line)
 
     # Parses a function definition
     def function_def(self):
-        line = self.current().line
-        self.eat("HOW_IZ_I")
+        line = self.lines[self.position]
+        self.advance()
         name = None
-        if self.current().type != "IDENTIFIER":
+        if self.kind != K_IDENTIFIER:
             self.record_error("Invalid function name", self.current())
         else:
-            name = self.current().value
-            self.eat("IDENTIFIER")
+            name = self.value_at(self.position)
+            self.advance()
         
         params = []
         # Loop for function parameters
-        while self.current().type == "YR":
-            self.eat("YR")
+        while self.kind == K_YR:
+            self.advance()
             pname = self.current().value
-            self.eat("IDENTIFIER")
+            self.eat(K_IDENTIFIER)
             params.append(pname)
-            if self.current().type == "AN":
-                self.eat("AN")
+            if self.kind == K_AN:
+                self.advance()
         
-        body = []
         # Parse statements in the function body
-        while self.current().type not in ("IF_U_SAY_SO", "EOF"):
-            stmt = self.statement()
-            if stmt: body.append(stmt)
+        body = self.block_until(K_IF_U_SAY_SO)
             
         # Check for mandatory function end
-        if self.current().type == "IF_U_SAY_SO":
-            self.eat("IF_U_SAY_SO")
+        if self.kind == K_IF_U_SAY_SO:
+            self.advance()
         else:
             self.record_error("Missing IF U SAY SO at end of function", self.current())
             
-        return {"node_type": "func_def", "name": name, "params": params, "body": body, "line": line}
+        return FuncDef(name, params, body, line)
 
     # Parses a function call
     def function_call(self):
-        line = self.current().line
-        self.eat("I_IZ")
+        line = self.lines[self.position]
+        self.advance()
         name = None
-        if self.current().type != "IDENTIFIER":
+        if self.kind != K_IDENTIFIER:
             self.record_error("Invalid function name in call", self.current())
         else:
-            name = self.current().value
-            self.eat("IDENTIFIER")
+            name = self.value_at(self.position)
+            self.advance()
         
         args = []
         # Arguments? YR x AN YR y ...
-        while self.current().type == "YR":
-            self.eat("YR")
+        while self.kind == K_YR:
+            self.advance()
             args.append(self.parse_expression())
-            if self.current().type == "AN":
-                self.eat("AN")
+            if self.kind == K_AN:
+                self.advance()
         
         # MKAY?
-        if self.current().type == "MKAY":
-            self.eat("MKAY")
+        if self.kind == K_MKAY:
+            self.advance()
             
-        return {"node_type": "func_call", "name": name, "args": args, "line": line}
+        return FuncCall(name, args, line)
 
     # Parses a return statement
     def return_statement(self):
-        line = self.current().line
-        self.eat("FOUND_YR")
+        line = self.lines[self.position]
+        self.advance()
         expr = self.parse_expression()
-        return {"node_type": "return", "value": expr, "line": line}
+        return Return(expr, line)
+
+    # GTFO
+    def break_statement(self):
+        line = self.lines[self.position]
+        self.advance()
+        return Break(line)
+
+    # statements up to (not including) a token of one of the kinds in end
+    def block(self, end):
+        body = []
+        while self.kind not in end:
+            stmt = self.statement()
+            if stmt: body.append(stmt)
+        return body
+
+    # statements up to (not including) a token of kind end, or EOF
+    def block_until(self, end):
+        body = []
+        while self.kind != end and self.kind != K_EOF:
+            stmt = self.statement()
+            if stmt: body.append(stmt)
+        return body
 
     # Parses a generic LOLCODE expression
+    # operators nest as deep as the code likes (SUM OF SUM OF SUM OF ...), so instead of recursing
+    # once per operator the operators still waiting for operands are kept on a stack
     def parse_expression(self):
-        line = self.current().line
-        tok = self.current().type
-        
-        if tok in ("SUM_OF", "DIFF_OF", "PRODUKT_OF", "QUOSHUNT_OF", "MOD_OF", 
-                   "BIGGR_OF", "SMALLR_OF", "BOTH_OF", "EITHER_OF", "WON_OF", 
-                   "BOTH_SAEM", "DIFFRINT"):
-            self.eat(tok)
-            left = self.parse_expression()
-            if self.current().type == "AN":
-                self.eat("AN")
-            right = self.parse_expression()
-            return {"node_type": "binary_op", "op": tok, "left": left, "right": right, "line": line}
-            
-        elif tok in ("ALL_OF", "ANY_OF"):
-            self.eat(tok)
-            operands = []
-            operands.append(self.parse_expression())
-            while self.current().type == "AN":
-                self.eat("AN")
-                operands.append(self.parse_expression())
-            if self.current().type == "MKAY":
-                self.eat("MKAY")
-            return {"node_type": "n_ary_op", "op": tok, "operands": operands, "line": line}
-            
-        elif tok == "NOT":
-            self.eat("NOT")
-            operand = self.parse_expression()
-            return {"node_type": "unary_op", "op": "NOT", "operand": operand, "line": line}
-            
-        elif tok == "SMOOSH":
-            self.eat("SMOOSH")
-            operands = []
-            operands.append(self.parse_expression())
-            while self.current().type == "AN":
-                self.eat("AN")
-                operands.append(self.parse_expression())
-            return {"node_type": "n_ary_op", "op": "SMOOSH", "operands": operands, "line": line}
-            
-        elif tok == "MAEK":
-            self.eat("MAEK")
-            expr = self.parse_expression()
-            if self.current().type == "A":
-                self.eat("A")
-            target_type = self.current().value
-            self.eat("TYPE") 
-            return {"node_type": "type_cast", "expr": expr, "type": target_type, "line": line}
-            
-        elif tok == "IDENTIFIER":
-            val = self.current().value
-            self.eat("IDENTIFIER")
-            return {"node_type": "operand", "value": val, "kind": "IDENTIFIER", "line": line}
-            
-        elif tok == "IT":
-            self.eat("IT")
-            return {"node_type": "operand", "value": "IT", "kind": "IT", "line": line}
-            
-        elif tok in ("INTEGER_LITERAL", "FLOAT_LITERAL", "STRING", "TROOF_LITERAL"):
-            val = self.current().value
-            if tok == "INTEGER_LITERAL":
-                val = int(val)
-            elif tok == "FLOAT_LITERAL":
-                val = float(val)
-            elif tok == "STRING":
-                val = val.strip('"')
-            elif tok == "TROOF_LITERAL":
-                pass # keep as WIN/FAIL string for now, or convert to bool
-            
-            self.eat(tok)
-            return {"node_type": "operand", "value": val, "kind": tok, "line": line}
-            
-        else:
-            self.record_error(f"Unexpected token in expression: {tok}", self.current())
-            self.position += 1
-            return None
+        stack = []
+        while True:
+            kind = self.kind
+
+            if kind in BINARY_OPS:
+                # [op kind, line, left operand once it's parsed]
+                stack.append([kind, self.lines[self.position], NO_OPERAND])
+                self.advance()
+                continue
+
+            elif kind in N_ARY_OPS:
+                # [op kind, line, operands]
+                stack.append([kind, self.lines[self.position], []])
+                self.advance()
+                continue
+
+            elif kind in UNARY_OPS:
+                stack.append([kind, self.lines[self.position], None])
+                self.advance()
+                continue
+
+            elif kind == K_IDENTIFIER:
+                position = self.position
+                result = Operand(self.value_at(position), "IDENTIFIER", self.lines[position])
+                self.advance()
+                
+            elif kind == K_IT:
+                result = Operand("IT", "IT", self.lines[self.position])
+                self.advance()
+                
+            elif kind in LITERALS:
+                position = self.position
+                result = Operand(LITERALS[kind](self.value_at(position)), TOKEN_TYPES[kind], self.lines[position])
+                self.advance()
+                
+            else:
+                self.record_error(f"Unexpected token in expression: {self.current().type}", self.current())
+                self.advance()
+                result = None
+
+            # hand the finished operand to the operators waiting for it, finishing those that
+            # got all of theirs, until one needs another operand parsed (or the stack is empty)
+            while stack:
+                frame = stack[-1]
+                op, op_line, operands = frame
+
+                if op in BINARY_OPS:
+                    if operands is NO_OPERAND:
+                        frame[2] = result
+                        if self.kind == K_AN:
+                            self.advance()
+                        break
+                    stack.pop()
+                    result = BinaryOp(TOKEN_TYPES[op], operands, result, op_line)
+
+                elif op == K_NOT:
+                    stack.pop()
+                    result = UnaryOp("NOT", result, op_line)
+
+                elif op == K_MAEK:
+                    stack.pop()
+                    if self.kind == K_A:
+                        self.advance()
+                    target_type = self.current().value
+                    self.eat(K_TYPE) 
+                    result = Maek(result, target_type, op_line)
+
+                else:
+                    operands.append(result)
+                    if self.kind == K_AN:
+                        self.advance()
+                        break
+                    stack.pop()
+                    if op != K_SMOOSH and self.kind == K_MKAY:
+                        self.advance()
+                    result = NAryOp(TOKEN_TYPES[op], operands, op_line)
+            else:
+                return result
 
     # Parses a literal value (used in switch case OMG blocks)
     def parse_literal(self):
-        line = self.current().line
-        if self.current().type in ("INTEGER_LITERAL", "FLOAT_LITERAL", "STRING", "TROOF_LITERAL"):
-            val = self.current().value
-            if self.current().type == "INTEGER_LITERAL":
-                val = int(val)
-            elif self.current().type == "FLOAT_LITERAL":
-                val = float(val)
-            elif self.current().type == "STRING":
-                val = val.strip('"')
-            self.eat(self.current().type)
+        if self.kind in LITERALS:
+            val = LITERALS[self.kind](self.value_at(self.position))
+            self.advance()
             return val
         else:
             self.record_error("Expected literal", self.current())
@@ -552,10 +761,226 @@ class Parser:
 
     # Helper function to check if a token type can start an expression
     def is_expression_start(self, type):
-        return type in ("IDENTIFIER", "IT", "INTEGER_LITERAL", "FLOAT_LITERAL", "STRING", "TROOF_LITERAL",
-                        "SUM_OF", "DIFF_OF", "PRODUKT_OF", "QUOSHUNT_OF", "MOD_OF", 
-                        "BIGGR_OF", "SMALLR_OF", "BOTH_OF", "EITHER_OF", "WON_OF", 
-                        "NOT", "ALL_OF", "ANY_OF", "BOTH_SAEM", "DIFFRINT", "SMOOSH", "MAEK")
+        return TYPE_IDS.get(type) in EXPRESSION_START
+
+# a Parser that keeps its errors as (line, message, value), so IncrementalParser can move them
+# along with the statement they're in
+class UnitParser(Parser):
+    def record_error(self, message, token):
+        self.errors.append((token.line, message, token.value))
+
+# one top-level statement of an IncrementalParser: the node parsed from tokens start..stop-1
+# (None if statement() skipped them), the errors recorded on the way, the line of the token at
+# start, and how many lines the node still has to be moved by (done when the AST is asked for)
+class ParsedStatement:
+    __slots__ = ("start", "stop", "node", "errors", "line", "shift")
+
+    def __init__(self, start, stop, node, errors, line):
+        self.start = start
+        self.stop = stop
+        self.node = node
+        self.errors = errors
+        self.line = line
+        self.shift = 0
+
+    # the tokens of the statement moved by delta tokens and line_shift lines
+    def move(self, delta, line_shift):
+        self.start += delta
+        self.stop += delta
+        if line_shift:
+            if self.line != -1:
+                self.line += line_shift
+            self.shift += line_shift
+            if self.errors:
+                self.errors = move_errors(self.errors, line_shift)
+
+# errors (as UnitParser keeps them) line_shift lines further down. errors at EOF stay at line -1
+def move_errors(errors, line_shift):
+    return [(line + line_shift if line != -1 else line, message, value) for line, message, value in errors]
+
+# index of the first statement that read a token at or after position (a statement also looks at
+# the token after its last one)
+def first_reading(statements, position):
+    low, high = 0, len(statements)
+    while low < high:
+        middle = (low + high) // 2
+        if statements[middle].stop < position:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+# keeps the AST and syntax errors of a source that's being edited (for the ide), on top of an
+# IncrementalLexer. the top-level statements (of the WAZZUP block and of the program) are kept
+# with the range of tokens they were parsed from. a statement only reads its own tokens and the
+# one after them, so an edit parses again from the first statement that read a changed token
+# (for an edit inside a HOW IZ I, IM IN YR or O RLY? block that's the whole block) until it's back
+# at the start of an old statement past the edit. the statements from there on are kept, only
+# moved. an edit in HAI parses everything again
+class IncrementalParser:
+    def __init__(self, code=""):
+        self.lexer = IncrementalLexer(code)
+        self.parse_all()
+
+    def parse_all(self):
+        # (stays None if the parser crashes, see edit)
+        self.statements = None
+        parser = UnitParser(LexerTokens(self.lexer))
+        parser.skip_comments()
+        parser.program_start()
+        has_var_block = parser.kind == K_WAZZUP
+        if has_var_block:
+            parser.advance()
+        self.head_errors = list(parser.errors)
+        self.head_stop = parser.position
+
+        # the statements of the WAZZUP block and the ParsedStatement of its BUHBYE, None if there's no block
+        self.var_statements = self.var_end = None
+        if has_var_block:
+            self.var_statements = self.parse_statements(parser, K_BUHBYE, None)[0]
+            self.var_end = self.parse_var_end(parser)
+        self.statements = self.parse_statements(parser, K_KTHXBYE, None)[0]
+        self.parse_end(parser)
+
+    # parses top-level statements from where parser is until a token of kind end or EOF, or
+    # until resync(position) gives the index of an old statement starting there. gives (the new
+    # statements, that index or None)
+    def parse_statements(self, parser, end, resync):
+        statements = []
+        while parser.kind != end and parser.kind != K_EOF:
+            start = parser.position
+            if resync is not None:
+                index = resync(start)
+                if index is not None:
+                    return statements, index
+            errors = len(parser.errors)
+            node = parser.statement()
+            statements.append(ParsedStatement(start, parser.position, node, parser.errors[errors:],
+                                              parser.lines[start]))
+        return statements, None
+
+    # the BUHBYE of the WAZZUP block. its line is the one the VarBlock gets
+    def parse_var_end(self, parser):
+        start = parser.position
+        errors = len(parser.errors)
+        line = parser.var_block_end(None).line
+        return ParsedStatement(start, parser.position, None, parser.errors[errors:], line)
+
+    # KTHXBYE and whatever comes after it
+    def parse_end(self, parser):
+        parser.seek(self.statements[-1].stop if self.statements else self.main_start())
+        errors = len(parser.errors)
+        parser.program_end()
+        parser.check_trailing()
+        self.end_errors = parser.errors[errors:]
+
+    # where the statements after the WAZZUP block start
+    def main_start(self):
+        return self.var_end.stop if self.var_end is not None else self.head_stop
+
+    # parses statements i.. of a section (ending at a token of kind end) again, the first one
+    # starting at position, until it's back at an old statement starting at or after old_stop
+    # (moved by delta). gives the number of lines the statements after the edit moved by, or
+    # None if it got to the end of the section instead
+    def reparse(self, parser, statements, i, position, end, old_stop, delta):
+        j = i
+
+        def resync(position):
+            nonlocal j
+            while j < len(statements) and (statements[j].start < old_stop or statements[j].start + delta < position):
+                j += 1
+            if j < len(statements) and statements[j].start + delta == position:
+                return j
+            return None
+
+        parser.seek(position)
+        new, j = self.parse_statements(parser, end, resync)
+        line_shift = None
+        if j is None:
+            j = len(statements)
+        else:
+            line_shift = parser.lines[parser.position] - statements[j].line
+            for statement in statements[j:]:
+                statement.move(delta, line_shift)
+        statements[i:j] = new
+        return line_shift
+
+    # replaces removed characters from offset start with inserted (see IncrementalLexer.edit)
+    def edit(self, start, removed, inserted):
+        first, old_stop, new_stop = self.lexer.edit(start, removed, inserted)
+        delta = new_stop - old_stop
+        if self.statements is None or self.head_stop >= first:
+            self.parse_all()
+            return
+
+        parser = UnitParser(LexerTokens(self.lexer))
+        try:
+            var_statements = self.var_statements
+            if var_statements is not None and self.var_end.stop >= first:
+                # the edit is in the WAZZUP block
+                i = first_reading(var_statements, first)
+                position = var_statements[i].start if i < len(var_statements) else self.var_end.start
+                line_shift = self.reparse(parser, var_statements, i, position, K_BUHBYE, old_stop, delta)
+                if line_shift is not None:
+                    self.var_end.move(delta, line_shift)
+                    for statement in self.statements:
+                        statement.move(delta, line_shift)
+                else:
+                    # the block ends somewhere else now, so the statements after it are parsed
+                    # again too, up to the first old one
+                    self.var_end = self.parse_var_end(parser)
+                    line_shift = self.reparse(parser, self.statements, 0, self.var_end.stop, K_KTHXBYE, old_stop, delta)
+            else:
+                statements = self.statements
+                i = first_reading(statements, first)
+                if i < len(statements):
+                    position = statements[i].start
+                else:
+                    position = statements[-1].stop if statements else self.main_start()
+                line_shift = self.reparse(parser, statements, i, position, K_KTHXBYE, old_stop, delta)
+        except BaseException:
+            # the statements don't go with the tokens anymore, the next edit parses everything
+            self.statements = None
+            raise
+
+        if line_shift is None:
+            self.parse_end(parser)
+        elif line_shift:
+            # the end only moved with the statements before it
+            self.end_errors = move_errors(self.end_errors, line_shift)
+
+    def get_code(self):
+        return self.lexer.code
+
+    # the Program node, the same Parser(tokens).parse() would give
+    def get_ast(self):
+        body = []
+        if self.var_statements is not None:
+            body.append(VarBlock(self.statement_nodes(self.var_statements), self.var_end.line))
+        body += self.statement_nodes(self.statements)
+        return Program(body)
+
+    def statement_nodes(self, statements):
+        nodes = []
+        for statement in statements:
+            if statement.shift:
+                shift_lines(statement.node, statement.shift)
+                statement.shift = 0
+            if statement.node:
+                nodes.append(statement.node)
+        return nodes
+
+    # the syntax errors, the same Parser(tokens).errors would have
+    def get_errors(self):
+        errors = list(self.head_errors)
+        if self.var_statements is not None:
+            for statement in self.var_statements:
+                errors += statement.errors
+            errors += self.var_end.errors
+        for statement in self.statements:
+            errors += statement.errors
+        errors += self.end_errors
+        return [format_error(line, message, value) for line, message, value in errors]
 
 # main function execution
 if __name__ == "__main__":
@@ -567,17 +992,13 @@ if __name__ == "__main__":
     path = sys.argv[1]
     try:
         with open(path, "r", encoding="utf-8") as f:
-            code = f.read()
-    except Exception as e:
+            # tokens are read from the file while parsing
+            parser = Parser(iter_tokens(f))
+            ast = parser.parse()
+    except (OSError, UnicodeDecodeError) as e:
         print(f"Error reading {path}: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # tokenize the source code
-    tokens = get_tokens(code)
-    # parsing process
-    parser = Parser(tokens)
-    ast = parser.parse()
-
     # Check if any syntax errors were recorded
     if parser.errors:
         print("\n--- ERRORS DETECTED ---")
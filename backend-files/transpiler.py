@@ -0,0 +1,679 @@
+import sys
+
+from ast_nodes import (PROGRAM, VAR_BLOCK, VAR_DECL, ASSIGNMENT, TYPE_CAST, INPUT, VISIBLE, IF_STMT, SWITCH_STMT,
+                       LOOP, BREAK, FUNC_DEF, FUNC_CALL, RETURN, BINARY_OP, N_ARY_OP, UNARY_OP, MAEK, OPERAND,
+                       expression_operands, has_break)
+from resolver import GLOBAL, UNDECLARED
+from semantics1 import Types, NOOB_VALUE
+
+#turns an AST (after the resolver, see Interpreter.resolve) into python source and runs that:
+#   - the top-level code is a function main(), every HOW IZ I another function taking its frame
+#   - loops are python while loops and FOUND YR a return. a GTFO is a break (a WTF? a GTFO can
+#     end is in a while True of its own), or a return in a function
+#   - expressions become one assignment per operator into temporaries (v0, t0 = value, type), so
+#     formulas nested thousands deep don't nest in python. the common cases (both NUMBR, or both
+#     the same type for a comparison) and casts to a type the value already has are written out
+#     right there, the rest calls the interpreter's cast_value and operators
+#the generated code works on the state of an Interpreter (its frames, IT, functions, should_return)
+#like closures.py, so what gets printed, IT and the error messages are the same as Interpreter.execute's.
+#the source is compiled with compile(), through a cache.CodeCache if there is one
+#
+#   python semantics1.py program.lol --backend=python
+#   python semantics1.py program.lol --dump-python      (prints the python instead of running it)
+
+NUMBR = Types.NUMBR
+NUMBAR = Types.NUMBAR
+YARN = Types.YARN
+TROOF = Types.TROOF
+LITERAL_KINDS = ('INTEGER_LITERAL', 'FLOAT_LITERAL', 'STRING', 'TROOF_LITERAL')
+FILENAME = "<lolcode>"
+
+# python can't indent more than 100 levels or nest more than 20 loops and trys. a statement
+# deeper than these is run by the interpreter instead (Interpreter.execute_node)
+MAX_INDENT = 80
+MAX_BLOCKS = 15
+
+# the inline form of an arithmetic operator on two NUMBR (a and b), for the ones that have one
+NUMBR_OPS = {
+    'SUM_OF': "{} + {}",
+    'DIFF_OF': "{} - {}",
+    'PRODUKT_OF': "{} * {}",
+    'MOD_OF': "{} % {}",
+    'BIGGR_OF': "max({}, {})",
+    'SMALLR_OF': "min({}, {})",
+}
+BOOLEAN = ('BOTH_OF', 'EITHER_OF', 'WON_OF')
+
+# a value of the generated code: python expressions for its value and type, and the type if it's
+# known when generating (a literal, or an operator that always gives the same type), else None.
+# pair is a temporary already holding the (value, type) tuple (read from a slot or IT), so storing
+# the value somewhere else doesn't make a new one
+class Value:
+    __slots__ = ("value", "type", "known", "pair")
+
+    def __init__(self, value, type, known, pair=None):
+        self.value = value
+        self.type = type
+        self.known = known
+        self.pair = pair
+
+# python for the (value, type) tuple of a Value
+def pair(value):
+    if value.pair is not None:
+        return value.pair
+    return f"({value.value}, {value.type})"
+
+# python for a literal value
+def literal(value):
+    if isinstance(value, float) and (value != value or value in (float("inf"), float("-inf"))):
+        return f"float('{value}')"
+    return repr(value)
+
+# the source for one program or statement. nodes are the AST nodes the code needs at run time
+# (it gets them as N[i]), functions the FuncDef nodes it defines
+class Generator:
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.nodes = []
+        self.node_index = {}
+        self.functions = []
+        self.lines = []
+        self.indent = 1
+        self.blocks = 0
+        self.temps = 0
+        self.flags = 0
+        # the code being generated is main() (None) or the body of that FuncDef
+        self.function = None
+        # the python for a GTFO where the code is: "break" in a loop or WTF?, "return" in a
+        # function, None where there's nothing for it to end
+        self.exit = None
+
+    def emit(self, line):
+        self.lines.append("    " * self.indent + line)
+
+    # N[i] for node
+    def node(self, node):
+        index = self.node_index.get(id(node))
+        if index is None:
+            index = self.node_index[id(node)] = len(self.nodes)
+            self.nodes.append(node)
+        return f"N[{index}]"
+
+    def temp(self):
+        n = self.temps
+        self.temps += 1
+        return f"v{n}", f"t{n}"
+
+    def flag(self):
+        self.flags += 1
+        return f"b{self.flags}"
+
+    def source(self, root):
+        out = ["# generated by transpiler.py", "", "def main():"]
+        self.lines = []
+        if root.tag == PROGRAM or root.tag == VAR_BLOCK:
+            self.block(root.body)
+        else:
+            self.block([root])
+        out += self.lines
+
+        # a function can define more functions, they're added to the list while it's going through
+        done = 0
+        while done < len(self.functions):
+            func = self.functions[done]
+            self.function = func
+            self.exit = "return"
+            self.lines = []
+            self.block(func.body)
+            out += ["", f"# HOW IZ I {func.name} (line {func.line})", f"def F{done}(f):"] + self.lines
+            done += 1
+        out.append("")
+        for i, func in enumerate(self.functions):
+            out.append(f"compiled[{self.node(func)}] = F{i}")
+        return "\n".join(out) + "\n"
+
+    def block(self, statements):
+        start = len(self.lines)
+        for stmt in statements:
+            self.statement(stmt)
+        if len(self.lines) == start:
+            self.emit("pass")
+
+    # code that returns from the generated function, where a FOUND YR stops everything
+    def stop(self):
+        self.emit("return")
+
+    def statement(self, stmt):
+        if stmt is None:
+            return
+        tag = stmt.tag
+        if tag == BREAK:
+            if self.exit is not None:
+                self.emit(self.exit)
+            return
+        if self.indent > MAX_INDENT or self.blocks > MAX_BLOCKS:
+            breaks = self.exit is not None and has_break([stmt])
+            self.emit(f"{'run_breakable' if breaks else 'run'}({self.node(stmt)})")
+            self.emit("if I.should_return:")
+            self.indent += 1
+            self.stop()
+            self.indent -= 1
+            if breaks:
+                self.emit("if I.should_break:")
+                self.emit("    I.should_break = False")
+                self.emit(f"    {self.exit}")
+            return
+        line = getattr(stmt, "line", None)
+        if line is not None:
+            self.emit(f"# line {line}")
+        if tag == PROGRAM or tag == VAR_BLOCK:
+            for inner in stmt.body:
+                self.statement(inner)
+        elif tag == VAR_DECL:
+            self.var_decl(stmt)
+        elif tag == ASSIGNMENT:
+            value = self.expression(stmt.expr)
+            if stmt.target == 'IT':
+                self.emit(f"I.it_register = {pair(value)}")
+            else:
+                self.write(stmt.target, stmt.binding, pair(value))
+        elif tag == TYPE_CAST:
+            self.temps = 0
+            value = self.read(stmt.target, stmt.binding)
+            self.emit(f"{value.value} = cast({value.value}, {value.type}, {stmt.type!r})")
+            self.write(stmt.target, stmt.binding, f"({value.value}, {stmt.type!r})")
+        elif tag == INPUT:
+            self.input(stmt)
+        elif tag == VISIBLE:
+            self.visible(stmt)
+        elif tag == IF_STMT:
+            self.if_stmt(stmt)
+        elif tag == SWITCH_STMT:
+            self.switch(stmt)
+        elif tag == LOOP:
+            self.loop(stmt)
+        elif tag == FUNC_DEF:
+            self.functions.append(stmt)
+            self.emit(f"functions[{stmt.name!r}] = {self.node(stmt)}")
+        elif tag == FUNC_CALL:
+            self.func_call(stmt)
+        elif tag == RETURN:
+            value = self.expression(stmt.value)
+            self.emit(f"I.return_value = {pair(value)}")
+            self.emit("I.should_return = True")
+            self.stop()
+
+    # reads a variable into a temporary
+    def read(self, name, binding):
+        v, t = self.temp()
+        if binding is None:
+            self.emit(f"{v}, {t} = find({name!r}, len(FRAMES) - 1)")
+            return Value(v, t, None)
+        depth, slot = binding
+        if depth == UNDECLARED:
+            self.emit(f"{v}, {t} = undeclared({name!r})")
+            return Value(v, t, None)
+        p = "p" + v[1:]
+        if depth == GLOBAL:
+            self.emit(f"{p} = G[{slot}]")
+            self.emit(f"if {p} is None: undeclared({name!r})")
+        else:
+            # depth 0 or 1 is the frame of the function the code is in, arguments are worked out
+            # while the function being called is on top of it
+            self.emit(f"{p} = f[{slot}]")
+            self.emit(f"if {p} is None: {p} = find({name!r}, len(FRAMES) - {2 + depth})")
+        self.emit(f"{v}, {t} = {p}")
+        return Value(v, t, None, p)
+
+    # sets a variable to value_pair, python for a (value, type)
+    def write(self, name, binding, value_pair):
+        if binding is None or binding[0] == UNDECLARED:
+            self.emit(f"I.write_variable({name!r}, {binding!r}, {value_pair})")
+            return
+        depth, slot = binding
+        if depth == GLOBAL:
+            self.emit(f"if G[{slot}] is None: undeclared({name!r})")
+            self.emit(f"G[{slot}] = {value_pair}")
+            return
+        self.emit(f"if f[{slot}] is None: I.write_variable({name!r}, {binding!r}, {value_pair})")
+        self.emit(f"else: f[{slot}] = {value_pair}")
+
+    def var_decl(self, stmt):
+        if stmt.value:
+            value = self.expression(stmt.value)
+            value_pair = pair(value)
+        else:
+            value_pair = f"(None, {Types.NOOB!r})"
+        depth, slot = stmt.binding
+        # the frame on top is G in main() and the function's own in a function
+        frame = "G" if self.function is None else "f"
+        message = f"Variable '{stmt.name}' already declared in current scope"
+        self.emit(f"if {frame}[{slot}] is not None: raise Exception({message!r})")
+        self.emit(f"{frame}[{slot}] = {value_pair}")
+        if depth == GLOBAL:
+            self.emit(f"declared.append({slot})")
+
+    def input(self, stmt):
+        self.blocks += 1
+        self.emit("try:")
+        self.emit("    line = input()")
+        self.emit("except EOFError:")
+        self.emit("    line = ''")
+        self.blocks -= 1
+        self.temps = 0
+        self.write(stmt.variable, stmt.binding, f"(line, {YARN!r})")
+
+    def visible(self, stmt):
+        cast_value = self.interpreter.cast_value
+        self.emit("out = []")
+        for arg in stmt.args:
+            if arg is not None and arg.tag == OPERAND and arg.kind in LITERAL_KINDS:
+                # what it prints is known already
+                val, t = self.interpreter.evaluate_operand(arg)
+                self.emit(f"out.append({str(cast_value(val, t, YARN))!r})")
+                continue
+            self.emit("try:")
+            self.indent += 1
+            self.blocks += 1
+            value = self.expression(arg)
+            if value.known == YARN:
+                self.emit(f"out.append(str({value.value}))")
+            else:
+                self.emit(f"out.append(str({value.value} if {value.type} == {YARN!r} "
+                          f"else cast({value.value}, {value.type}, {YARN!r})))")
+            self.indent -= 1
+            self.emit("except Exception as e:")
+            self.emit("    out.append('[Error: ' + str(e) + ']')")
+            self.blocks -= 1
+        self.emit("say(out)")
+
+    # the if of a branch, only runs when the flag (set to whether a branch was taken) is clear
+    def branch(self, condition, body):
+        self.emit(f"if {condition}:")
+        self.indent += 1
+        self.block(body)
+        self.indent -= 1
+
+    # a run of flat ifs over one flag instead of elifs, python nests those
+    def if_stmt(self, stmt):
+        taken = self.flag()
+        self.emit(f"{taken} = I.it_register")
+        self.emit(f"{taken} = cast({taken}[0], {taken}[1], {TROOF!r})")
+        if stmt.true_block:
+            self.branch(taken, stmt.true_block)
+        for else_if in stmt.else_if_blocks:
+            # a MEBBE condition goes in IT before it's checked
+            self.emit(f"if not {taken}:")
+            self.indent += 1
+            value = self.expression(else_if.condition)
+            self.emit(f"I.it_register = {pair(value)}")
+            self.emit(f"{taken} = {self.troof(value)}")
+            self.branch(taken, else_if.body)
+            self.indent -= 1
+        if stmt.else_block:
+            self.branch(f"not {taken}", stmt.else_block)
+
+    def switch(self, stmt):
+        taken = self.flag()
+        self.emit(f"{taken} = case_index({self.node(stmt)})")
+        # a GTFO in a case breaks out of a while True around the cases
+        wrapped = any(has_break(case.body) for case in stmt.cases) or has_break(stmt.default)
+        if wrapped:
+            self.emit("while True:")
+            self.indent += 1
+            self.blocks += 1
+        exit = self.exit
+        self.exit = "break"
+        for i, case in enumerate(stmt.cases):
+            if case.body:
+                self.branch(f"{taken} == {i}", case.body)
+        if stmt.default:
+            self.branch(f"{taken} < 0", stmt.default)
+        self.exit = exit
+        if wrapped:
+            self.emit("break")
+            self.blocks -= 1
+            self.indent -= 1
+
+    # python for a value cast to TROOF
+    def troof(self, value):
+        if value.known == TROOF:
+            return value.value
+        return f"{value.value} if {value.type} == {TROOF!r} else cast({value.value}, {value.type}, {TROOF!r})"
+
+    def loop(self, stmt):
+        self.emit("while True:")
+        self.indent += 1
+        self.blocks += 1
+        cond = stmt.condition
+        if cond:
+            value = self.expression(cond.expr)
+            if cond.type == 'TIL':
+                self.emit(f"if {self.troof(value)}: break")
+            elif cond.type == 'WILE':
+                self.emit(f"if not ({self.troof(value)}): break")
+
+        # a GTFO right in the body ends the loop once it's reached, what comes after it never runs
+        start = len(self.lines)
+        breaks = False
+        exit = self.exit
+        self.exit = "break"
+        for inner in stmt.body:
+            if inner is not None and inner.tag == BREAK:
+                breaks = True
+                break
+            self.statement(inner)
+        self.exit = exit
+        if breaks:
+            self.emit("break")
+        elif stmt.operation:
+            self.step(stmt.operation)
+        if len(self.lines) == start:
+            self.emit("pass")
+        self.blocks -= 1
+        self.indent -= 1
+
+    # UPPIN/NERFIN of a loop
+    def step(self, op):
+        delta = 1 if op.type == 'UPPIN' else -1 if op.type == 'NERFIN' else 0
+        self.temps = 0
+        value = self.read(op.variable, op.binding)
+        v, t = value.value, value.type
+        self.emit(f"if {t} == {NUMBR!r}: {v} = {v} + {delta}")
+        self.emit(f"else: {v}, {t} = step({op.variable!r}, {v}, {t}, {delta})")
+        self.write(op.variable, op.binding, f"({v}, {t})")
+
+    def func_call(self, stmt):
+        self.emit(f"fn, frame = enter({stmt.name!r}, {len(stmt.args)})")
+        for i, arg in enumerate(stmt.args):
+            value = self.expression(arg)
+            self.emit(f"bind(fn, frame, {i}, {pair(value)})")
+        self.emit("call(fn, frame)")
+
+    # python working out the (value, type) of an expression, gives the Value.
+    # like Interpreter.evaluate the operators still waiting for their operands are kept on a stack
+    def expression(self, node):
+        self.temps = 0
+        if node is None or self.has_none(node):
+            # fails the same way the interpreter does
+            v, t = self.temp()
+            self.emit(f"{v}, {t} = evaluate({self.node(node) if node is not None else 'None'})")
+            return Value(v, t, None)
+        if node.tag == OPERAND:
+            return self.operand(node)
+
+        stack = [(node, expression_operands(node), [])]
+        while True:
+            node, operands, values = stack[-1]
+            if len(values) < len(operands):
+                operand = operands[len(values)]
+                if operand.tag == OPERAND:
+                    values.append(self.operand(operand))
+                else:
+                    stack.append((operand, expression_operands(operand), []))
+                continue
+
+            stack.pop()
+            result = self.operator(node, values)
+            if not stack:
+                return result
+            stack[-1][2].append(result)
+
+    def has_none(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                return True
+            if node.tag != OPERAND:
+                stack.extend(expression_operands(node))
+        return False
+
+    def operand(self, node):
+        kind = node.kind
+        if kind == 'IT':
+            v, t = self.temp()
+            p = "p" + v[1:]
+            self.emit(f"{p} = I.it_register")
+            self.emit(f"{v}, {t} = {p}")
+            return Value(v, t, None, p)
+        if kind == 'IDENTIFIER':
+            return self.read(node.value, node.binding)
+        if kind in LITERAL_KINDS:
+            val, t = self.interpreter.evaluate_operand(node)
+            return Value(literal(val), repr(t), t)
+        v, t = self.temp()
+        self.emit(f"{v}, {t} = I.evaluate_operand({self.node(node)})")
+        return Value(v, t, None)
+
+    # the value of an operator node, the values of its operands are worked out already
+    def operator(self, node, values):
+        tag = node.tag
+        v, t = self.temp()
+        pairs = ", ".join(pair(value) for value in values)
+        if tag == BINARY_OP:
+            return self.binary_op(node, values, v, t, pairs)
+        if tag == N_ARY_OP and node.op == 'SMOOSH':
+            parts = ", ".join(value.value if value.known == YARN else f"str({value.value})" for value in values)
+            self.emit(f"{v} = ''.join(({parts},))")
+            return Value(v, repr(YARN), YARN)
+        if tag == N_ARY_OP and node.op in ('ALL_OF', 'ANY_OF'):
+            check = "all" if node.op == 'ALL_OF' else "any"
+            self.emit(f"{v} = {check}(({', '.join(value.value for value in values)},))")
+            return Value(v, repr(TROOF), TROOF)
+        if tag == UNARY_OP and node.op == 'NOT':
+            self.emit(f"{v} = not {values[0].value}")
+            return Value(v, repr(TROOF), TROOF)
+        if tag == MAEK:
+            value = values[0]
+            if value.known == node.type:
+                return value
+            self.emit(f"{v} = cast({value.value}, {value.type}, {node.type!r})")
+            return Value(v, repr(node.type), node.type)
+        self.emit(f"{v}, {t} = apply({self.node(node)}, [{pairs}])")
+        return Value(v, t, None)
+
+    # the checks on the operands that make the inline form right, None if it never is and "" if
+    # it always is
+    def numbr_checks(self, op, left, right):
+        checks = []
+        for value in (left, right):
+            if value.known is None:
+                checks.append(f"{value.type} == {NUMBR!r}")
+            elif value.known != NUMBR:
+                return None
+        if op == 'MOD_OF':
+            if right.value == "0":
+                return None
+            if not right.value.lstrip("-").isdigit():
+                checks.append(f"{right.value} != 0")
+        return " and ".join(checks)
+
+    def binary_op(self, node, values, v, t, pairs):
+        op = node.op
+        left, right = values
+        fallback = f"{v}, {t} = binop({self.node(node)}, ({pairs}))"
+
+        if op in NUMBR_OPS:
+            checks = self.numbr_checks(op, left, right)
+            inline = NUMBR_OPS[op].format(left.value, right.value)
+            if checks is None:
+                self.emit(fallback)
+            elif checks == "":
+                self.emit(f"{v} = {inline}")
+                return Value(v, repr(NUMBR), NUMBR)
+            else:
+                self.emit(f"if {checks}: {v}, {t} = {inline}, {NUMBR!r}")
+                self.emit(f"else: {fallback}")
+            if left.known == NUMBAR or right.known == NUMBAR:
+                return Value(v, repr(NUMBAR), NUMBAR)
+            return Value(v, t, None)
+        if op == 'QUOSHUNT_OF':
+            self.emit(fallback)
+            return Value(v, repr(NUMBAR), NUMBAR)
+
+        if op in ('BOTH_SAEM', 'DIFFRINT'):
+            compare = "==" if op == 'BOTH_SAEM' else "!="
+            if left.known is not None and left.known == right.known:
+                self.emit(f"{v} = {left.value} {compare} {right.value}")
+            elif left.known is not None and right.known is not None:
+                self.emit(fallback)
+            else:
+                self.emit(f"if {left.type} == {right.type}: {v} = {left.value} {compare} {right.value}")
+                self.emit(f"else: {fallback}")
+            return Value(v, repr(TROOF), TROOF)
+
+        self.emit(fallback)
+        if op in BOOLEAN:
+            return Value(v, repr(TROOF), TROOF)
+        return Value(v, t, None)
+
+class Transpiler:
+    def __init__(self, interpreter, cache=None):
+        self.interpreter = interpreter
+        # a cache.CodeCache, so the same program isn't compiled by python again
+        self.cache = cache
+        # the python function of every FuncDef compiled, by the node. it takes the function's frame
+        self.compiled = {}
+
+    # the python source for node (a program or a statement), and the nodes it needs
+    def generate(self, node):
+        generator = Generator(self.interpreter)
+        source = generator.source(node)
+        return source, generator.nodes
+
+    def source(self, node):
+        return self.generate(node)[0]
+
+    # the function running node (a program or a statement)
+    def compile(self, node):
+        if not node:
+            return lambda: None
+        source, nodes = self.generate(node)
+        if self.cache is not None:
+            code = self.cache.compile(source, FILENAME)
+        else:
+            code = compile(source, FILENAME, "exec")
+        namespace = self.namespace(nodes)
+        exec(code, namespace)
+        return namespace["main"]
+
+    # the names the generated code uses
+    def namespace(self, nodes):
+        interpreter = self.interpreter
+        return {
+            "N": nodes,
+            "I": interpreter,
+            "G": interpreter.frames[0],
+            "FRAMES": interpreter.frames,
+            "declared": interpreter.declared,
+            "functions": interpreter.functions,
+            "compiled": self.compiled,
+            "cast": interpreter.cast_value,
+            "binop": interpreter.apply_binary_op,
+            "apply": self.apply,
+            "evaluate": interpreter.evaluate,
+            "find": interpreter.find_variable,
+            "run": interpreter.execute_node,
+            "run_breakable": self.run_breakable,
+            "undeclared": self.undeclared,
+            "say": self.say,
+            "step": self.step,
+            "case_index": self.case_index,
+            "enter": self.enter,
+            "bind": self.bind,
+            "call": self.call,
+        }
+
+    # runs a statement with the interpreter (see MAX_INDENT) where a GTFO in it ends a loop, WTF? or
+    # function of the generated code, which checks should_break after it
+    def run_breakable(self, node):
+        interpreter = self.interpreter
+        interpreter.breakable += 1
+        interpreter.execute_node(node)
+        interpreter.breakable -= 1
+
+    def apply(self, node, values):
+        return self.interpreter.appliers[node.tag](node, values)
+
+    def undeclared(self, name):
+        raise Exception(f"Undeclared variable '{name}'")
+
+    # prints the parts of a VISIBLE
+    def say(self, parts):
+        output = "".join(parts)
+        self.interpreter.output_buffer.append(output)
+        print(output)
+        sys.stdout.flush()
+
+    # UPPIN/NERFIN of a loop variable that isn't a NUMBR, the same casts as Interpreter.execute_loop
+    def step(self, var_name, val, current_type, delta):
+        cast_value = self.interpreter.cast_value
+        if current_type != NUMBAR:
+            try:
+                val = cast_value(val, current_type, NUMBR)
+                current_type = NUMBR
+            except Exception:
+                try:
+                    val = cast_value(val, current_type, NUMBAR)
+                    current_type = NUMBAR
+                except Exception:
+                    raise Exception(f"Loop variable '{var_name}' value cannot be cast to numerical type for UPPIN/NERFIN.")
+        val += delta
+        if current_type == NUMBR:
+            val = int(val)
+        elif current_type == NUMBAR:
+            val = float(val)
+        return val, current_type
+
+    # the index of the OMG of a WTF? that IT matches, -1 for the OMGWTF
+    def case_index(self, node):
+        val, t = self.interpreter.it_register
+        case = self.interpreter.matching_case(node, val, t)
+        if case is None:
+            return -1
+        return node.cases.index(case)
+
+    # the FuncDef a call runs and the frame pushed for it, the arguments are worked out after this
+    def enter(self, func_name, arg_count):
+        interpreter = self.interpreter
+        func_node = interpreter.functions.get(func_name)
+        if func_node is None:
+            raise Exception(f"Function '{func_name}' not defined")
+        params = func_node.params
+        if len(params) != arg_count:
+            raise Exception(f"Function '{func_name}' expects {len(params)} arguments, got {arg_count}")
+        layout = func_node.layout
+        frame = [None] * len(layout)
+        interpreter.frames.append(frame)
+        interpreter.layouts.append(layout)
+        return func_node, frame
+
+    # the value of an argument goes in its parameter's slot
+    def bind(self, func_node, frame, index, value):
+        param = func_node.params[index]
+        slot = func_node.layout[param]
+        if frame[slot] is not None:
+            raise Exception(f"Variable '{param}' already declared in current scope")
+        frame[slot] = value
+
+    # runs the body of the function, then what it returned goes in IT
+    def call(self, func_node, frame):
+        interpreter = self.interpreter
+        body = self.compiled.get(func_node)
+        if body is not None:
+            body(frame)
+        else:
+            # defined in a statement the interpreter ran (see MAX_INDENT)
+            for stmt in func_node.body:
+                interpreter.execute_node(stmt)
+                if interpreter.should_return or interpreter.should_break:
+                    break
+
+        ret_val = interpreter.return_value
+        interpreter.return_value = None
+        interpreter.should_return = False
+        interpreter.should_break = False
+        interpreter.frames.pop()
+        interpreter.layouts.pop()
+        interpreter.it_register = ret_val if ret_val else NOOB_VALUE
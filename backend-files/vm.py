@@ -0,0 +1,994 @@
+import marshal
+import sys
+
+from ast_nodes import (PROGRAM, VAR_BLOCK, VAR_DECL, ASSIGNMENT, TYPE_CAST, INPUT, VISIBLE, IF_STMT, SWITCH_STMT,
+                       LOOP, BREAK, FUNC_DEF, FUNC_CALL, RETURN, BINARY_OP, N_ARY_OP, UNARY_OP, MAEK, OPERAND,
+                       BinaryOp, NAryOp, UnaryOp, Operand, SwitchStmt, Case, expression_operands)
+from resolver import GLOBAL, UNDECLARED
+from semantics1 import Types, NOOB_VALUE, WIN_VALUE, FAIL_VALUE
+
+#a stack-based virtual machine running bytecode compiled from the AST (after the resolver, see
+#Interpreter.resolve). a Code is flat lists: ops and args (one int each per instruction), the line
+#of every instruction, and pools the args index into (constants, names, variables, calls, switch
+#tables, functions). O RLY?, MEBBE, WTF? and loops are jumps, a GTFO jumps past the loop or WTF?
+#it ends (or returns NOOB from a function), FOUND YR returns to the caller.
+#a GTFO ends the innermost loop or WTF? around it, however deep in O RLY?s it is. a GTFO in a
+#function with no loop or WTF? around it ends the function (which gives NOOB), also when it's
+#nested in O RLY?s. a GTFO outside all of them does nothing
+#calls have their own stack in the VM instead of python's, so a deep recursion doesn't run out of
+#python stack, only out of max_depth calls.
+#a call right before a FOUND YR IT in a function is a tail call: when nothing the called function
+#runs can look up a variable of the caller's frame, that frame is dropped and the called function
+#returns straight to the caller's caller, so a tail recursion runs in the same depth however deep
+#it goes (see VM.can_drop). a runtime error's symbol table doesn't have the frames dropped.
+#the VM works on the state of an Interpreter (its frames, IT, functions, should_return) and uses its
+#cast_value and operators for everything but the common cases, so what gets printed, IT and the
+#error messages are the same as Interpreter.execute's. a Code can be written to a file (save) and
+#read back (load) to be run without the source
+#
+#   python semantics1.py program.lol --backend=vm            (--max-depth=N for how deep calls go)
+#   python semantics1.py program.lol --disassemble
+#   python semantics1.py program.lol --save-bytecode=program.lolb
+#   python vm.py program.lolb            (python vm.py --dis program.lolb to disassemble it)
+
+NUMBR = Types.NUMBR
+NUMBAR = Types.NUMBAR
+YARN = Types.YARN
+TROOF = Types.TROOF
+LITERAL_KINDS = ('INTEGER_LITERAL', 'FLOAT_LITERAL', 'STRING', 'TROOF_LITERAL')
+
+# saved bytecode starts with this, bump the number when what's saved changes
+MAGIC = b"LOLB\x02"
+# calls deeper than this fail like a python recursion would in the interpreter (the VM's max_depth)
+MAX_CALL_DEPTH = 1000000
+
+# opcodes. the arg of each is in the comment
+OPCODE_NAMES = [
+    "LOAD_CONST",         # consts index
+    "LOAD_GLOBAL",        # slot of the global frame
+    "LOAD_LOCAL",         # variables index, (depth, slot) binding
+    "LOAD_NAME",          # variables index, looked up by name
+    "LOAD_IT",
+    "STORE_GLOBAL",       # slot of the global frame
+    "STORE_LOCAL",        # variables index
+    "STORE_NAME",         # variables index
+    "STORE_IT",
+    "DECLARE",            # variables index
+    "DUP",
+    "ADD",
+    "SUB",
+    "MUL",
+    "MOD",
+    "MAX",
+    "MIN",
+    "SAME",
+    "DIFFRINT",
+    "BINARY",             # names index of the operator
+    "NOT",
+    "SMOOSH",             # operand count
+    "ALL",                # operand count
+    "ANY",                # operand count
+    "APPLY",              # operators index
+    "CAST",               # names index of the type
+    "EVAL_OPERAND",       # consts index of (value, kind)
+    "EVAL_NONE",
+    "UPPIN",              # names index of the variable
+    "NERFIN",             # names index of the variable
+    "NOSTEP",             # names index of the variable
+    "TO_YARN",
+    "PRINT",              # part count
+    "READ_LINE",
+    "SETUP_TRY",          # handler offset
+    "POP_TRY",
+    "JUMP",               # offset
+    "POP_JUMP_IF_FALSE",  # offset
+    "POP_JUMP_IF_TRUE",   # offset
+    "POP",
+    "SWITCH",             # switches index
+    "DEF_FUNC",           # functions index
+    "ENTER",              # calls index
+    "BIND",               # parameter index
+    "CALL",
+    "TAIL_CALL",          # functions index of the function it's in
+    "RETURN_VALUE",
+    "RETURN_NOOB",
+    "HALT",
+]
+(LOAD_CONST, LOAD_GLOBAL, LOAD_LOCAL, LOAD_NAME, LOAD_IT, STORE_GLOBAL, STORE_LOCAL, STORE_NAME, STORE_IT, DECLARE,
+ DUP, ADD, SUB, MUL, MOD, MAX, MIN, SAME, DIFFRINT, BINARY, NOT, SMOOSH, ALL, ANY, APPLY, CAST, EVAL_OPERAND,
+ EVAL_NONE, UPPIN, NERFIN, NOSTEP, TO_YARN, PRINT, READ_LINE, SETUP_TRY, POP_TRY, JUMP, POP_JUMP_IF_FALSE,
+ POP_JUMP_IF_TRUE, POP, SWITCH, DEF_FUNC, ENTER, BIND, CALL, TAIL_CALL, RETURN_VALUE, RETURN_NOOB,
+ HALT) = range(len(OPCODE_NAMES))
+
+# the opcode for an operator that has one of its own
+BINARY_OPCODES = {
+    'SUM_OF': ADD,
+    'DIFF_OF': SUB,
+    'PRODUKT_OF': MUL,
+    'MOD_OF': MOD,
+    'BIGGR_OF': MAX,
+    'SMALLR_OF': MIN,
+    'BOTH_SAEM': SAME,
+    'DIFFRINT': DIFFRINT,
+}
+STEP_OPCODES = {'UPPIN': UPPIN, 'NERFIN': NERFIN}
+# opcodes whose arg is an offset
+JUMPS = (SETUP_TRY, JUMP, POP_JUMP_IF_FALSE, POP_JUMP_IF_TRUE)
+# opcodes that read or write a variable by name when its slot is empty
+LOOKUPS = (LOAD_LOCAL, STORE_LOCAL, LOAD_NAME, STORE_NAME)
+
+# a HOW IZ I: where its code starts in the Code it was compiled into
+class Function:
+    __slots__ = ("name", "params", "layout", "entry", "code")
+
+    def __init__(self, name, params, layout, entry, code=None):
+        self.name = name
+        self.params = params
+        self.layout = layout
+        self.entry = entry
+        self.code = code
+
+# the bytecode of a program or a statement, the code of the functions it defines comes after the
+# HALT of the top-level code
+class Code:
+    def __init__(self):
+        self.ops = []
+        self.args = []
+        self.lines = []
+        self.consts = []
+        # names of operators, types, variables and functions
+        self.names = []
+        # (name, binding) of the variables the code reads or writes other than by global slot
+        self.variables = []
+        # (function name, argument count) of the calls
+        self.calls = []
+        # (case values, case offsets, default offset) of the WTF?s
+        self.switches = []
+        # (tag, op, operand count) of the operators run through Interpreter.appliers
+        self.operators = []
+        self.functions = []
+        # the global names in slot order, so saved bytecode can be run without the resolver
+        self.globals = []
+        self.link()
+
+    # the nodes the interpreter's operators and matching_case are given, made from the pools
+    def link(self):
+        self.operator_nodes = [operator_node(tag, op) for tag, op, count in self.operators]
+        self.switch_nodes = [SwitchStmt([Case(value, []) for value in values], [], 0)
+                             for values, offsets, default in self.switches]
+        for function in self.functions:
+            function.code = self
+
+    def to_tuple(self):
+        functions = [(f.name, list(f.params), f.layout, f.entry) for f in self.functions]
+        return (self.ops, self.args, self.lines, self.consts, self.names, self.variables, self.calls,
+                self.switches, self.operators, functions, self.globals)
+
+    @staticmethod
+    def from_tuple(data):
+        code = Code()
+        (code.ops, code.args, code.lines, code.consts, code.names, code.variables, code.calls,
+         code.switches, code.operators, functions, code.globals) = data
+        code.functions = [Function(name, params, layout, entry) for name, params, layout, entry in functions]
+        code.link()
+        return code
+
+# a node for Interpreter.appliers, only what they look at is set
+def operator_node(tag, op):
+    if tag == N_ARY_OP:
+        return NAryOp(op, [], 0)
+    return UnaryOp(op, None, 0)
+
+def save(code, f):
+    f.write(MAGIC)
+    marshal.dump(code.to_tuple(), f)
+
+def load(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not LOLCODE bytecode (or saved by another version)")
+    return Code.from_tuple(marshal.load(f))
+
+# whether stmt is a FOUND YR IT
+def returns_it(stmt):
+    return (stmt is not None and stmt.tag == RETURN and stmt.value is not None and stmt.value.tag == OPERAND
+            and stmt.value.kind == 'IT')
+
+# compiles one program or statement into a Code
+class Assembler:
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.code = Code()
+        # pool entries already added, so each is there once
+        self.pooled = {}
+        # (FuncDef, Function) of the functions whose code still has to be compiled
+        self.pending = []
+        self.line = 0
+        # the jumps of the GTFOs ending the loop or WTF? being compiled, patched to go past it.
+        # None outside one, then a GTFO in a function returns from it and one outside does nothing
+        self.exits = None
+        self.in_function = False
+        # functions index of the function being compiled, for its tail calls
+        self.function_index = None
+
+    def emit(self, op, arg=0):
+        code = self.code
+        code.ops.append(op)
+        code.args.append(arg)
+        code.lines.append(self.line)
+        return len(code.ops) - 1
+
+    # the offset the next instruction gets
+    def here(self):
+        return len(self.code.ops)
+
+    # points the jump at offset to target
+    def patch(self, offset, target):
+        self.code.args[offset] = target
+
+    # the index of entry in a pool, adding it if it isn't there yet
+    def pool(self, pool, entry):
+        key = (id(pool), type(entry).__name__, repr(entry))
+        index = self.pooled.get(key)
+        if index is None:
+            index = self.pooled[key] = len(pool)
+            pool.append(entry)
+        return index
+
+    def assemble(self, root):
+        code = self.code
+        if root.tag == PROGRAM or root.tag == VAR_BLOCK:
+            self.block(root.body)
+        else:
+            self.block([root])
+        self.emit(HALT)
+
+        # a function can define more functions, they're added to the list while it's going through
+        done = 0
+        while done < len(self.pending):
+            node, function = self.pending[done]
+            function.entry = self.here()
+            self.line = node.line
+            self.exits = None
+            self.in_function = True
+            self.function_index = self.code.functions.index(function)
+            self.block(node.body)
+            self.emit(RETURN_NOOB)
+            done += 1
+        code.globals = list(self.interpreter.resolver.global_layout)
+        code.link()
+        return code
+
+    def block(self, statements):
+        last = len(statements) - 1
+        for i, stmt in enumerate(statements):
+            self.statement(stmt, self.in_function and i < last and returns_it(statements[i + 1]))
+
+    # tail is whether a FOUND YR IT comes right after the statement
+    def statement(self, stmt, tail=False):
+        if stmt is None:
+            return
+        self.line = getattr(stmt, "line", self.line)
+        tag = stmt.tag
+        if tag == PROGRAM or tag == VAR_BLOCK:
+            self.block(stmt.body)
+        elif tag == VAR_DECL:
+            if stmt.value:
+                self.expression(stmt.value)
+            else:
+                self.emit(LOAD_CONST, self.pool(self.code.consts, NOOB_VALUE))
+            self.emit(DECLARE, self.variable(stmt.name, stmt.binding))
+        elif tag == ASSIGNMENT:
+            self.expression(stmt.expr)
+            if stmt.target == 'IT':
+                self.emit(STORE_IT)
+            else:
+                self.store(stmt.target, stmt.binding)
+        elif tag == TYPE_CAST:
+            self.load(stmt.target, stmt.binding)
+            self.emit(CAST, self.name(stmt.type))
+            self.store(stmt.target, stmt.binding)
+        elif tag == INPUT:
+            self.emit(READ_LINE)
+            self.store(stmt.variable, stmt.binding)
+        elif tag == VISIBLE:
+            self.visible(stmt)
+        elif tag == IF_STMT:
+            self.if_stmt(stmt)
+        elif tag == SWITCH_STMT:
+            self.switch(stmt)
+        elif tag == LOOP:
+            self.loop(stmt)
+        elif tag == FUNC_DEF:
+            self.function(stmt)
+        elif tag == FUNC_CALL:
+            self.emit(ENTER, self.pool(self.code.calls, (stmt.name, len(stmt.args))))
+            for i, arg in enumerate(stmt.args):
+                self.expression(arg)
+                self.emit(BIND, i)
+            if tail:
+                # the FOUND YR IT after it still runs if the VM doesn't make it a tail call
+                self.emit(TAIL_CALL, self.function_index)
+            else:
+                self.emit(CALL)
+        elif tag == RETURN:
+            self.expression(stmt.value)
+            self.emit(RETURN_VALUE)
+        elif tag == BREAK:
+            if self.exits is not None:
+                self.exits.append(self.emit(JUMP))
+            elif self.in_function:
+                self.emit(RETURN_NOOB)
+
+    def name(self, name):
+        return self.pool(self.code.names, name)
+
+    def variable(self, name, binding):
+        return self.pool(self.code.variables, (name, binding))
+
+    def load(self, name, binding):
+        if binding is not None and binding[0] == GLOBAL:
+            self.emit(LOAD_GLOBAL, binding[1])
+        elif binding is not None and binding[0] != UNDECLARED:
+            self.emit(LOAD_LOCAL, self.variable(name, binding))
+        else:
+            self.emit(LOAD_NAME, self.variable(name, binding))
+
+    def store(self, name, binding):
+        if binding is not None and binding[0] == GLOBAL:
+            self.emit(STORE_GLOBAL, binding[1])
+        elif binding is not None and binding[0] != UNDECLARED:
+            self.emit(STORE_LOCAL, self.variable(name, binding))
+        else:
+            self.emit(STORE_NAME, self.variable(name, binding))
+
+    def visible(self, stmt):
+        cast_value = self.interpreter.cast_value
+        for arg in stmt.args:
+            if arg is not None and arg.tag == OPERAND and arg.kind in LITERAL_KINDS:
+                # what it prints is known already
+                val, t = self.interpreter.evaluate_operand(arg)
+                self.emit(LOAD_CONST, self.pool(self.code.consts, str(cast_value(val, t, YARN))))
+                continue
+            # an argument that fails prints [Error: ...] instead, the handler goes right after POP_TRY
+            setup = self.emit(SETUP_TRY)
+            self.expression(arg)
+            self.emit(TO_YARN)
+            self.emit(POP_TRY)
+            self.patch(setup, self.here())
+        self.emit(PRINT, len(stmt.args))
+
+    def if_stmt(self, stmt):
+        ends = []
+        self.emit(LOAD_IT)
+        skip = self.emit(POP_JUMP_IF_FALSE)
+        self.block(stmt.true_block)
+        ends.append(self.emit(JUMP))
+        self.patch(skip, self.here())
+        for else_if in stmt.else_if_blocks:
+            # a MEBBE condition goes in IT before it's checked
+            self.expression(else_if.condition)
+            self.emit(DUP)
+            self.emit(STORE_IT)
+            skip = self.emit(POP_JUMP_IF_FALSE)
+            self.block(else_if.body)
+            ends.append(self.emit(JUMP))
+            self.patch(skip, self.here())
+        self.block(stmt.else_block)
+        for end in ends:
+            self.patch(end, self.here())
+
+    def switch(self, stmt):
+        values = [case.value for case in stmt.cases]
+        table = [values, [], 0]
+        self.code.switches.append(table)
+        self.emit(SWITCH, len(self.code.switches) - 1)
+        # a GTFO in a case jumps to the end like the end of the case does
+        exits = self.exits
+        ends = self.exits = []
+        for case in stmt.cases:
+            table[1].append(self.here())
+            self.block(case.body)
+            ends.append(self.emit(JUMP))
+        table[2] = self.here()
+        self.block(stmt.default)
+        self.exits = exits
+        for end in ends:
+            self.patch(end, self.here())
+
+    def loop(self, stmt):
+        top = self.here()
+        exits = []
+        cond = stmt.condition
+        if cond:
+            self.expression(cond.expr)
+            if cond.type == 'TIL':
+                exits.append(self.emit(POP_JUMP_IF_TRUE))
+            elif cond.type == 'WILE':
+                exits.append(self.emit(POP_JUMP_IF_FALSE))
+            else:
+                self.emit(POP)
+
+        # a GTFO right in the body ends the loop once it's reached, what comes after it never runs.
+        # one deeper in it jumps to the same place
+        breaks = False
+        outer_exits = self.exits
+        self.exits = exits
+        last = len(stmt.body) - 1
+        for i, inner in enumerate(stmt.body):
+            if inner is not None and inner.tag == BREAK:
+                breaks = True
+                break
+            self.statement(inner, self.in_function and i < last and returns_it(stmt.body[i + 1]))
+        self.exits = outer_exits
+        self.line = stmt.line
+        if breaks:
+            exits.append(self.emit(JUMP))
+        else:
+            op = stmt.operation
+            if op:
+                self.load(op.variable, op.binding)
+                self.emit(STEP_OPCODES.get(op.type, NOSTEP), self.name(op.variable))
+                self.store(op.variable, op.binding)
+            self.emit(JUMP, top)
+        for exit in exits:
+            self.patch(exit, self.here())
+
+    def function(self, stmt):
+        function = Function(stmt.name, list(stmt.params), stmt.layout, 0)
+        self.code.functions.append(function)
+        self.pending.append((stmt, function))
+        self.emit(DEF_FUNC, len(self.code.functions) - 1)
+
+    # code pushing the (value, type) of an expression. like Interpreter.evaluate the operators
+    # still waiting for their operands are kept on a stack
+    def expression(self, node):
+        if node is None:
+            self.emit(EVAL_NONE)
+            return
+        if node.tag == OPERAND:
+            self.operand(node)
+            return
+
+        stack = [(node, expression_operands(node), [0])]
+        while True:
+            node, operands, done = stack[-1]
+            if done[0] < len(operands):
+                operand = operands[done[0]]
+                done[0] += 1
+                if operand is None:
+                    self.emit(EVAL_NONE)
+                elif operand.tag == OPERAND:
+                    self.operand(operand)
+                else:
+                    stack.append((operand, expression_operands(operand), [0]))
+                continue
+
+            stack.pop()
+            self.operator(node, len(operands))
+            if not stack:
+                return
+
+    def operand(self, node):
+        kind = node.kind
+        if kind == 'IT':
+            self.emit(LOAD_IT)
+        elif kind == 'IDENTIFIER':
+            self.load(node.value, node.binding)
+        elif kind in LITERAL_KINDS:
+            self.emit(LOAD_CONST, self.pool(self.code.consts, self.interpreter.evaluate_operand(node)))
+        else:
+            self.emit(EVAL_OPERAND, self.pool(self.code.consts, (node.value, kind)))
+
+    def operator(self, node, count):
+        tag = node.tag
+        if tag == BINARY_OP:
+            opcode = BINARY_OPCODES.get(node.op)
+            if opcode is not None:
+                self.emit(opcode)
+            else:
+                self.emit(BINARY, self.name(node.op))
+        elif tag == N_ARY_OP and node.op in ('SMOOSH', 'ALL_OF', 'ANY_OF'):
+            self.emit({'SMOOSH': SMOOSH, 'ALL_OF': ALL, 'ANY_OF': ANY}[node.op], count)
+        elif tag == UNARY_OP and node.op == 'NOT':
+            self.emit(NOT)
+        elif tag == MAEK:
+            self.emit(CAST, self.name(node.type))
+        elif tag in (N_ARY_OP, UNARY_OP):
+            self.emit(APPLY, self.pool(self.code.operators, (tag, node.op, count)))
+        else:
+            # a statement where an expression should be is (None, NOOB), see Interpreter.apply_nothing
+            self.emit(LOAD_CONST, self.pool(self.code.consts, NOOB_VALUE))
+
+# runs Codes on the state of an interpreter
+class VM:
+    def __init__(self, interpreter, max_depth=MAX_CALL_DEPTH):
+        self.interpreter = interpreter
+        # how many calls can be running at once
+        self.max_depth = max_depth
+        # a node per binary operator for Interpreter.apply_binary_op, only its op is looked at
+        self.binary_nodes = {}
+        # Function -> what scan found in its code
+        self.scans = {}
+        # (caller, callee) -> whether a tail call can drop the caller's frame, until a DEF_FUNC
+        self.tails = {}
+
+    def binary_node(self, op):
+        node = self.binary_nodes.get(op)
+        if node is None:
+            node = self.binary_nodes[op] = BinaryOp(op, None, None, 0)
+        return node
+
+    def undeclared(self, slot):
+        name = list(self.interpreter.layouts[0])[slot]
+        raise Exception(f"Undeclared variable '{name}'")
+
+    # runs code from its first instruction until its HALT, or a FOUND YR outside a function
+    def run(self, code):
+        interpreter = self.interpreter
+        cast_value = interpreter.cast_value
+        apply_binary_op = interpreter.apply_binary_op
+        binary_node = self.binary_node
+        frames = interpreter.frames
+        layouts = interpreter.layouts
+        globals_ = frames[0]
+        functions = interpreter.functions
+        max_depth = self.max_depth
+        tails = self.tails
+        ADD_NODE = binary_node('SUM_OF')
+        SUB_NODE = binary_node('DIFF_OF')
+        MUL_NODE = binary_node('PRODUKT_OF')
+        MOD_NODE = binary_node('MOD_OF')
+        MAX_NODE = binary_node('BIGGR_OF')
+        MIN_NODE = binary_node('SMALLR_OF')
+        SAME_NODE = binary_node('BOTH_SAEM')
+        DIFFRINT_NODE = binary_node('DIFFRINT')
+
+        ops, args, consts, names, variables = code.ops, code.args, code.consts, code.names, code.variables
+        # the frame of the code running, the global one at the top
+        frame = frames[-1]
+        # (code, offset to go back to, frame) of every call running
+        calls = []
+        # (handler offset, stack size) of the SETUP_TRYs not popped yet
+        handlers = []
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        callee = None
+        pc = 0
+
+        while True:
+            try:
+                while True:
+                    op = ops[pc]
+                    arg = args[pc]
+                    pc += 1
+                    if op == LOAD_GLOBAL:
+                        value = globals_[arg]
+                        if value is None:
+                            self.undeclared(arg)
+                        push(value)
+                    elif op == LOAD_CONST:
+                        push(consts[arg])
+                    elif op == LOAD_LOCAL:
+                        name, (depth, slot) = variables[arg]
+                        # depth 0 or 1 is the frame of the function running, arguments are worked
+                        # out while the function being called is on top of it
+                        value = frame[slot]
+                        if value is None:
+                            value = interpreter.find_variable(name, len(frames) - 2 - depth)
+                        push(value)
+                    elif op == ADD:
+                        r = pop()
+                        l = stack[-1]
+                        if l[1] == NUMBR and r[1] == NUMBR:
+                            stack[-1] = (l[0] + r[0], NUMBR)
+                        else:
+                            stack[-1] = apply_binary_op(ADD_NODE, (l, r))
+                    elif op == POP_JUMP_IF_FALSE:
+                        val, t = pop()
+                        if not (val if t == TROOF else cast_value(val, t, TROOF)):
+                            pc = arg
+                    elif op == POP_JUMP_IF_TRUE:
+                        val, t = pop()
+                        if val if t == TROOF else cast_value(val, t, TROOF):
+                            pc = arg
+                    elif op == JUMP:
+                        pc = arg
+                    elif op == STORE_GLOBAL:
+                        if globals_[arg] is None:
+                            self.undeclared(arg)
+                        globals_[arg] = pop()
+                    elif op == STORE_LOCAL:
+                        name, binding = variables[arg]
+                        slot = binding[1]
+                        if frame[slot] is None:
+                            interpreter.write_variable(name, binding, pop())
+                        else:
+                            frame[slot] = pop()
+                    elif op == SAME or op == DIFFRINT:
+                        r = pop()
+                        l = stack[-1]
+                        if l[1] == r[1]:
+                            stack[-1] = WIN_VALUE if (l[0] == r[0]) == (op == SAME) else FAIL_VALUE
+                        else:
+                            stack[-1] = apply_binary_op(SAME_NODE if op == SAME else DIFFRINT_NODE, (l, r))
+                    elif op == SUB:
+                        r = pop()
+                        l = stack[-1]
+                        if l[1] == NUMBR and r[1] == NUMBR:
+                            stack[-1] = (l[0] - r[0], NUMBR)
+                        else:
+                            stack[-1] = apply_binary_op(SUB_NODE, (l, r))
+                    elif op == MUL:
+                        r = pop()
+                        l = stack[-1]
+                        if l[1] == NUMBR and r[1] == NUMBR:
+                            stack[-1] = (l[0] * r[0], NUMBR)
+                        else:
+                            stack[-1] = apply_binary_op(MUL_NODE, (l, r))
+                    elif op == MOD:
+                        r = pop()
+                        l = stack[-1]
+                        if l[1] == NUMBR and r[1] == NUMBR and r[0] != 0:
+                            stack[-1] = (l[0] % r[0], NUMBR)
+                        else:
+                            stack[-1] = apply_binary_op(MOD_NODE, (l, r))
+                    elif op == MAX or op == MIN:
+                        r = pop()
+                        l = stack[-1]
+                        if l[1] == NUMBR and r[1] == NUMBR:
+                            stack[-1] = ((max if op == MAX else min)(l[0], r[0]), NUMBR)
+                        else:
+                            stack[-1] = apply_binary_op(MAX_NODE if op == MAX else MIN_NODE, (l, r))
+                    elif op == UPPIN or op == NERFIN or op == NOSTEP:
+                        val, t = stack[-1]
+                        delta = 1 if op == UPPIN else -1 if op == NERFIN else 0
+                        if t == NUMBR:
+                            stack[-1] = (val + delta, NUMBR)
+                        else:
+                            stack[-1] = self.step(names[arg], val, t, delta)
+                    elif op == LOAD_IT:
+                        push(interpreter.it_register)
+                    elif op == STORE_IT:
+                        interpreter.it_register = pop()
+                    elif op == LOAD_NAME:
+                        name, binding = variables[arg]
+                        push(interpreter.read_variable(name, binding))
+                    elif op == STORE_NAME:
+                        name, binding = variables[arg]
+                        interpreter.write_variable(name, binding, pop())
+                    elif op == DECLARE:
+                        name, (depth, slot) = variables[arg]
+                        if frame[slot] is not None:
+                            raise Exception(f"Variable '{name}' already declared in current scope")
+                        frame[slot] = pop()
+                        if depth == GLOBAL:
+                            interpreter.declared.append(slot)
+                    elif op == DUP:
+                        push(stack[-1])
+                    elif op == POP:
+                        pop()
+                    elif op == BINARY:
+                        r = pop()
+                        stack[-1] = apply_binary_op(binary_node(names[arg]), (stack[-1], r))
+                    elif op == NOT:
+                        stack[-1] = FAIL_VALUE if stack[-1][0] else WIN_VALUE
+                    elif op == SMOOSH:
+                        parts = stack[len(stack) - arg:]
+                        del stack[len(stack) - arg:]
+                        push(("".join([str(val) for val, t in parts]), YARN))
+                    elif op == ALL or op == ANY:
+                        parts = stack[len(stack) - arg:]
+                        del stack[len(stack) - arg:]
+                        values = [val for val, t in parts]
+                        push(WIN_VALUE if (all(values) if op == ALL else any(values)) else FAIL_VALUE)
+                    elif op == APPLY:
+                        node = code.operator_nodes[arg]
+                        count = code.operators[arg][2]
+                        parts = stack[len(stack) - count:]
+                        del stack[len(stack) - count:]
+                        push(interpreter.appliers[code.operators[arg][0]](node, parts))
+                    elif op == CAST:
+                        val, t = stack[-1]
+                        target_type = names[arg]
+                        stack[-1] = (cast_value(val, t, target_type), target_type)
+                    elif op == EVAL_OPERAND:
+                        value, kind = consts[arg]
+                        push(interpreter.evaluate_operand(Operand(value, kind, 0)))
+                    elif op == EVAL_NONE:
+                        # fails the same way the interpreter does
+                        push(interpreter.evaluate(None))
+                    elif op == TO_YARN:
+                        val, t = stack[-1]
+                        stack[-1] = str(val if t == YARN else cast_value(val, t, YARN))
+                    elif op == PRINT:
+                        parts = stack[len(stack) - arg:]
+                        del stack[len(stack) - arg:]
+                        output = "".join(parts)
+                        interpreter.output_buffer.append(output)
+                        print(output)
+                        sys.stdout.flush()
+                    elif op == SETUP_TRY:
+                        handlers.append((arg, len(stack)))
+                    elif op == POP_TRY:
+                        handlers.pop()
+                    elif op == READ_LINE:
+                        try:
+                            push((input(), YARN))
+                        except EOFError:
+                            push(("", YARN))
+                    elif op == SWITCH:
+                        val, t = interpreter.it_register
+                        node = code.switch_nodes[arg]
+                        case = interpreter.matching_case(node, val, t)
+                        values, offsets, default = code.switches[arg]
+                        pc = default if case is None else offsets[node.cases.index(case)]
+                    elif op == DEF_FUNC:
+                        function = code.functions[arg]
+                        functions[function.name] = function
+                        # the functions the others call can be different now
+                        tails.clear()
+                    elif op == ENTER:
+                        func_name, arg_count = code.calls[arg]
+                        function = functions.get(func_name)
+                        if function is None:
+                            raise Exception(f"Function '{func_name}' not defined")
+                        params = function.params
+                        if len(params) != arg_count:
+                            raise Exception(f"Function '{func_name}' expects {len(params)} arguments, got {arg_count}")
+                        layout = function.layout
+                        callee = [None] * len(layout)
+                        frames.append(callee)
+                        layouts.append(layout)
+                    elif op == BIND:
+                        param = function.params[arg]
+                        slot = function.layout[param]
+                        if callee[slot] is not None:
+                            raise Exception(f"Variable '{param}' already declared in current scope")
+                        callee[slot] = pop()
+                    elif op == CALL or op == TAIL_CALL:
+                        safe = False
+                        if op == TAIL_CALL:
+                            caller = code.functions[arg]
+                            safe = tails.get((caller, function))
+                            if safe is None:
+                                safe = self.can_drop(caller, function)
+                        if safe:
+                            # the call returns to where the caller would have, without its frame
+                            del frames[-2]
+                            del layouts[-2]
+                        else:
+                            if len(calls) >= max_depth:
+                                raise Exception("maximum recursion depth exceeded")
+                            calls.append((code, pc, frame))
+                        code = function.code
+                        ops, args, consts, names, variables = code.ops, code.args, code.consts, code.names, code.variables
+                        pc = function.entry
+                        frame = callee
+                    elif op == RETURN_VALUE or op == RETURN_NOOB:
+                        ret_val = pop() if op == RETURN_VALUE else None
+                        if not calls:
+                            # FOUND YR outside a function stops the program
+                            interpreter.return_value = ret_val
+                            interpreter.should_return = True
+                            return
+                        code, pc, frame = calls.pop()
+                        ops, args, consts, names, variables = code.ops, code.args, code.consts, code.names, code.variables
+                        frames.pop()
+                        layouts.pop()
+                        interpreter.it_register = ret_val if ret_val else NOOB_VALUE
+                    elif op == HALT:
+                        return
+                    else:
+                        raise Exception(f"Unknown opcode {op}")
+            except Exception as e:
+                if not handlers:
+                    raise
+                # an argument of VISIBLE failed, it prints [Error: ...]
+                pc, size = handlers.pop()
+                del stack[size:]
+                push(f"[Error: {str(e)}]")
+
+    # whether a tail call from caller to callee can drop the caller's frame: the frames are looked
+    # through by name only for the names scan finds, and none of those the callee (or what it
+    # calls) can look up is in the caller's frame
+    def can_drop(self, caller, callee):
+        functions = self.interpreter.functions
+        seen = {callee}
+        todo = [callee]
+        safe = True
+        while todo and safe:
+            scan = self.scan(todo.pop())
+            if scan is None:
+                safe = False
+                break
+            names, called = scan
+            if not names.isdisjoint(caller.layout):
+                safe = False
+            for name in called:
+                function = functions.get(name)
+                if not isinstance(function, Function):
+                    # not defined (yet), the call fails or it's some other backend's
+                    safe = False
+                elif function not in seen:
+                    seen.add(function)
+                    todo.append(function)
+        self.tails[(caller, callee)] = safe
+        return safe
+
+    # (names, called) of the code of function: the names of variables it can look up through
+    # the frames under its own, and the names of the functions it calls. None if it defines a
+    # function, what gets called could be anything then. a variable's slot is never empty once
+    # its I HAS A ran, so one is only looked up if some way to it doesn't go through its I HAS A
+    # (the parameters always have theirs)
+    def scan(self, function):
+        if function in self.scans:
+            return self.scans[function]
+        code = function.code
+        ops, args = code.ops, code.args
+        # offset -> the names surely declared when it's reached
+        declared = {function.entry: frozenset(function.params)}
+        todo = [function.entry]
+        while todo:
+            offset = todo.pop()
+            op = ops[offset]
+            arg = args[offset]
+            names = declared[offset]
+            if op == DECLARE:
+                names = names | {code.variables[arg][0]}
+            if op == SWITCH:
+                values, offsets, default = code.switches[arg]
+                nexts = list(offsets) + [default]
+            elif op in (JUMP, RETURN_VALUE, RETURN_NOOB, HALT):
+                nexts = []
+            else:
+                nexts = [offset + 1]
+            if op in JUMPS:
+                nexts.append(arg)
+            for target in nexts:
+                known = declared.get(target)
+                if known is None:
+                    declared[target] = names
+                    todo.append(target)
+                elif not known <= names:
+                    declared[target] = known & names
+                    todo.append(target)
+
+        names = set()
+        called = set()
+        result = (names, called)
+        for offset in sorted(declared):
+            op = ops[offset]
+            arg = args[offset]
+            if op in LOOKUPS:
+                name = code.variables[arg][0]
+                if name not in declared[offset]:
+                    names.add(name)
+            elif op == ENTER:
+                called.add(code.calls[arg][0])
+            elif op == DEF_FUNC:
+                result = None
+                break
+        self.scans[function] = result
+        return result
+
+    # UPPIN/NERFIN of a loop variable that isn't a NUMBR, the same casts as Interpreter.execute_loop
+    def step(self, var_name, val, current_type, delta):
+        cast_value = self.interpreter.cast_value
+        if current_type != NUMBAR:
+            try:
+                val = cast_value(val, current_type, NUMBR)
+                current_type = NUMBR
+            except Exception:
+                try:
+                    val = cast_value(val, current_type, NUMBAR)
+                    current_type = NUMBAR
+                except Exception:
+                    raise Exception(f"Loop variable '{var_name}' value cannot be cast to numerical type for UPPIN/NERFIN.")
+        val += delta
+        if current_type == NUMBR:
+            val = int(val)
+        elif current_type == NUMBAR:
+            val = float(val)
+        return val, current_type
+
+# the backend for Interpreter.execute_compiled and execute_stream
+class BytecodeCompiler:
+    def __init__(self, interpreter, max_depth=MAX_CALL_DEPTH):
+        self.interpreter = interpreter
+        self.vm = VM(interpreter, max_depth)
+
+    def assemble(self, node):
+        return Assembler(self.interpreter).assemble(node)
+
+    # the function running node (a program or a statement)
+    def compile(self, node):
+        if not node:
+            return lambda: None
+        code = self.assemble(node)
+        return lambda: self.vm.run(code)
+
+# the instructions of code as text, a line each: offset, source line, opcode, arg and what it means
+def disassemble(code):
+    entries = {function.entry: function.name for function in code.functions}
+    targets = set()
+    for op, arg in zip(code.ops, code.args):
+        if op in JUMPS:
+            targets.add(arg)
+    for values, offsets, default in code.switches:
+        targets.update(offsets)
+        targets.add(default)
+
+    out = []
+    for offset, (op, arg, line) in enumerate(zip(code.ops, code.args, code.lines)):
+        if offset in entries:
+            out.append("")
+            out.append(f"HOW IZ I {entries[offset]}:")
+        name = OPCODE_NAMES[op]
+        marker = ">>" if offset in targets else "  "
+        note = describe(code, op, arg)
+        text = f"{marker}{offset:>6} {line:>6}  {name:<18}"
+        if note is not None:
+            text += f"{arg:>6}  ({note})" if note else f"{arg:>6}"
+        out.append(text.rstrip())
+    return "\n".join(out)
+
+# what the arg of an instruction means, "" if it's just a number, None if it has none
+def describe(code, op, arg):
+    if op == LOAD_CONST or op == EVAL_OPERAND:
+        return repr(code.consts[arg])
+    if op in (LOAD_GLOBAL, STORE_GLOBAL):
+        return code.globals[arg] if arg < len(code.globals) else ""
+    if op in (LOAD_LOCAL, LOAD_NAME, STORE_LOCAL, STORE_NAME, DECLARE):
+        name, binding = code.variables[arg]
+        return f"{name} {binding}"
+    if op in (BINARY, CAST, UPPIN, NERFIN, NOSTEP):
+        return code.names[arg]
+    if op == APPLY:
+        tag, name, count = code.operators[arg]
+        return f"{name}, {count} operands"
+    if op == SWITCH:
+        values, offsets, default = code.switches[arg]
+        cases = ", ".join(f"{value!r} -> {offset}" for value, offset in zip(values, offsets))
+        return f"{cases}, OMGWTF -> {default}" if cases else f"OMGWTF -> {default}"
+    if op == DEF_FUNC:
+        function = code.functions[arg]
+        return f"{function.name} at {function.entry}"
+    if op == ENTER:
+        name, count = code.calls[arg]
+        return f"{name}, {count} arguments"
+    if op in JUMPS:
+        return f"to {arg}"
+    if op == TAIL_CALL:
+        return f"in {code.functions[arg].name}"
+    if op in (SMOOSH, ALL, ANY, PRINT, BIND):
+        return ""
+    return None
+
+# runs saved bytecode on a new Interpreter: python vm.py [--dis] [--max-depth=N] program.lolb
+def main():
+    from semantics1 import Interpreter
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not paths:
+        print("usage: python vm.py [--dis] [--max-depth=N] program.lolb")
+        sys.exit(2)
+    with open(paths[0], "rb") as f:
+        code = load(f)
+    if "--dis" in sys.argv:
+        print(disassemble(code))
+        return
+    interpreter = Interpreter()
+    for name in code.globals:
+        interpreter.resolver.global_layout.setdefault(name, len(interpreter.resolver.global_layout))
+    interpreter.grow_globals()
+    max_depth = MAX_CALL_DEPTH
+    for arg in sys.argv[1:]:
+        if arg.startswith("--max-depth="):
+            max_depth = int(arg[len("--max-depth="):])
+    try:
+        VM(interpreter, max_depth).run(code)
+    except Exception as e:
+        print(f"Runtime Error: {str(e)}")
+
+if __name__ == "__main__":
+    main()
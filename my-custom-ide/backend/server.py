@@ -27,10 +27,19 @@ SEMANTICS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../
 def stream_output(process, sid):
     #Reads stdout from the process and emits it to the client.
     try:
+        # Token lines (one json object each) collected between <<TOKENS>> and <<END_TOKENS>>
+        token_lines = None
         # Read character by character or line by line. 
         for line in iter(process.stdout.readline, ''):
             if line:
-                    if "<<TOKENS>>" in line:
+                    if token_lines is not None:
+                        if line.startswith("<<END_TOKENS>>"):
+                            socketio.emit('tokens', {'tokens': "[" + ",".join(token_lines) + "]"}, room=sid)
+                            token_lines = None
+                        else:
+                            token_lines.append(line.strip())
+
+                    elif "<<TOKENS>>" in line:
                         parts = line.split("<<TOKENS>>")
                         if parts[0]:
                             socketio.emit('terminal_output', {'output': parts[0]}, room=sid)
@@ -38,6 +47,8 @@ def stream_output(process, sid):
                         json_str = parts[1].strip()
                         if json_str:
                              socketio.emit('tokens', {'tokens': json_str}, room=sid)
+                        else:
+                            token_lines = []
 
                     elif "<<SYMBOL_TABLE>>" in line:
                         parts = line.split("<<SYMBOL_TABLE>>")